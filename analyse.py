@@ -0,0 +1,188 @@
+# auteur: Ben Kabongo Buzangu
+# statistiques sur les parties enregistrées
+
+""" Jeu de Domino - Analyse
+les parties d'un fichier d'enregistrement sont lues une à une et passent
+par une suite de générateurs, jusqu'à un objet Statistiques qui les
+agrège en une seule passe : la mémoire utilisée ne dépend pas du nombre
+de parties.
+un gros fichier peut être découpé en tranches, analysées chacune par un
+processus ; les Statistiques partielles sont ensuite fusionnées """
+
+import argparse
+import collections
+import concurrent.futures
+import os
+
+import enregistrement
+import model
+
+class Statistiques:
+	""" agrégats sur un ensemble de parties """
+	def __init__(self):
+		self.parties = 0
+		# par stratégie : parties jouées, victoires, nuls
+		self.strategies = collections.defaultdict(lambda: [0, 0, 0])
+		# distribution des scores et des écarts de score (premier moins second)
+		self.scores = collections.Counter()
+		self.ecarts = collections.Counter()
+		# par premier domino posé : parties, victoires de celui qui l'a posé, nuls
+		self.ouvertures = collections.defaultdict(lambda: [0, 0, 0])
+		# distribution du nombre de pioches par partie
+		self.pioches = collections.Counter()
+		# distribution des points (model.Main.getPoints) restés en main à la fin
+		self.restes = collections.Counter()
+
+	def __getstate__(self):
+		# les defaultdict de lambda ne passent pas d'un processus à l'autre
+		etat = dict(self.__dict__)
+		etat["strategies"] = dict(self.strategies)
+		etat["ouvertures"] = dict(self.ouvertures)
+		return etat
+
+	def __setstate__(self, etat):
+		self.__init__()
+		strategies, ouvertures = etat.pop("strategies"), etat.pop("ouvertures")
+		self.__dict__.update(etat)
+		self.strategies.update(strategies)
+		self.ouvertures.update(ouvertures)
+
+	def ajoute(self, partie):
+		""" ajoute une enregistrement.PartieLue """
+		self.parties += 1
+		scores = (partie.score1, partie.score2)
+		for joueur, nom in enumerate((partie.strategie1, partie.strategie2)):
+			compte = self.strategies[nom]
+			compte[0] += 1
+			if scores[joueur] > scores[1 - joueur]: compte[1] += 1
+			elif scores[joueur] == scores[1 - joueur]: compte[2] += 1
+			self.scores[scores[joueur]] += 1
+		self.ecarts[partie.score1 - partie.score2] += 1
+
+		# on rejoue les coups sur les mains pour connaître ce qui reste à la fin
+		points = [sum(d.getSomme() for d in partie.main1), sum(d.getSomme() for d in partie.main2)]
+		ouverture = None
+		pioches = 0
+		for joueur, coup, domino in partie.coups:
+			if coup == model.PIOCHE:
+				pioches += 1
+				points[joueur] += domino.getSomme()
+			elif coup != model.PASSE:
+				points[joueur] -= domino.getSomme()
+				if ouverture is None: ouverture = (joueur, domino)
+		self.pioches[pioches] += 1
+		for p in points: self.restes[p] += 1
+
+		if ouverture is not None:
+			joueur, domino = ouverture
+			compte = self.ouvertures[min(domino.get()), max(domino.get())]
+			compte[0] += 1
+			if scores[joueur] > scores[1 - joueur]: compte[1] += 1
+			elif scores[joueur] == scores[1 - joueur]: compte[2] += 1
+
+	def fusionne(self, statistiques):
+		""" ajoute les agrégats d'un autre objet Statistiques """
+		self.parties += statistiques.parties
+		for cible, source in ((self.strategies, statistiques.strategies),
+			(self.ouvertures, statistiques.ouvertures)):
+			for cle, compte in source.items():
+				for i in range(3): cible[cle][i] += compte[i]
+		self.scores.update(statistiques.scores)
+		self.ecarts.update(statistiques.ecarts)
+		self.pioches.update(statistiques.pioches)
+		self.restes.update(statistiques.restes)
+
+	def __str__(self):
+		lignes = ["{} parties".format(self.parties)]
+		for nom, (parties, victoires, nuls) in sorted(self.strategies.items()):
+			lignes.append("{:<12} {:>9} parties | victoires {:.1%} | nuls {:.1%}".format(
+				nom, parties, victoires / parties, nuls / parties))
+		for nom, distribution in (("score", self.scores), ("écart", self.ecarts),
+			("pioches", self.pioches), ("points restants", self.restes)):
+			lignes.append("{:<16} moyenne {:>7.2f} | médiane {:>4} | min {:>4} | max {:>4}".format(
+				nom, _moyenne(distribution), _quantile(distribution, 0.5),
+				min(distribution, default = 0), max(distribution, default = 0)))
+		# à taux égal, les ouvertures sont rangées par domino : le bilan ne
+		# dépend pas de l'ordre de fusion, donc du nombre de processus
+		ouvertures = sorted(self.ouvertures.items(), key = lambda e: (-e[1][1] / e[1][0], e[0]))
+		for (low, high), (parties, victoires, nuls) in ouvertures[:3] + ouvertures[-3:]:
+			lignes.append("ouverture | {} | {} | : {:>9} parties | victoires {:.1%}".format(
+				low, high, parties, victoires / parties))
+		return "\n".join(lignes)
+
+def _moyenne(distribution):
+	""" moyenne d'une distribution {valeur: effectif} """
+	total = sum(distribution.values())
+	if total == 0: return 0.0
+	return sum(valeur * n for valeur, n in distribution.items()) / total
+
+def _quantile(distribution, q):
+	""" quantile d'une distribution {valeur: effectif} """
+	total = sum(distribution.values())
+	cumul = 0
+	for valeur in sorted(distribution):
+		cumul += distribution[valeur]
+		if cumul >= q * total: return valeur
+	return 0
+
+# ----------------------------------------- chaîne de générateurs
+
+def lit(chemin, debut = enregistrement.TAILLE_ENTETE, fin = None):
+	""" générateur des parties d'un fichier, entre les positions debut et fin """
+	with enregistrement.Lecteur(chemin) as lecteur:
+		yield from lecteur.parties(debut, fin)
+
+def filtre(parties, strategie = None):
+	""" ne garde que les parties où joue une stratégie donnée """
+	for partie in parties:
+		if strategie is None or strategie in (partie.strategie1, partie.strategie2):
+			yield partie
+
+def agrege(parties):
+	""" agrège les parties en un objet Statistiques """
+	statistiques = Statistiques()
+	for partie in parties:
+		statistiques.ajoute(partie)
+	return statistiques
+
+def tranches(chemin, n):
+	""" découpe un fichier en au plus n tranches de tailles voisines
+	renvoie la liste des positions (debut, fin) de chaque tranche
+	seuls les en-têtes des parties sont lus """
+	with enregistrement.Lecteur(chemin) as lecteur:
+		taille = len(lecteur)
+		cible = max((taille - enregistrement.TAILLE_ENTETE) // n, 1)
+		bornes = [enregistrement.TAILLE_ENTETE]
+		for position in lecteur.positions():
+			if position - bornes[-1] >= cible: bornes.append(position)
+		bornes.append(taille)
+	return list(zip(bornes[:-1], bornes[1:]))
+
+def _analyseTranche(chemin, debut, fin, strategie):
+	""" analyse une tranche dans un processus fils """
+	return agrege(filtre(lit(chemin, debut, fin), strategie))
+
+def analyse(chemin, processus = 1, strategie = None):
+	""" analyse un fichier, découpé entre plusieurs processus au besoin
+	strategie : ne garde que les parties où joue cette stratégie """
+	if processus <= 1:
+		return agrege(filtre(lit(chemin), strategie))
+	statistiques = Statistiques()
+	with concurrent.futures.ProcessPoolExecutor(processus) as executor:
+		taches = [executor.submit(_analyseTranche, chemin, debut, fin, strategie)
+			for debut, fin in tranches(chemin, processus)]
+		for tache in concurrent.futures.as_completed(taches):
+			statistiques.fusionne(tache.result())
+	return statistiques
+
+def main():
+	parser = argparse.ArgumentParser(description = "Statistiques sur des parties enregistrées")
+	parser.add_argument("fichier")
+	parser.add_argument("-j", "--processus", type = int, default = os.cpu_count() or 1)
+	parser.add_argument("--strategie", default = None,
+		help = "ne garde que les parties où joue cette stratégie")
+	args = parser.parse_args()
+	print(analyse(args.fichier, args.processus, args.strategie))
+
+if __name__ == "__main__":
+	main()
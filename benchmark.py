@@ -0,0 +1,228 @@
+# auteur: Ben Kabongo Buzangu
+# mesures de performance du modèle
+
+""" Jeu de Domino - Benchmark
+chaque mesure répète une opération du modèle sur des données tirées avec
+une graine fixe, et garde le meilleur débit (opérations par seconde) sur
+plusieurs essais.
+les débits sont comparés à ceux d'un fichier de référence JSON : une mesure
+plus lente que la référence au-delà d'une tolérance est une régression, et
+le programme se termine alors avec le code 1.
+les mesures de génération des coups, de distribution et de parties
+complètes sont aussi faites sur les jeux double-9, double-12 et double-15,
+avec des mains de 2/7 du jeu (8 dominos pour le double-six).
+la référence dépend de la machine : elle se régénère avec --reference """
+
+import argparse
+import functools
+import json
+import os
+import random
+import sys
+import time
+
+import model
+import simulation
+
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# longueur du plateau pour les mesures de pose
+_LONGUEUR = 10000
+
+# jeux mesurés, en plus du double-six
+_PIPS = (9, 12, 15)
+
+def _taille(pipMax):
+	""" nombre de dominos de chaque main pour un jeu double-pipMax """
+	return len(model.jeuComplet(pipMax)) * 2 // 7
+
+def _jeu(pipMax = 6):
+	""" renvoie un jeu fraîchement distribué """
+	jeu = model.Jeu(_taille(pipMax), pipMax, random.getrandbits(64))
+	jeu._distribue(jeu._newDistribution())
+	return jeu
+
+def _dominos(n):
+	""" renvoie n dominos au hasard """
+	return [model.Domino(random.randrange(7), random.randrange(7)) for i in range(n)]
+
+# ----------------------------------------- mesures
+# une mesure prépare ses données et renvoie une fonction f(n) qui répète n fois
+# l'opération mesurée
+
+def dominoEq():
+	dominos = _dominos(1000)
+	autres = _dominos(1000)
+	paires = list(zip(dominos, autres))
+	def f(n):
+		for i in range(n // 1000):
+			for d1, d2 in paires: d1 == d2
+	return f
+
+def plateauIsJouableDomino():
+	plateau = model.Plateau()
+	plateau.setDominos([model.Domino(2, 3)])
+	dominos = _dominos(1000)
+	def f(n):
+		for i in range(n // 1000):
+			for domino in dominos: plateau.isJouableDomino(domino)
+	return f
+
+def _plateauLong(left, right):
+	""" plateau de _LONGUEUR dominos d'extrêmités left et right """
+	dominos = [model.Domino(left, 1)] + [model.Domino(1, 1)] * (_LONGUEUR - 2) + [model.Domino(1, right)]
+	plateau = model.Plateau()
+	plateau.setDominos(dominos)
+	return plateau
+
+def plateauJouerGauche():
+	# (3, 5) puis (5, 3) se posent toujours à gauche d'un plateau 3 ... 2
+	dominos = (model.Domino(3, 5), model.Domino(5, 3))
+	def f(n):
+		plateau = _plateauLong(3, 2)
+		for i in range(n // 2):
+			for domino in dominos: plateau.jouer(domino)
+	return f
+
+def plateauJouerDroite():
+	# (3, 5) puis (5, 3) se posent toujours à droite d'un plateau 2 ... 3
+	dominos = (model.Domino(3, 5), model.Domino(5, 3))
+	def f(n):
+		plateau = _plateauLong(2, 3)
+		for i in range(n // 2):
+			for domino in dominos: plateau.jouer(domino)
+	return f
+
+def plateauIsJouableMain(pipMax = 6):
+	jeux = [_jeu(pipMax) for i in range(100)]
+	for jeu in jeux:
+		jeu._plateau.setDominos([model.Domino(random.randrange(pipMax + 1), random.randrange(pipMax + 1))])
+	def f(n):
+		for i in range(n // 100):
+			for jeu in jeux: jeu._plateau.isJouableMain(jeu._mainOrdi)
+	return f
+
+def mainGetBigDomino(pipMax = 6):
+	mains = [_jeu(pipMax)._mainOrdi for i in range(100)]
+	def f(n):
+		for i in range(n // 100):
+			for main in mains: main.getBigDomino()
+	return f
+
+def mainGetBigJouable(pipMax = 6):
+	mains = [(_jeu(pipMax)._mainOrdi, random.randrange(pipMax + 1), random.randrange(pipMax + 1))
+		for i in range(100)]
+	def f(n):
+		for i in range(n // 100):
+			for main, left, right in mains: main.getBigJouable(left, right)
+	return f
+
+def mainPiocheDomino():
+	dominos = _dominos(28)
+	def f(n):
+		main = model.Main()
+		for i in range(n // 28):
+			for domino in dominos: main.addDomino(domino)
+			for domino in dominos: main.piocheDomino()
+	return f
+
+def jeuDistribue(pipMax = 6):
+	jeu = model.Jeu(_taille(pipMax), pipMax, random.getrandbits(64))
+	dominos = jeu._newDistribution()
+	def f(n):
+		for i in range(n): jeu._distribue(dominos)
+	return f
+
+def partiesCompletes(pipMax = 6):
+	def f(n):
+		jeu = simulation.Simulation("facile", "difficile", taille = _taille(pipMax), pipMax = pipMax,
+			graine = random.getrandbits(64))
+		for resultat in jeu.parties(n): pass
+	return f
+
+# nom, mesure, nombre d'opérations par essai
+MESURES = (
+	("Domino.__eq__", dominoEq, 200000),
+	("Plateau.isJouableDomino", plateauIsJouableDomino, 200000),
+	("Plateau.jouer gauche", plateauJouerGauche, 100000),
+	("Plateau.jouer droite", plateauJouerDroite, 100000),
+	("Plateau.isJouableMain", plateauIsJouableMain, 50000),
+	("Main.getBigDomino", mainGetBigDomino, 50000),
+	("Main.getBigJouable", mainGetBigJouable, 50000),
+	("Main.piocheDomino", mainPiocheDomino, 28000),
+	("Jeu._distribue", jeuDistribue, 10000),
+	("parties complètes", partiesCompletes, 1000),
+)
+for _pipMax in _PIPS:
+	MESURES += (
+		("Plateau.isJouableMain double-{}".format(_pipMax),
+			functools.partial(plateauIsJouableMain, _pipMax), 50000),
+		("Main.getBigDomino double-{}".format(_pipMax),
+			functools.partial(mainGetBigDomino, _pipMax), 50000),
+		("Main.getBigJouable double-{}".format(_pipMax),
+			functools.partial(mainGetBigJouable, _pipMax), 50000),
+		("Jeu._distribue double-{}".format(_pipMax), functools.partial(jeuDistribue, _pipMax), 5000),
+		("parties complètes double-{}".format(_pipMax),
+			functools.partial(partiesCompletes, _pipMax), 500),
+	)
+del _pipMax
+
+def mesure(fabrique, n, essais = 5, graine = 0):
+	""" renvoie le meilleur débit, en opérations par seconde, sur plusieurs essais """
+	meilleur = 0.0
+	for essai in range(essais):
+		random.seed(graine)
+		f = fabrique()
+		debut = time.perf_counter()
+		f(n)
+		duree = time.perf_counter() - debut
+		meilleur = max(meilleur, n / duree)
+	return meilleur
+
+def main():
+	parser = argparse.ArgumentParser(description = "Mesures de performance du modèle")
+	parser.add_argument("mesures", nargs = "*", help = "mesures à faire, toutes par défaut")
+	parser.add_argument("-r", "--reference", action = "store_true",
+		help = "enregistre les résultats comme nouvelle référence")
+	parser.add_argument("-f", "--fichier", default = REFERENCE, help = "fichier de référence")
+	# sur une machine partagée, le meilleur débit de 5 essais varie d'un
+	# lancement à l'autre jusqu'à un facteur 1.5, soit une baisse apparente
+	# d'un tiers : la tolérance par défaut laisse passer ce bruit, et ne
+	# signale que les débits tombés sous la moitié de la référence
+	parser.add_argument("-t", "--tolerance", type = float, default = 0.5,
+		help = "baisse de débit tolérée par rapport à la référence (0.5 : moitié)")
+	parser.add_argument("-e", "--essais", type = int, default = 5)
+	parser.add_argument("-s", "--graine", type = int, default = 0)
+	args = parser.parse_args()
+
+	reference = dict()
+	if os.path.exists(args.fichier):
+		with open(args.fichier) as fichier: reference = json.load(fichier)
+
+	resultats = dict()
+	regressions = list()
+	for nom, fabrique, n in MESURES:
+		if args.mesures and nom not in args.mesures: continue
+		debit = mesure(fabrique, n, args.essais, args.graine)
+		resultats[nom] = debit
+		ligne = "{:<36} {:>14.0f} op/s".format(nom, debit)
+		if nom in reference:
+			rapport = debit / reference[nom]
+			ligne += " | x{:.2f}".format(rapport)
+			if rapport < 1 - args.tolerance:
+				ligne += " | RÉGRESSION"
+				regressions.append(nom)
+		print(ligne)
+
+	if args.reference:
+		reference.update((nom, round(debit)) for nom, debit in resultats.items())
+		with open(args.fichier, "w") as fichier:
+			json.dump(reference, fichier, indent = 2, sort_keys = True)
+			fichier.write("\n")
+		print("référence enregistrée dans", args.fichier)
+	elif regressions:
+		print("{} régression(s) : {}".format(len(regressions), ", ".join(regressions)))
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
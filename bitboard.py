@@ -0,0 +1,432 @@
+# auteur: Ben Kabongo Buzangu
+# représentation du jeu par masques de bits
+
+""" Jeu de Domino - Bitboard
+chacun des 28 dominos du jeu a son bit, si bien qu'un ensemble de dominos
+tient dans un entier de 28 bits, dont le bit n est à 1 ssi le domino
+correspondant est dans l'ensemble.
+une main, la pioche et les dominos posés sont de tels masques ; le plateau
+se résume à ses deux extrêmités et au masque des dominos posés.
+un plateau vide a pour extrêmités VIDE, qui accepte n'importe quel domino.
+la génération des coups se fait alors par un simple ET logique.
+les dominos d'un masque n'ont pas de sens : ils sont posés sur le plateau
+comme le serait le domino (petite extrêmité, grande extrêmité) """
+
+import argparse
+import array
+import random
+import sys
+import time
+
+import model
+
+NB_DOMINOS = 28
+TOUS = (1 << NB_DOMINOS) - 1
+# extrêmité d'un plateau vide
+VIDE = 7
+
+# les bits sont rangés par somme croissante (puis par numéro de domino),
+# si bien que le plus grand domino d'un masque est son bit de poids fort
+# DOMINOS[n] : extrêmités (petite, grande) du domino au bit n
+# IDS[n] : numéro model.Domino.getId du domino au bit n, BITS[id] : l'inverse
+_dominos = sorted(((low + high, model.Domino(low, high).getId(), low, high)
+	for high in range(7) for low in range(high + 1)))
+DOMINOS = [(low, high) for somme, id, low, high in _dominos]
+SOMMES = [somme for somme, id, low, high in _dominos]
+IDS = [id for somme, id, low, high in _dominos]
+BITS = [0] * NB_DOMINOS
+for _n, _id in enumerate(IDS): BITS[_id] = _n
+del _dominos, _n, _id
+
+# PIPS[p] : masque des dominos ayant p pour extrêmité, PIPS[VIDE] : tous les dominos
+PIPS = [0] * (VIDE + 1)
+for _n, (_low, _high) in enumerate(DOMINOS):
+	PIPS[_low] |= 1 << _n
+	PIPS[_high] |= 1 << _n
+PIPS[VIDE] = TOUS
+del _n, _low, _high
+
+# tables des chemins critiques, indexées par left << 3 | right :
+# JOUABLES[e] masque des dominos jouables sur les extrêmités e, GRANDS[e] le
+# même sans le double zéro, et _JOUE[n << 6 | e] extrêmités après la pose de n
+JOUABLES = [PIPS[_left] | PIPS[_right] for _left in range(8) for _right in range(8)]
+GRANDS = [_masque & ~1 for _masque in JOUABLES]
+BIT = [1 << _n for _n in range(NB_DOMINOS)]
+
+def bits(masque):
+	""" renvoie la liste des bits à 1 d'un masque, du plus faible au plus fort """
+	ids = list()
+	while masque:
+		bit = masque & -masque
+		ids.append(bit.bit_length() - 1)
+		masque ^= bit
+	return ids
+
+def hasard(masque, rng = random):
+	""" renvoie un bit à 1 du masque, tiré au hasard """
+	k = int(rng.random() * masque.bit_count())
+	for i in range(k): masque &= masque - 1
+	return (masque & -masque).bit_length() - 1
+
+def compte(masque):
+	""" renvoie le nombre de dominos d'un masque """
+	return masque.bit_count()
+
+def points(masque):
+	""" renvoie la somme des points des dominos d'un masque """
+	return sum(SOMMES[n] for n in bits(masque))
+
+def coups(main, left, right):
+	""" renvoie le masque des dominos de la main jouables sur le plateau """
+	return main & JOUABLES[left << 3 | right]
+
+def joue(n, left, right):
+	""" pose le domino n et renvoie les nouvelles extrêmités du plateau
+	le domino est posé comme model.Plateau.jouer poserait model.Domino(low, high) """
+	low, high = DOMINOS[n]
+	if left == VIDE: return low, high
+	if low == left: return high, right
+	if low == right: return left, high
+	if high == left: return low, right
+	return left, low
+
+_JOUE = [joue(_n, _left, _right) if _left < VIDE or _right == VIDE else None
+	for _n in range(NB_DOMINOS) for _left in range(8) for _right in range(8)]
+
+# ----------------------------------------- stratégies
+
+def aleatoire(main, left, right, rng = random):
+	""" renvoie un domino jouable au hasard, None si aucun ne l'est """
+	jouables = main & JOUABLES[left << 3 | right]
+	if jouables == 0: return None
+	return hasard(jouables, rng)
+
+def grand(main, left, right, rng = random):
+	""" renvoie le plus grand domino jouable, None si aucun ne l'est
+	le même que model.ordiGrand : à somme égale, celui de plus grand numéro,
+	et jamais le double zéro """
+	jouables = main & GRANDS[left << 3 | right]
+	if jouables == 0: return None
+	return jouables.bit_length() - 1
+
+STRATEGIES = {
+	"facile": aleatoire,
+	"difficile": grand,
+}
+
+# ----------------------------------------- par lots
+# les fonctions par lots traitent n positions en quelques opérations sur des
+# entiers : un lot de n masques les met bout à bout dans un entier de 32n
+# bits, une voie de 32 bits par masque, et chaque opération sur cet entier
+# agit sur toutes les voies à la fois. les extrêmités des n positions sont
+# données par les n octets left << 3 | right
+
+def _tables(masques):
+	""" tables de bytes.translate : la table k donne, pour l'octet e des
+	extrêmités, l'octet k du masque masques[e] """
+	return [bytes((masques[e & 63] >> 8 * k) & 255 for e in range(256)) for k in range(4)]
+
+_TABLES_JOUABLES = _tables(JOUABLES)
+_TABLES_GRANDS = _tables(GRANDS)
+# octet v -> nombre de ses bits à 1
+_BITS_OCTET = bytes(v.bit_count() for v in range(256))
+# octet v -> v - 1, pour passer du nombre de bits au numéro du bit de poids fort
+_MOINS_UN = bytes((v - 1) & 255 for v in range(256))
+
+# masques du remplissage sous le bit de poids fort, par nombre de voies
+_voies = dict()
+
+def _remplissage(n):
+	""" renvoie les masques du remplissage de n voies sous leur bit de poids
+	fort, avec leurs décalages """
+	if n not in _voies:
+		def repete(motif): return int.from_bytes(motif.to_bytes(4, "little") * n, "little")
+		_voies[n] = [(k, repete(0xffffffff >> k)) for k in (1, 2, 4, 8, 16)]
+	return _voies[n]
+
+def _masques(tables, extremites):
+	""" renvoie le lot des masques des tables pour les octets d'extrêmités :
+	l'octet k de chaque voie est lu dans la table k """
+	voies = bytearray(4 * len(extremites))
+	for k, table in enumerate(tables):
+		voies[k::4] = extremites.translate(table)
+	return int.from_bytes(voies, "little")
+
+def lot(masques):
+	""" renvoie le lot des masques (liste ou array("I")) """
+	masques = array.array("I", masques)
+	if sys.byteorder == "big": masques.byteswap()
+	return int.from_bytes(masques, "little")
+
+def masquesLot(lot, n):
+	""" renvoie l'array("I") des n masques du lot """
+	masques = array.array("I", lot.to_bytes(4 * n, "little"))
+	if sys.byteorder == "big": masques.byteswap()
+	return masques
+
+def coupsLot(mains, extremites):
+	""" coups de n positions : mains est le lot des n mains, extremites leurs
+	n octets d'extrêmités ; renvoie le lot des masques des dominos jouables """
+	return mains & _masques(_TABLES_JOUABLES, extremites)
+
+def grandsLot(mains, extremites):
+	""" grand sur n positions, données comme pour coupsLot
+	renvoie l'array("b") des plus grands dominos jouables, -1 là où aucun ne
+	l'est """
+	n = len(extremites)
+	x = mains & _masques(_TABLES_GRANDS, extremites)
+	# chaque voie est remplie de 1 sous son bit de poids fort h ...
+	for k, masque in _remplissage(n): x |= (x >> k) & masque
+	# ... si bien que son nombre de bits à 1 vaut h + 1 : compté par octet,
+	# puis sommé sur les quatre octets de chaque voie (au plus 32, sans retenue)
+	octets = x.to_bytes(4 * n, "little").translate(_BITS_OCTET)
+	x = sum(int.from_bytes(octets[k::4], "little") for k in range(4))
+	return array.array("b", x.to_bytes(n, "little").translate(_MOINS_UN))
+
+# ----------------------------------------- parties
+
+def _melange(rng):
+	""" renvoie les bits des dominos du jeu complet, mélangés """
+	return sorted(range(NB_DOMINOS), key = lambda n, alea = rng.random: alea())
+
+def distribue(rng = random, taille = 8):
+	""" distribue le jeu complet : renvoie les masques des deux mains
+	de taille dominos et celui de la pioche """
+	ids = _melange(rng)
+	main1 = sum(map(BIT.__getitem__, ids[:taille]))
+	main2 = sum(map(BIT.__getitem__, ids[taille:2 * taille]))
+	return main1, main2, TOUS & ~(main1 | main2)
+
+def partie(strategie1 = aleatoire, strategie2 = grand, rng = random):
+	""" joue une partie complète, avec les règles de simulation.Simulation
+	la pioche est la suite du jeu mélangé : piocher revient à prendre le
+	domino suivant, ce qui équivaut à tirer au hasard parmi les dominos
+	restants (comme vectorise.simule)
+	renvoie (score1, score2, tours) """
+	ids = _melange(rng)
+	main1 = sum(map(BIT.__getitem__, ids[:8]))
+	main2 = sum(map(BIT.__getitem__, ids[8:16]))
+	sommet = 16
+	left = right = VIDE
+	score1 = score2 = tours = 0
+	# variables locales des chemins critiques
+	bit, sommes, poses = BIT, SOMMES, _JOUE
+	while True:
+		tours += 1
+		isPioche = True
+
+		n = strategie1(main1, left, right, rng)
+		if n is None:
+			if sommet < NB_DOMINOS:
+				main1 |= bit[ids[sommet]]
+				sommet += 1
+			else: isPioche = False
+		else:
+			main1 ^= bit[n]
+			left, right = poses[n << 6 | left << 3 | right]
+			score1 += sommes[n]
+
+		n = strategie2(main2, left, right, rng)
+		if n is None:
+			if sommet < NB_DOMINOS:
+				main2 |= bit[ids[sommet]]
+				sommet += 1
+			else: isPioche = False
+		else:
+			main2 ^= bit[n]
+			left, right = poses[n << 6 | left << 3 | right]
+			score2 += sommes[n]
+
+		if not isPioche or main1 == 0 or main2 == 0:
+			break
+	return score1, score2, tours
+
+# ----------------------------------------- conversion avec le modèle objet
+
+def depuisMain(main):
+	""" renvoie le masque d'une model.Main """
+	masque = 0
+	for domino in main.getDominos():
+		bit = 1 << BITS[domino.getId()]
+		if masque & bit:
+			raise Exception("Le domino {} est en double dans la main".format(domino))
+		masque |= bit
+	return masque
+
+def versMain(masque, plateau = None):
+	""" renvoie une model.Main contenant les dominos d'un masque """
+	main = model.Main(plateau)
+	for n in bits(masque):
+		main.addDomino(model.Domino(*DOMINOS[n]))
+	return main
+
+def depuisPlateau(plateau):
+	""" renvoie (left, right, joues) pour un model.Plateau """
+	joues = 0
+	for domino in plateau.getDominos():
+		joues |= 1 << BITS[domino.getId()]
+	if joues == 0: return VIDE, VIDE, 0
+	left, right = plateau.getExtremites()
+	return left, right, joues
+
+def chaine(left, right, joues):
+	""" renvoie une chaîne de dominos orientés, de gauche à droite, qui
+	utilise tous les dominos posés et va de l'extrêmité left à right
+	c'est un chemin eulérien du graphe dont les dominos sont les arêtes """
+	if joues == 0: return list()
+	adjacents = [list() for p in range(7)]
+	for n in bits(joues):
+		low, high = DOMINOS[n]
+		adjacents[low].append(n)
+		if high != low: adjacents[high].append(n)
+
+	# algorithme de Hierholzer
+	restant = joues
+	pile = [(left, None)]
+	chemin = list()
+	while pile:
+		p = pile[-1][0]
+		voisins = adjacents[p]
+		while voisins and not (restant >> voisins[-1]) & 1:
+			voisins.pop()
+		if voisins:
+			n = voisins.pop()
+			restant ^= 1 << n
+			low, high = DOMINOS[n]
+			pile.append((high if low == p else low, n))
+		else:
+			chemin.append(pile.pop())
+
+	if restant or chemin[0][0] != right:
+		raise Exception("Aucune chaîne ne relie {} à {}".format(left, right))
+	dominos = list()
+	p = left
+	for q, n in reversed(chemin[:-1]):
+		dominos.append(model.Domino(p, q))
+		p = q
+	return dominos
+
+def versPlateau(left, right, joues, plateau = None):
+	""" renvoie un model.Plateau de mêmes extrêmités et dominos posés """
+	if plateau is None: plateau = model.Plateau()
+	plateau.setDominos(chaine(left, right, joues))
+	return plateau
+
+class Etat:
+	""" état complet d'une partie sous forme de masques """
+	__slots__ = ("mainJoueur", "mainOrdi", "pioche", "left", "right", "joues")
+
+	def __init__(self, mainJoueur, mainOrdi, pioche, left = VIDE, right = VIDE, joues = 0):
+		self.mainJoueur = mainJoueur
+		self.mainOrdi = mainOrdi
+		self.pioche = pioche
+		self.left = left
+		self.right = right
+		self.joues = joues
+
+	@classmethod
+	def depuisJeu(cls, jeu):
+		""" construit l'état d'un model.Jeu """
+		left, right, joues = depuisPlateau(jeu._plateau)
+		return cls(depuisMain(jeu._mainJoueur), depuisMain(jeu._mainOrdi),
+			depuisMain(jeu._pioche), left, right, joues)
+
+	def versJeu(self, jeu):
+		""" recopie l'état dans un model.Jeu """
+		versPlateau(self.left, self.right, self.joues, jeu._plateau)
+		for masque, main in ((self.mainJoueur, jeu._mainJoueur),
+			(self.mainOrdi, jeu._mainOrdi), (self.pioche, jeu._pioche)):
+			main.reset()
+			for n in bits(masque):
+				main.addDomino(model.Domino(*DOMINOS[n]))
+		return jeu
+
+# ----------------------------------------- mesure
+
+def _mesure(fonction, n):
+	""" renvoie le nombre d'opérations par seconde de fonction(n) """
+	debut = time.perf_counter()
+	fonction(n)
+	return n / (time.perf_counter() - debut)
+
+def main():
+	import simulation
+
+	parser = argparse.ArgumentParser(description = "Bitboard contre modèle objet")
+	parser.add_argument("-n", "--parties", type = int, default = 20000)
+	parser.add_argument("-s", "--graine", type = int, default = 0)
+	# la machine est bruitée : chaque côté garde le meilleur de ses essais,
+	# alternés avec ceux de l'autre
+	parser.add_argument("-e", "--essais", type = int, default = 3)
+	args = parser.parse_args()
+
+	# positions de milieu de partie tirées au hasard, sous les deux formes
+	rng = random.Random(args.graine)
+	masques, objets = list(), list()
+	for i in range(1000):
+		main1, main2, pioche = distribue(rng)
+		left, right = rng.randrange(7), rng.randrange(7)
+		plateau = model.Plateau()
+		plateau.setDominos([model.Domino(left, right)])
+		masques.append((main1, left, right))
+		objets.append((plateau, versMain(main1)))
+
+	# les mêmes positions en un lot, pour coupsLot et grandsLot
+	mains = lot(main for main, left, right in masques)
+	extremites = bytes(left << 3 | right for main, left, right in masques)
+
+	# de part et d'autre, un appel de fonction par position
+	def objetsCoups(n):
+		for i in range(n // 1000):
+			for plateau, main in objets:
+				plateau.isJouableMain(main)
+
+	def masquesCoups(n):
+		for i in range(n // 1000):
+			for main, left, right in masques:
+				coups(main, left, right)
+
+	def lotsCoups(n):
+		for i in range(n // 1000):
+			coupsLot(mains, extremites)
+
+	def objetsGrand(n):
+		for i in range(n // 1000):
+			for plateau, main in objets:
+				model.ordiGrand(plateau, main)
+
+	def masquesGrand(n):
+		for i in range(n // 1000):
+			for main, left, right in masques:
+				grand(main, left, right)
+
+	def lotsGrand(n):
+		for i in range(n // 1000):
+			grandsLot(mains, extremites)
+
+	def objetsParties(n):
+		random.seed(args.graine)
+		for resultat in simulation.Simulation("facile", "difficile").parties(n): pass
+
+	def masquesParties(n):
+		rng = random.Random(args.graine)
+		for i in range(n): partie(aleatoire, grand, rng)
+
+	# le critère est un facteur 10 sur le modèle objet ; les parties
+	# complètes, où le mélange et la boucle de jeu dominent, ne l'atteignent pas
+	for nom, fonctionObjets, fonctionMasques, n in (
+		("génération des coups", objetsCoups, masquesCoups, 100 * args.parties),
+		("coups par lots", objetsCoups, lotsCoups, 100 * args.parties),
+		("plus grand domino", objetsGrand, masquesGrand, 100 * args.parties),
+		("plus grand par lots", objetsGrand, lotsGrand, 100 * args.parties),
+		("parties complètes", objetsParties, masquesParties, args.parties)):
+		vitesseObjets = vitesseMasques = 0
+		for essai in range(args.essais):
+			vitesseObjets = max(vitesseObjets, _mesure(fonctionObjets, n))
+			vitesseMasques = max(vitesseMasques, _mesure(fonctionMasques, n))
+		facteur = vitesseMasques / vitesseObjets
+		print("{:<22} objets {:>12.0f}/s | masques {:>12.0f}/s | x{:.1f}{}".format(
+			nom, vitesseObjets, vitesseMasques, facteur, "" if facteur >= 10 else " (< x10)"))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,96 @@
+# auteur: Ben Kabongo Buzangu
+# générateur de charge pour le serveur de parties
+
+""" Jeu de Domino - Charge
+ouvre de nombreuses connexions simultanées sur un serveur.Serveur ;
+chaque client joue au hasard un domino jouable, ou pioche, et mesure
+la latence de chaque coup : du moment où la commande est envoyée à
+celui où la réponse est entièrement lue.
+le bilan donne le débit de coups et les latences médiane (p50) et p99 """
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import serveur
+
+async def _litBloc(lecteur):
+	""" lit une réponse du serveur et renvoie ses lignes """
+	lignes = list()
+	while True:
+		ligne = await lecteur.readline()
+		if not ligne: raise ConnectionError("Connexion fermée par le serveur")
+		ligne = ligne.decode().rstrip("\n")
+		if ligne == "": return lignes
+		lignes.append(ligne)
+
+def _choisit(lignes, rng):
+	""" renvoie la commande d'un coup au hasard selon l'état de la partie """
+	for ligne in lignes:
+		if ligne.startswith("jouables"):
+			jouables = ligne.split()[1:]
+			if jouables: return rng.choice(jouables)
+	return "p"
+
+async def client(coups, latences, bilan, rng, hote = serveur.HOTE, port = serveur.PORT,
+	unix = None, adversaire = None):
+	""" joue coups coups sur une connexion, en ajoutant leurs latences
+	(en secondes) à la liste latences, et les parties finies à bilan """
+	if unix is not None: lecteur, ecrivain = await asyncio.open_unix_connection(unix)
+	else: lecteur, ecrivain = await asyncio.open_connection(hote, port)
+	try:
+		lignes = await _litBloc(lecteur)
+		if adversaire is not None:
+			ecrivain.write("n {}\n".format(adversaire).encode())
+			lignes = await _litBloc(lecteur)
+		for i in range(coups):
+			commande = _choisit(lignes, rng)
+			debut = time.perf_counter()
+			ecrivain.write((commande + "\n").encode())
+			lignes = await _litBloc(lecteur)
+			latences.append(time.perf_counter() - debut)
+			if any(ligne.startswith("erreur") for ligne in lignes): bilan["erreurs"] += 1
+			if any(ligne.startswith("fin") for ligne in lignes): bilan["parties"] += 1
+		ecrivain.write(b"q\n")
+		await _litBloc(lecteur)
+	finally:
+		ecrivain.close()
+
+async def charge(connexions, coups, hote = serveur.HOTE, port = serveur.PORT, unix = None,
+	adversaire = None, graine = None):
+	""" lance connexions clients simultanés de coups coups chacun
+	renvoie (latences, bilan, durée) """
+	rng = random.Random(graine)
+	latences = list()
+	bilan = {"parties": 0, "erreurs": 0}
+	debut = time.perf_counter()
+	await asyncio.gather(*(client(coups, latences, bilan, random.Random(rng.getrandbits(64)),
+		hote, port, unix, adversaire) for i in range(connexions)))
+	return latences, bilan, time.perf_counter() - debut
+
+def main():
+	parser = argparse.ArgumentParser(description = "Générateur de charge pour le serveur de dominos")
+	parser.add_argument("-c", "--connexions", type = int, default = 1000,
+		help = "nombre de clients simultanés")
+	parser.add_argument("-n", "--coups", type = int, default = 50, help = "coups par client")
+	parser.add_argument("--hote", default = serveur.HOTE)
+	parser.add_argument("--port", type = int, default = serveur.PORT)
+	parser.add_argument("-u", "--unix", default = None, help = "chemin d'une socket Unix")
+	parser.add_argument("-a", "--adversaire", default = None,
+		help = "stratégie de l'ordinateur, celle du serveur par défaut")
+	parser.add_argument("-s", "--graine", type = int, default = None)
+	args = parser.parse_args()
+
+	latences, bilan, duree = asyncio.run(charge(args.connexions, args.coups, args.hote,
+		args.port, args.unix, args.adversaire, args.graine))
+	centiles = statistics.quantiles(latences, n = 100)
+	print("{} clients | {} coups en {:.2f} s : {:.0f} coups/s".format(
+		args.connexions, len(latences), duree, len(latences) / duree))
+	print("{} parties finies | {} erreurs".format(bilan["parties"], bilan["erreurs"]))
+	print("latence p50 {:.2f} ms | p99 {:.2f} ms | max {:.2f} ms".format(
+		1000 * centiles[49], 1000 * centiles[98], 1000 * max(latences)))
+
+if __name__ == "__main__":
+	main()
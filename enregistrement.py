@@ -0,0 +1,196 @@
+# auteur: Ben Kabongo Buzangu
+# enregistrement des parties dans un fichier binaire
+
+""" Jeu de Domino - Enregistrement
+un fichier de parties commence par un en-tête de taille fixe : la signature
+b"DOMR", la version du format, le nombre de stratégies nommées puis
+16 emplacements de 16 octets pour les noms des stratégies.
+suivent les parties, l'une après l'autre. chaque partie commence par
+12 octets : les numéros des deux stratégies, la taille des deux mains et
+de la pioche à la donne, un octet réservé, les deux scores finaux et le
+nombre de coups. viennent ensuite la donne (un octet par domino) puis
+les coups (deux octets par coup).
+un domino est codé par model.Domino.getCode, et garde donc son sens :
+un octet suffit jusqu'au double-15. les fichiers de la version 1 codaient
+les dominos du double-six par 7 * gauche + droite, et se lisent encore.
+un coup est codé par le joueur (bit 0) et le type de coup (bits 1 et 2 :
+0 pour une pose, 1 pour une pioche, 2 pour une passe), suivis du domino
+posé ou pioché, 255 pour une passe.
+la lecture se fait par projection du fichier en mémoire (mmap) : les
+parties sont décodées une à une, sans charger le fichier """
+
+import collections
+import mmap
+import os
+import struct
+
+import model
+
+SIGNATURE = b"DOMR"
+VERSION = 2
+# base du code des dominos selon la version
+_BASES = {1: 7, 2: model.PIP_MAX + 1}
+NB_NOMS = 16
+TAILLE_NOM = 16
+
+_ENTETE = struct.Struct("<4sBB")
+TAILLE_ENTETE = _ENTETE.size + NB_NOMS * TAILLE_NOM
+_PARTIE = struct.Struct("<BBBBBBhhH")
+
+POSE, PIOCHE, PASSE = 0, 1, 2
+_TYPES = {model.PIOCHE: PIOCHE, model.PASSE: PASSE}
+_COUPS = {PIOCHE: model.PIOCHE, PASSE: model.PASSE}
+_AUCUN = 255
+
+# partie lue dans un fichier
+# strategie1, strategie2 : noms des stratégies des deux joueurs
+# main1, main2, pioche : listes de model.Domino à la donne
+# coups : liste de (joueur, coup, domino), coup étant le domino posé,
+# model.PIOCHE ou model.PASSE, et domino le domino posé ou pioché
+# score1, score2 : scores finaux
+PartieLue = collections.namedtuple("PartieLue",
+	("strategie1", "strategie2", "main1", "main2", "pioche", "coups", "score1", "score2"))
+
+def _domino(code, base = model.PIP_MAX + 1):
+	""" renvoie le domino d'un code """
+	return model.Domino(code // base, code % base)
+
+class Enregistreur:
+	""" écrit des parties à la fin d'un fichier, créé s'il n'existe pas """
+	def __init__(self, chemin):
+		existe = os.path.exists(chemin) and os.path.getsize(chemin) > 0
+		self._fichier = open(chemin, "r+b" if existe else "w+b")
+		if existe:
+			version, self._noms = _litEntete(self._fichier.read(TAILLE_ENTETE))
+			if version != VERSION:
+				raise Exception("On ne peut ajouter des parties qu'à un fichier de la version {}".format(
+					VERSION))
+		else:
+			self._noms = list()
+			self._ecritEntete()
+		self._fichier.seek(0, os.SEEK_END)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.fermer()
+
+	def fermer(self):
+		""" ferme le fichier """
+		self._fichier.close()
+
+	def _ecritEntete(self):
+		""" (ré)écrit l'en-tête du fichier """
+		noms = b"".join(nom.encode("utf-8").ljust(TAILLE_NOM, b"\0") for nom in self._noms)
+		self._fichier.seek(0)
+		self._fichier.write(_ENTETE.pack(SIGNATURE, VERSION, len(self._noms))
+			+ noms.ljust(NB_NOMS * TAILLE_NOM, b"\0"))
+		self._fichier.seek(0, os.SEEK_END)
+
+	def _numero(self, nom):
+		""" renvoie le numéro d'une stratégie, en l'ajoutant à l'en-tête au besoin """
+		if nom not in self._noms:
+			if len(self._noms) >= NB_NOMS:
+				raise Exception("Le fichier ne peut nommer que {} stratégies".format(NB_NOMS))
+			if len(nom.encode("utf-8")) > TAILLE_NOM:
+				raise Exception("Le nom {} est trop long".format(nom))
+			self._noms.append(nom)
+			self._ecritEntete()
+		return self._noms.index(nom)
+
+	def ecrit(self, strategies, donne, coups, scores):
+		""" écrit une partie
+		strategies : noms des stratégies des deux joueurs
+		donne : dominos des deux mains et de la pioche à la donne
+		coups : liste de (joueur, coup, domino) comme PartieLue.coups
+		scores : scores finaux des deux joueurs """
+		main1, main2, pioche = donne
+		octets = bytearray(_PARTIE.pack(self._numero(strategies[0]), self._numero(strategies[1]),
+			len(main1), len(main2), len(pioche), 0, scores[0], scores[1], len(coups)))
+		for dominos in donne:
+			octets.extend(domino.getCode() for domino in dominos)
+		for joueur, coup, domino in coups:
+			octets.append(joueur | _TYPES.get(coup, POSE) << 1)
+			octets.append(_AUCUN if domino is None else domino.getCode())
+		self._fichier.write(octets)
+
+	def ecritJeu(self, jeu, strategies, donne):
+		""" écrit la partie d'un model.Jeu joué avec appliqueCoup """
+		coups = [(joueur, coup, domino) for joueur, coup, id, cote, domino in jeu._historique]
+		self.ecrit(strategies, donne, coups, jeu.getScores())
+
+def _litEntete(octets):
+	""" vérifie l'en-tête d'un fichier et renvoie sa version
+	et la liste des noms de stratégies """
+	signature, version, nombre = _ENTETE.unpack_from(octets)
+	if signature != SIGNATURE or version not in _BASES:
+		raise Exception("Ce fichier n'est pas un enregistrement de parties")
+	noms = list()
+	for i in range(nombre):
+		debut = _ENTETE.size + i * TAILLE_NOM
+		noms.append(octets[debut:debut + TAILLE_NOM].rstrip(b"\0").decode("utf-8"))
+	return version, noms
+
+class Lecteur:
+	""" lit les parties d'un fichier projeté en mémoire """
+	def __init__(self, chemin):
+		self._fichier = open(chemin, "rb")
+		self._mmap = mmap.mmap(self._fichier.fileno(), 0, access = mmap.ACCESS_READ)
+		version, self._noms = _litEntete(self._mmap[:TAILLE_ENTETE])
+		self._base = _BASES[version]
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.fermer()
+
+	def __len__(self):
+		return len(self._mmap)
+
+	def __iter__(self):
+		return self.parties()
+
+	def fermer(self):
+		""" ferme le fichier """
+		self._mmap.close()
+		self._fichier.close()
+
+	def getNoms(self):
+		""" renvoie les noms des stratégies du fichier """
+		return list(self._noms)
+
+	def positions(self, debut = TAILLE_ENTETE, fin = None):
+		""" générateur des positions des parties entre debut et fin,
+		en ne lisant que leur en-tête """
+		if fin is None: fin = len(self._mmap)
+		position = debut
+		while position < fin:
+			yield position
+			n1, n2, np, reserve, score1, score2, nbCoups = _PARTIE.unpack_from(self._mmap, position)[2:]
+			position += _PARTIE.size + n1 + n2 + np + 2 * nbCoups
+
+	def lit(self, position):
+		""" décode la partie à cette position """
+		s1, s2, n1, n2, np, reserve, score1, score2, nbCoups = _PARTIE.unpack_from(self._mmap, position)
+		position += _PARTIE.size
+		donne = self._mmap[position:position + n1 + n2 + np]
+		position += n1 + n2 + np
+		base = self._base
+		main1 = [_domino(code, base) for code in donne[:n1]]
+		main2 = [_domino(code, base) for code in donne[n1:n1 + n2]]
+		pioche = [_domino(code, base) for code in donne[n1 + n2:]]
+		octets = self._mmap[position:position + 2 * nbCoups]
+		coups = list()
+		for i in range(0, len(octets), 2):
+			type, code = octets[i] >> 1, octets[i + 1]
+			# 255 est aussi le code du double-15 : c'est le type qui signale une passe
+			domino = None if type == PASSE else _domino(code, base)
+			coups.append((octets[i] & 1, _COUPS.get(type, domino), domino))
+		return PartieLue(self._noms[s1], self._noms[s2], main1, main2, pioche, coups, score1, score2)
+
+	def parties(self, debut = TAILLE_ENTETE, fin = None):
+		""" générateur des parties entre les positions debut et fin """
+		for position in self.positions(debut, fin):
+			yield self.lit(position)
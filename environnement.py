@@ -0,0 +1,284 @@
+# auteur: Ben Kabongo Buzangu
+# environnement pas à pas pour entraîner des politiques
+
+""" Jeu de Domino - Environnement
+un agent joue la main du joueur contre une stratégie de l'ordinateur,
+coup par coup : reset commence une partie, step applique le coup de
+l'agent puis celui de l'adversaire. les règles sont celles de
+simulation.Simulation, l'agent jouant en premier à chaque tour.
+une action est le numéro (model.Domino.getId) du domino à poser, ou
+nbDominos pour piocher, ce qui revient à passer quand la pioche est vide.
+le domino est posé comme le pose model.Plateau.pose. comme dans une
+simulation, on ne pioche que si l'on n'a aucun domino jouable : le masque
+des actions permises ne contient que les dominos jouables, ou la pioche.
+un ensemble de dominos est donné par un entier dont le bit n vaut 1 ssi
+le domino de numéro n en fait partie.
+la récompense d'un pas est l'écart de points marqués pendant le tour :
+leur somme sur une partie est l'écart des scores finaux.
+Environnements fait avancer plusieurs environnements d'un seul appel,
+dans le processus courant ou répartis entre des processus fils, et
+renvoie des tableaux numpy """
+
+import argparse
+import collections
+import multiprocessing
+import time
+
+import numpy
+
+import model
+import simulation
+import strategies
+
+# observation de l'agent
+# main, joues : ensembles de ses dominos et des dominos posés
+# left, right : extrêmités du plateau, pipMax + 1 pour un plateau vide
+# nbAdverse, nbPioche : tailles de la main adverse et de la pioche
+Observation = collections.namedtuple("Observation",
+	("main", "joues", "left", "right", "nbAdverse", "nbPioche"))
+
+class Environnement:
+	""" partie de l'agent contre une stratégie de l'ordinateur
+	adversaire : nom d'une stratégie de strategies, ou la stratégie elle-même """
+	def __init__(self, adversaire = "difficile", taille = 8, pipMax = 6, graine = None):
+		self._jeu = simulation.Simulation(adversaire, adversaire, taille = taille,
+			pipMax = pipMax, graine = graine)
+		self._dominos = model.jeuComplet(pipMax)
+		self._vide = pipMax + 1
+		self._fini = True
+
+	def getNbActions(self):
+		""" renvoie le nombre d'actions : un par domino du jeu, plus la pioche """
+		return len(self._dominos) + 1
+
+	def _observe(self):
+		""" renvoie l'observation et le masque des actions permises """
+		jeu = self._jeu
+		left, right = jeu._plateau.getExtremites()
+		if left is None: left = right = self._vide
+		observation = Observation(self._main, self._joues, left, right,
+			len(jeu._mainOrdi), len(jeu._pioche))
+		masque = 0
+		for domino in jeu._plateau.isJouableMain(jeu._mainJoueur):
+			masque |= 1 << domino.getId()
+		if masque == 0: masque = 1 << len(self._dominos)
+		self._masque = masque
+		return observation, masque
+
+	def reset(self, graine = None):
+		""" commence une nouvelle partie et renvoie (observation, masque)
+		graine : repart d'un générateur initialisé par cette graine,
+		sinon le générateur de la partie précédente continue """
+		jeu = self._jeu
+		if graine is not None: jeu.setGraine(graine)
+		jeu._plateau.reset()
+		jeu._distribue(jeu._newDistribution())
+		self._main = 0
+		for domino in jeu._mainJoueur.getDominos():
+			self._main |= 1 << domino.getId()
+		self._joues = 0
+		self._fini = False
+		return self._observe()
+
+	def step(self, action):
+		""" joue l'action de l'agent puis le coup de l'adversaire
+		renvoie (observation, masque, récompense, fini) """
+		if self._fini:
+			raise Exception("La partie est finie : il faut appeler reset")
+		if not (self._masque >> action) & 1:
+			raise Exception("L'action {} n'est pas permise".format(action))
+		jeu = self._jeu
+		historique = jeu._historique
+		debut = len(historique)
+		scores = jeu.getScores()
+
+		# la dernière action est la pioche, ou la passe si la pioche est vide
+		isPioche = jeu.joue(0, self._dominos[action] if action < len(self._dominos) else None)
+		isPioche = jeu._tour(1, jeu._strategie2) and isPioche
+
+		for joueur, coup, id, cote, domino in historique[debut:]:
+			if domino is None: continue
+			bit = 1 << domino.getId()
+			if coup == model.PIOCHE:
+				if joueur == 0: self._main |= bit
+			else:
+				self._joues |= bit
+				if joueur == 0: self._main ^= bit
+
+		self._fini = jeu.isFinie(isPioche)
+		score1, score2 = jeu.getScores()
+		recompense = (score1 - scores[0]) - (score2 - scores[1])
+		observation, masque = self._observe()
+		return observation, masque, recompense, self._fini
+
+	def getScores(self):
+		""" renvoie les scores de l'agent et de l'adversaire """
+		return self._jeu.getScores()
+
+# ----------------------------------------- environnements vectorisés
+
+def _travailleur(connexion, n, adversaire, taille, pipMax):
+	""" fait avancer n environnements dans un processus fils,
+	selon les ordres reçus par connexion """
+	groupe = _Groupe(n, adversaire, taille, pipMax)
+	while True:
+		ordre, arguments = connexion.recv()
+		if ordre == "reset": connexion.send(groupe.reset(arguments))
+		elif ordre == "step": connexion.send(groupe.step(arguments))
+		else: break
+	connexion.close()
+
+class _Groupe:
+	""" environnements avancés ensemble dans un même processus, qui
+	renvoient leurs résultats sous forme de tableaux (voir Environnements)
+	une partie finie recommence aussitôt : step renvoie alors la première
+	observation de la nouvelle partie, avec la récompense et fini de la
+	précédente """
+	def __init__(self, n, adversaire, taille, pipMax):
+		self._environnements = [Environnement(adversaire, taille, pipMax) for i in range(n)]
+		self._nbDominos = len(model.jeuComplet(pipMax))
+		self._octets = (self._nbDominos + 1 + 7) // 8
+
+	def _bits(self, ensembles):
+		""" convertit une liste d'ensembles en tableau de booléens de forme (n, d + 1) """
+		octets = b"".join(e.to_bytes(self._octets, "little") for e in ensembles)
+		tableau = numpy.frombuffer(octets, dtype = numpy.uint8).reshape(len(ensembles), self._octets)
+		return numpy.unpackbits(tableau, axis = 1, bitorder = "little")[:, :self._nbDominos + 1]
+
+	def _tableaux(self, observations, masques):
+		""" met les observations et les masques sous forme de tableaux """
+		d = self._nbDominos
+		tableau = numpy.empty((len(observations), 2 * d + 4), dtype = numpy.int16)
+		tableau[:, :d] = self._bits([o.main for o in observations])[:, :d]
+		tableau[:, d:2 * d] = self._bits([o.joues for o in observations])[:, :d]
+		tableau[:, 2 * d:] = [o[2:] for o in observations]
+		return tableau, self._bits(masques).astype(bool)
+
+	def reset(self, graines):
+		resultats = [e.reset(g) for e, g in zip(self._environnements, graines)]
+		return self._tableaux([r[0] for r in resultats], [r[1] for r in resultats])
+
+	def step(self, actions):
+		observations, masques, recompenses, finis = list(), list(), list(), list()
+		for environnement, action in zip(self._environnements, actions):
+			observation, masque, recompense, fini = environnement.step(action)
+			if fini: observation, masque = environnement.reset()
+			observations.append(observation)
+			masques.append(masque)
+			recompenses.append(recompense)
+			finis.append(fini)
+		observations, masques = self._tableaux(observations, masques)
+		return (observations, masques, numpy.array(recompenses, dtype = numpy.int32),
+			numpy.array(finis, dtype = bool))
+
+class Environnements:
+	""" n environnements avancés d'un seul appel
+	processus : nombre de processus fils qui se partagent les environnements,
+	0 pour les faire avancer dans le processus courant
+	les observations sont renvoyées sous forme d'un tableau de forme (n, 2 * d + 4),
+	d étant le nombre de dominos du jeu : la main et les dominos posés
+	(un booléen par domino), puis left, right, nbAdverse et nbPioche ;
+	les masques sous forme d'un tableau de booléens de forme (n, d + 1) """
+	def __init__(self, n, adversaire = "difficile", taille = 8, pipMax = 6, processus = 0):
+		# une stratégie qui ne convient pas échoue ici plutôt que dans les processus fils
+		if not callable(adversaire): strategies.verifie(adversaire, pipMax)
+		self._n = n
+		self._nbDominos = len(model.jeuComplet(pipMax))
+		# par processus fils : connexion, nombre d'environnements, processus
+		self._connexions = list()
+		self._nombres = list()
+		self._processus = list()
+		if processus <= 0:
+			self._groupe = _Groupe(n, adversaire, taille, pipMax)
+			return
+		self._groupe = None
+		for i in range(processus):
+			nombre = n // processus + (1 if i < n % processus else 0)
+			if nombre == 0: continue
+			connexion, enfant = multiprocessing.Pipe()
+			p = multiprocessing.Process(target = _travailleur,
+				args = (enfant, nombre, adversaire, taille, pipMax), daemon = True)
+			p.start()
+			enfant.close()
+			self._connexions.append(connexion)
+			self._nombres.append(nombre)
+			self._processus.append(p)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.fermer()
+
+	def __len__(self):
+		return self._n
+
+	def getNbActions(self):
+		""" renvoie le nombre d'actions de chaque environnement """
+		return self._nbDominos + 1
+
+	def fermer(self):
+		""" arrête les processus fils """
+		for connexion in self._connexions:
+			connexion.send(("fin", None))
+			connexion.close()
+		for p in self._processus:
+			p.join()
+		self._connexions = list()
+		self._processus = list()
+
+	def _repartit(self, ordre, valeurs):
+		""" envoie à chaque processus sa part des valeurs, et rassemble les réponses """
+		debut = 0
+		for connexion, nombre in zip(self._connexions, self._nombres):
+			connexion.send((ordre, valeurs[debut:debut + nombre]))
+			debut += nombre
+		reponses = [connexion.recv() for connexion in self._connexions]
+		return tuple(numpy.concatenate(tableaux) for tableaux in zip(*reponses))
+
+	def reset(self, graine = None):
+		""" commence une partie dans chaque environnement
+		graine : l'environnement i repart du sous-flux i de cette graine
+		renvoie (observations, masques) """
+		graines = [None] * self._n
+		if graine is not None:
+			graines = [model.sousGraine(graine, i) for i in range(self._n)]
+		if self._groupe is not None: return self._groupe.reset(graines)
+		return self._repartit("reset", graines)
+
+	def step(self, actions):
+		""" joue une action dans chaque environnement
+		renvoie (observations, masques, récompenses, finis) """
+		actions = [int(a) for a in actions]
+		if self._groupe is not None: return self._groupe.step(actions)
+		return self._repartit("step", actions)
+
+def main():
+	parser = argparse.ArgumentParser(description = "Débit d'un agent au hasard dans des environnements")
+	parser.add_argument("pas", type = int, nargs = "?", default = 2000,
+		help = "nombre d'appels à step")
+	parser.add_argument("-n", "--environnements", type = int, default = 64)
+	parser.add_argument("-j", "--processus", type = int, default = 0)
+	parser.add_argument("--adversaire", default = "difficile")
+	parser.add_argument("-s", "--graine", type = int, default = 0)
+	args = parser.parse_args()
+
+	rng = numpy.random.default_rng(args.graine)
+	with Environnements(args.environnements, args.adversaire, processus = args.processus) as envs:
+		observations, masques = envs.reset(args.graine)
+		parties = points = 0
+		debut = time.perf_counter()
+		for i in range(args.pas):
+			# une action permise au hasard dans chaque environnement
+			actions = numpy.argmax(masques * rng.random(masques.shape), axis = 1)
+			observations, masques, recompenses, finis = envs.step(actions)
+			parties += int(finis.sum())
+			points += int(recompenses.sum())
+		duree = time.perf_counter() - debut
+
+	pas = args.pas * args.environnements
+	print("{} pas en {:.2f} s : {:.0f} pas/s".format(pas, duree, pas / duree))
+	print("{} parties | écart moyen {:.2f} points par partie".format(parties, points / max(parties, 1)))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,263 @@
+# auteur: Ben Kabongo Buzangu
+# résolution exacte des fins de partie
+
+""" Jeu de Domino - Fins de partie
+quand la pioche est vide et que l'on connaît (ou suppose) la main adverse,
+la fin de partie peut être résolue exactement.
+le solveur parcourt l'arbre des coups par alpha-bêta (negamax), en
+essayant les plus grands dominos d'abord, et garde les positions déjà
+évaluées dans une table de transposition de taille bornée, indexée par
+hachage de Zobrist.
+la valeur d'une position est le nombre de points que le joueur au trait
+marquera encore, moins celui que marquera son adversaire.
+les règles sont celles de simulation.Simulation : un tour est fait du coup
+du premier joueur puis de celui du second ; un joueur sans domino jouable
+doit piocher, ce qui échoue puisque la pioche est vide ; la partie s'arrête
+à la fin d'un tour où une pioche a échoué ou une main s'est vidée.
+les dominos sont posés comme model.Plateau.jouer pose (petite, grande) """
+
+import argparse
+import collections
+import random
+import time
+
+import bitboard
+import model
+
+# bornes des valeurs gardées dans la table
+EXACTE, INFERIEURE, SUPERIEURE = 0, 1, 2
+
+# solution d'une fin de partie
+# domino : le domino à jouer, None s'il faut piocher
+# valeur : valeur de la position pour le joueur au trait
+# variante : suite des meilleurs coups des deux joueurs, None pour une pioche
+# noeuds : nombre de positions visitées, duree : temps de calcul en secondes
+# succes : part des consultations de la table qui ont trouvé la position
+Solution = collections.namedtuple("Solution",
+	("domino", "valeur", "variante", "noeuds", "duree", "succes"))
+
+_rng = random.Random(0)
+# clés de Zobrist : un domino dans la main d'un joueur, une extrêmité du plateau,
+# le trait et l'échec d'une pioche dans le tour
+_Z_MAINS = [[_rng.getrandbits(64) for n in range(bitboard.NB_DOMINOS)] for joueur in range(2)]
+_Z_LEFT = [_rng.getrandbits(64) for p in range(bitboard.VIDE + 1)]
+_Z_RIGHT = [_rng.getrandbits(64) for p in range(bitboard.VIDE + 1)]
+_Z_TRAIT = _rng.getrandbits(64)
+_Z_ECHEC = _rng.getrandbits(64)
+del _rng
+
+class Solveur:
+	""" solveur de fins de partie
+	taille : nombre d'entrées de la table de transposition, arrondi à une
+	puissance de deux. chaque entrée a deux places : l'une garde la position
+	au plus grand sous-arbre, l'autre la dernière position rencontrée """
+	def __init__(self, taille = 1 << 18):
+		self._taille = 1 << max(taille - 1, 1).bit_length()
+		self._table = [None] * (2 * self._taille)
+		self._noeuds = 0
+		self._sondages = 0
+		self._succes = 0
+
+	def vide(self):
+		""" vide la table de transposition """
+		self._table = [None] * (2 * self._taille)
+
+	def _cle(self):
+		""" calcule la clé de Zobrist de la position courante """
+		cle = _Z_LEFT[self._left] ^ _Z_RIGHT[self._right]
+		for joueur in range(2):
+			for n in bitboard.bits(self._mains[joueur]):
+				cle ^= _Z_MAINS[joueur][n]
+		return cle
+
+	def _sonde(self, cle):
+		""" renvoie l'entrée de la table pour cette clé, None si elle n'y est pas """
+		self._sondages += 1
+		i = 2 * (cle & (self._taille - 1))
+		for entree in (self._table[i], self._table[i + 1]):
+			if entree is not None and entree[0] == cle:
+				self._succes += 1
+				return entree
+		return None
+
+	def _range(self, cle, restant, valeur, borne, coup):
+		""" range une position dans la table """
+		i = 2 * (cle & (self._taille - 1))
+		entree = self._table[i]
+		if entree is None or entree[0] == cle or restant >= entree[1]:
+			self._table[i] = (cle, restant, valeur, borne, coup)
+		else:
+			self._table[i + 1] = (cle, restant, valeur, borne, coup)
+
+	def _negamax(self, cle, trait, echec, alpha, beta):
+		""" valeur de la position pour le joueur au trait
+		trait : 0 pour le premier joueur du tour, 1 pour le second
+		echec : vrai si le premier joueur a échoué à piocher dans ce tour """
+		self._noeuds += 1
+		mains = self._mains
+		position = cle ^ (_Z_TRAIT if trait else 0) ^ (_Z_ECHEC if echec else 0)
+
+		alpha0 = alpha
+		entree = self._sonde(position)
+		coupTable = None
+		if entree is not None:
+			valeur, borne, coupTable = entree[2], entree[3], entree[4]
+			if borne == EXACTE: return valeur
+			if borne == INFERIEURE and valeur >= beta: return valeur
+			if borne == SUPERIEURE and valeur <= alpha: return valeur
+
+		main = mains[trait]
+		left, right = self._left, self._right
+		jouables = main & (bitboard.PIPS[left] | bitboard.PIPS[right])
+		# les bits sont rangés par somme croissante : les plus grands dominos d'abord,
+		# en commençant par le meilleur coup connu
+		coups = bitboard.bits(jouables)[::-1] if jouables else [None]
+		if coupTable in coups and coups[0] != coupTable:
+			coups.remove(coupTable)
+			coups.insert(0, coupTable)
+
+		meilleur, meilleurCoup = None, None
+		for n in coups:
+			if n is None:
+				gain, _echec, _cle = 0, True, cle
+			else:
+				gain, _echec = bitboard.SOMMES[n], echec
+				mains[trait] = main ^ (1 << n)
+				self._left, self._right = bitboard.joue(n, left, right)
+				_cle = (cle ^ _Z_MAINS[trait][n] ^ _Z_LEFT[left] ^ _Z_RIGHT[right]
+					^ _Z_LEFT[self._left] ^ _Z_RIGHT[self._right])
+
+			if trait == 1 and (_echec or mains[0] == 0 or mains[1] == 0):
+				valeur = gain
+			# la fenêtre de l'adversaire est décalée du gain de ce coup
+			elif trait == 0:
+				valeur = gain - self._negamax(_cle, 1, _echec, gain - beta, gain - alpha)
+			else:
+				valeur = gain - self._negamax(_cle, 0, False, gain - beta, gain - alpha)
+
+			mains[trait] = main
+			self._left, self._right = left, right
+
+			if meilleur is None or valeur > meilleur:
+				meilleur, meilleurCoup = valeur, n
+			if meilleur > alpha: alpha = meilleur
+			if alpha >= beta: break
+
+		if meilleur <= alpha0: borne = SUPERIEURE
+		elif meilleur >= beta: borne = INFERIEURE
+		else: borne = EXACTE
+		self._range(position, bitboard.compte(mains[0] | mains[1]), meilleur, borne, meilleurCoup)
+		return meilleur
+
+	def _variante(self, trait, echec):
+		""" suit les meilleurs coups de la table depuis la position courante """
+		mains = list(self._mains)
+		left, right = self._left, self._right
+		variante = list()
+		while True:
+			cle = _Z_LEFT[left] ^ _Z_RIGHT[right]
+			for joueur in range(2):
+				for n in bitboard.bits(mains[joueur]): cle ^= _Z_MAINS[joueur][n]
+			if trait: cle ^= _Z_TRAIT
+			if echec: cle ^= _Z_ECHEC
+			i = 2 * (cle & (self._taille - 1))
+			entree = [e for e in self._table[i:i + 2] if e is not None and e[0] == cle]
+			if not entree: break
+			n = entree[0][4]
+			if n is None:
+				variante.append(None)
+				echec = True
+			else:
+				variante.append(model.Domino(*bitboard.DOMINOS[n]))
+				mains[trait] ^= 1 << n
+				left, right = bitboard.joue(n, left, right)
+			if trait == 1:
+				if echec or mains[0] == 0 or mains[1] == 0: break
+				echec = False
+			trait ^= 1
+		return variante
+
+	def resout(self, plateau, main, adverse, premier = False, echec = False):
+		""" résout la fin de partie où main est au trait, avec la pioche vide
+		adverse : main (supposée) de l'adversaire
+		premier : vrai si main joue en premier dans le tour
+		echec : vrai si l'adversaire, premier du tour, vient d'échouer à piocher
+		renvoie une Solution """
+		debut = time.perf_counter()
+		self._noeuds = self._sondages = self._succes = 0
+		trait = 0 if premier else 1
+		self._mains = [0, 0]
+		self._mains[trait] = bitboard.depuisMain(main)
+		self._mains[1 - trait] = bitboard.depuisMain(adverse)
+		self._left, self._right, joues = bitboard.depuisPlateau(plateau)
+
+		valeur = self._negamax(self._cle(), trait, echec and not premier,
+			-10 ** 6, 10 ** 6)
+		variante = self._variante(trait, echec and not premier)
+
+		domino = None
+		if variante and variante[0] is not None:
+			for d in main.getDominos():
+				if d.getId() == variante[0].getId(): domino = d
+		duree = time.perf_counter() - debut
+		succes = self._succes / self._sondages if self._sondages else 0.0
+		return Solution(domino, valeur, variante, self._noeuds, duree, succes)
+
+def _finale(rng):
+	""" joue une partie au plus grand domino jusqu'à ce que la pioche soit vide
+	renvoie (plateau, main du premier joueur, main du second), None si la
+	partie se termine avant """
+	main1, main2, pioche = bitboard.distribue(rng)
+	left = right = bitboard.VIDE
+	joues = 0
+	while True:
+		mains = [main1, main2]
+		for joueur in range(2):
+			n = bitboard.grand(mains[joueur], left, right)
+			if n is None:
+				if pioche == 0: return None
+				n = bitboard.hasard(pioche, rng)
+				pioche ^= 1 << n
+				mains[joueur] |= 1 << n
+			else:
+				mains[joueur] ^= 1 << n
+				joues |= 1 << n
+				left, right = bitboard.joue(n, left, right)
+		main1, main2 = mains
+		if main1 == 0 or main2 == 0: return None
+		if pioche == 0:
+			plateau = bitboard.versPlateau(left, right, joues)
+			return plateau, bitboard.versMain(main1, plateau), bitboard.versMain(main2, plateau)
+
+def main():
+	parser = argparse.ArgumentParser(description = "Résolution de fins de partie tirées au hasard")
+	parser.add_argument("positions", type = int, nargs = "?", default = 100)
+	parser.add_argument("-s", "--graine", type = int, default = 0)
+	parser.add_argument("--table", type = int, default = 1 << 18,
+		help = "nombre d'entrées de la table de transposition")
+	args = parser.parse_args()
+
+	rng = random.Random(args.graine)
+	solveur = Solveur(args.table)
+	positions = noeuds = 0
+	duree = succes = 0.0
+	while positions < args.positions:
+		finale = _finale(rng)
+		if finale is None: continue
+		plateau, main, adverse = finale
+		solveur.vide()
+		solution = solveur.resout(plateau, main, adverse, premier = True)
+		positions += 1
+		noeuds += solution.noeuds
+		duree += solution.duree
+		succes += solution.succes
+		if positions == 1:
+			print("plateau :", plateau)
+			print("valeur {} | variante {}".format(solution.valeur,
+				" ".join("pioche" if d is None else str(d) for d in solution.variante)))
+
+	print("{} positions | {:.2f} ms par position | {:.0f} noeuds/s | table {:.1%}".format(
+		positions, 1000 * duree / positions, noeuds / duree, succes / positions))
+
+if __name__ == "__main__":
+	main()
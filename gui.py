@@ -2,16 +2,29 @@
 # 15 novembre 2019
 # jeu de domino graphique
 
+import concurrent.futures
+import sys
+import threading
 import tkinter
+import enregistrement
+import mcts
 import model
-import random
+import tablebase
 
 _font = ("Sergio UI", 10, "bold")
 
+# niveaux de difficulté, par numéro
+_NIVEAUX = ("facile", "difficile", "expert")
+# intervalle, en millisecondes, entre deux vérifications du calcul de l'ordinateur
+_ATTENTE = 16
+# temps de réflexion du niveau expert, en secondes
+_DUREE_EXPERT = 1.0
+
 def _setVariableDominoValue(variable, domino):
 	""" modifie la valeur d'une variable tkinter en
-	lui donnant la valeur du domino """
-	variable.set("{} | {}".format(*domino.get()))
+	lui donnant la valeur du domino, vide pour None """
+	if domino is None: variable.set("")
+	else: variable.set("{} | {}".format(*domino.get()))
 
 class DominoView(tkinter.Label):
 	""" version gui de model.Domino
@@ -30,14 +43,21 @@ class DominoView(tkinter.Label):
 	def update(self):
 		""" mis à jour de la valeur """
 		_setVariableDominoValue(self._var, self._domino)
+
+	def setDomino(self, domino):
+		""" affiche un autre domino dans le même label """
+		self._domino = domino
+		self.update()
 		
 	def reverse(self):
 		""" conséquence graphique de la modification des place """
-		self._domino.reverse()
+		self._domino = self._domino.reverse()
 		self.update()
 
 class MainView(tkinter.Frame):
-	""" équivalent graphique de model.Main """
+	""" équivalent graphique de model.Main
+	un seul domino de la main est affiché à la fois : un unique label
+	est créé, puis lié au domino affiché à chaque changement """
 	def __init__(self, master, main: model.Main):
 		tkinter.Frame.__init__(self, master)
 		self._main = main
@@ -61,19 +81,18 @@ class MainView(tkinter.Frame):
 			activeforeground = "black", relief = "flat", overrelief = "flat",
 			command = self.setNext).pack(side = "right")
 
-		# équivalent de self._main en label
-		self._mainDominosLabels = list()
+		# label du domino affiché
+		self._dominoView = DominoView(self._frame, None, "white")
+		self._dominoView.pack()
 		self.update()
 
 	def _set(self, id):
 		""" modifie le label affiché par une nouvelle id """
-		try: label = self._mainDominosLabels[id]
-		except IndexError: pass
-		else:
-			for c in self._frame.winfo_children(): c.pack_forget()
+		domino = self._main.getDominoById(id)
+		if domino is not None:
 			self._id = id
 			self._idVar.set("{} / {}".format(id + 1, len(self._main)))
-			label.pack()
+			self._dominoView.setDomino(domino)
 
 	def setPrevious(self, event = None):
 		""" affiche l'item précédent """
@@ -90,33 +109,81 @@ class MainView(tkinter.Frame):
 
 	def update(self):
 		""" mis à jour de la main """
-		self._mainDominosLabels = list()
-		for domino in self._main.getDominos():
-			self._mainDominosLabels.append(DominoView(self._frame, domino, "white"))
-		if len(self._mainDominosLabels) > 0: self._set(0)
+		if len(self._main) > 0:
+			self._set(0)
+		else:
+			self._id = 0
+			self._idVar.set("0 / 0")
+			self._dominoView.setDomino(None)
 		
 class PlateauView(tkinter.Canvas):
-	""" équivalent graphique de model.Plateau """
+	""" équivalent graphique de model.Plateau
+	chaque domino posé est dessiné par un rectangle et un texte du canevas.
+	update ne dessine que les dominos posés depuis son dernier appel, et
+	ne déplace les autres que si le plateau s'est allongé à gauche.
+	les éléments d'une partie terminée sont cachés puis réutilisés """
+
+	# la couleur d'un domino ne dépend que de son numéro
+	_COULEURS = ("red", "blue", "orange", "gray", "navy", "white", "olive", "wheat",
+		"royal blue", "light blue", "light gray")
+
 	def __init__(self, master, plateau, couleur):
 		tkinter.Canvas.__init__(self, master, background = couleur,
 			width = 300, height = 250, relief = "groove")
 		self._plateau = plateau
+		# dominos affichés, de gauche à droite : (domino, rectangle, texte)
+		self._vues = list()
+		# éléments cachés, prêts à être réutilisés : (rectangle, texte)
+		self._libres = list()
+
+	def _nouveau(self, domino):
+		""" dessine un domino, en réutilisant des éléments cachés au besoin """
+		if self._libres:
+			rectangle, texte = self._libres.pop()
+		else:
+			rectangle = self.create_rectangle(0, 0, 0, 0, width = 2)
+			texte = self.create_text(0, 0, font = _font)
+		self.itemconfigure(rectangle, state = "normal",
+			fill = self._COULEURS[domino.getId() % len(self._COULEURS)])
+		self.itemconfigure(texte, state = "normal", text = "{} | {}".format(*domino.get()))
+		return domino, rectangle, texte
+
+	def _place(self, i):
+		""" place le i-ème domino du plateau : 10 dominos par ligne """
+		domino, rectangle, texte = self._vues[i]
+		x, y = 5 + (i % 10) * 30, 5 + (i // 10) * 30
+		self.coords(rectangle, x, y, x + 28, y + 25)
+		self.coords(texte, x + 14, y + 12)
+
+	def _efface(self):
+		""" cache tous les dominos affichés """
+		for domino, rectangle, texte in self._vues:
+			self.itemconfigure(rectangle, state = "hidden")
+			self.itemconfigure(texte, state = "hidden")
+			self._libres.append((rectangle, texte))
+		self._vues = list()
 
 	def update(self):
-		""" mis à jour des labels """
-		for c in self.winfo_children():
-			c.place_forget()
-
-		x = -25
+		""" mis à jour des dominos posés depuis le dernier appel """
 		dominos = self._plateau.getDominos()
-		for i in range(len(dominos)):
-			colors = ["red", "blue", "orange", "gray", "navy", "white", "olive", "wheat",
-			"royal blue", "light blue", "light gray"]
-			dominoView = DominoView(self, dominos[i], random.choice(colors))
-			y = ((i + 1) // 10) * 30 + 5
-			x += 30
-			if (i + 1) % 10 == 0: x = 5
-			dominoView.place(x = x, y = y)
+		affiches = [vue[0] for vue in self._vues]
+		n = len(affiches)
+		# les dominos affichés se retrouvent dans le plateau, décalés
+		# du nombre de dominos posés à gauche entre temps
+		gauche = None
+		for k in range(len(dominos) - n + 1):
+			if dominos[k:k + n] == affiches:
+				gauche = k
+				break
+		# sinon, c'est une nouvelle partie : on repart de zéro
+		if gauche is None:
+			self._efface()
+			gauche = n = 0
+
+		self._vues[0:0] = [self._nouveau(domino) for domino in dominos[:gauche]]
+		self._vues.extend(self._nouveau(domino) for domino in dominos[gauche + n:])
+		for i in range(0 if gauche > 0 else n, len(self._vues)):
+			self._place(i)
 			
 def centrer(window):
 	""" méthode de centrage des fenêtres """
@@ -128,8 +195,14 @@ def centrer(window):
 
 class Application(tkinter.Tk):
 
-	def __init__(self):
+	def __init__(self, enregistreur = None, taille = 8, pipMax = 6):
 		tkinter.Tk.__init__(self)
+		# enregistrement.Enregistreur où écrire les parties terminées
+		self._enregistreur = enregistreur
+		# nombre de dominos de chaque main à la distribution
+		self._taille = taille
+		# les parties se jouent avec le jeu complet double-pipMax
+		self._pipMax = pipMax
 		
 		self.title("Dominos Games 1.0 - Ben Kabongo")
 		self.resizable(False, False)
@@ -158,6 +231,10 @@ class Application(tkinter.Tk):
 								accelerator = "control+d",
 								command = self._newPartieDifficile,
 								font = _font)
+		partie_menu.add_command(label = "Partie experte",
+								accelerator = "control+e",
+								command = self._newPartieExperte,
+								font = _font)
 		partie_menu.add_separator()
 		partie_menu.add_command(label = "Quitter",
 								accelerator = "control+q",
@@ -200,14 +277,27 @@ class Application(tkinter.Tk):
 
 	def _initValues(self):
 		self._plateauModel 		= model.Plateau()
-		self._mainOrdiModel 	= model.Main(self._plateauModel)
-		self._mainJoueurModel 	= model.Main(self._plateauModel)
-		self._piocheModel 		= model.Main()
+		self._mainOrdiModel 	= model.Main(self._plateauModel, self._pipMax)
+		self._mainJoueurModel 	= model.Main(self._plateauModel, self._pipMax)
+		self._piocheModel 		= model.Main(pipMax = self._pipMax)
 		
 		# on peut piocher ?
 		self._isPioche = False
 		# niveau de difficulté
 		self._difficult = 0
+		# l'ordinateur choisit ses dominos dans un fil d'exécution à part,
+		# pour que la fenêtre reste réactive ; le joueur ne peut pas jouer entre temps
+		self._executor = concurrent.futures.ThreadPoolExecutor(1)
+		self._expert = mcts.MonteCarlo(deroules = None, duree = _DUREE_EXPERT)
+		self._reflechit = False
+		# numéro de la partie en cours : le calcul lancé pendant une partie
+		# abandonnée est ignoré, et la recherche de Monte Carlo en cours
+		# arrêtée par l'événement self._annule, sans attendre sa fin
+		self._partie = 0
+		self._annule = threading.Event()
+		# donne et coups de la partie en cours, pour l'enregistrement
+		self._donne = None
+		self._coups = None
 
 	def _initContent(self):
 		content = tkinter.Frame(self)
@@ -264,6 +354,8 @@ class Application(tkinter.Tk):
 		self.bind("<Control-N>", self._newPartieFacile)
 		self.bind("<Control-d>", self._newPartieDifficile) 	# nouvelle partie d
 		self.bind("<Control-D>", self._newPartieDifficile)
+		self.bind("<Control-e>", self._newPartieExperte) 	# nouvelle partie e
+		self.bind("<Control-E>", self._newPartieExperte)
 
 		self.bind("<Control-q>", self.destroy) 		# quitter
 		self.bind("<Control-Q>", self.destroy)
@@ -285,58 +377,47 @@ class Application(tkinter.Tk):
 	# ----------------------------------------- méthodes de contrôle d'état
 
 	def _newDistribution(self):
-		""" renvoie une nouvelle distribution de 28 dominos """
-		dominos = list()
-		for i in range(28):
-			domino = model.Domino(random.randrange(0, 7), random.randrange(0, 7))
-			dominos.append(domino)
-		return dominos
+		""" renvoie une nouvelle distribution : le jeu complet mélangé """
+		return model.newDistribution(self._pipMax)
 		
 	def _distribue(self, dominos):
-		""" donne 8 dominos au premier joueuur
-		8 au second et met le reste dans la pioche """
-		dominos = list(dominos)
+		""" donne self._taille dominos au premier joueur,
+		autant au second et met le reste dans la pioche """
 		self._plateauModel.reset()
-		self._mainOrdiModel.reset()
-		self._mainJoueurModel.reset()
-		self._piocheModel.reset()
-	
-		def _addRandomDomino(main):
-			nonlocal dominos
-			_domino = random.choice(dominos)
-			dominos.remove(_domino)
-			main.addDomino(_domino)
-
-		for i in range(8):
-			for main in (self._mainJoueurModel, self._mainOrdiModel):
-				_addRandomDomino(main)
-
-		for _domino in dominos:
-			self._piocheModel.addDomino(_domino)
+		model.distribue(dominos, self._mainJoueurModel, self._mainOrdiModel,
+			self._piocheModel, self._taille)
 		
 		self._plateauView.update()
 		self._mainJoueurView.update()
 
-	def _ordi_getDomino(self):
+	def _ordi_getDomino(self, plateau, main, nbAdverse, nbPioche):
 		""" renvoie un domino au hasard parmi une liste de dominos jouables """
-		_dominos = self._plateauModel.isJouableMain(self._mainOrdiModel)
-		if len(_dominos) > 0: return random.choice(_dominos)
-		return None
-
-	def _ordi_getDomino2(self):
-		""" renvoie le plus grand domino d'une liste de dominos jouables """
-		_dominos = self._plateauModel.isJouableMain(self._mainOrdiModel)
-		if len(_dominos) > 0:
-			# on crée une main, pour réutiliser la méthode getBigDomino
-			main = model.Main()
-			for d in _dominos: main.addDomino(d)
-			return main.getBigDomino()
-		return None
+		return model.ordiAleatoire(plateau, main)
+
+	def _ordi_getDomino2(self, plateau, main, nbAdverse, nbPioche):
+		""" renvoie le plus grand domino d'une liste de dominos jouables,
+		ou le meilleur coup de la table des finales quand la pioche est vide """
+		if nbPioche == 0 and self._pipMax == 6:
+			# l'ordinateur joue après le joueur, qui a pu échouer à piocher
+			domino = tablebase.getDominoPlateau(plateau, main, echec = not self._isPioche)
+			if domino is not None: return domino
+		return model.ordiGrand(plateau, main)
+
+	def _ordi_getDomino3(self, plateau, main, nbAdverse, nbPioche, annule = None):
+		""" renvoie le domino choisi par une recherche de Monte Carlo
+		annule : threading.Event qui arrête la recherche (voir mcts.MonteCarlo.choisit) """
+		# l'ordinateur joue après le joueur, qui a pu échouer à piocher
+		return self._expert.choisit(plateau, main, nbAdverse, nbPioche, annule = annule,
+			echec = not self._isPioche)
 
 	# ----------------------------------------- méthodes de contrôle graphique
 
 	def _newPartie(self, difficult = 0):
-		""" nouvelle partie """
+		""" nouvelle partie
+		un calcul de l'ordinateur en cours est abandonné """
+		self._partie += 1
+		self._annule.set()
+		self._reflechit = False
 		self._scoreOrdiVar.set(0)
 		self._scoreJoueurVar.set(0)
 		
@@ -344,9 +425,11 @@ class Application(tkinter.Tk):
 		self._distribue(dominos)
 		self._isPioche = True
 
-		self._difficult = 0
-		name = ("facile", "difficile")
-		self._statusVar.set("Nouvelle partie {}".format(name[difficult]))
+		self._difficult = difficult
+		self._donne = [main.getDominos() for main in
+			(self._mainJoueurModel, self._mainOrdiModel, self._piocheModel)]
+		self._coups = list()
+		self._statusVar.set("Nouvelle partie {}".format(_NIVEAUX[difficult]))
 
 	def _newPartieFacile(self, event = None):
 		""" nouvelle partie facile """
@@ -355,31 +438,69 @@ class Application(tkinter.Tk):
 	def _newPartieDifficile(self, event = None):
 		""" nouvelle partie difficile """
 		self._newPartie(1)
+
+	def _newPartieExperte(self, event = None):
+		""" nouvelle partie experte, où l'ordinateur joue par Monte Carlo """
+		if self._pipMax != 6:
+			self._statusVar.set("Le niveau expert se joue au double-six")
+			return
+		self._newPartie(2)
 		
 	def destroy(self, event = None):
 		""" quitter la partie """
+		self._partie += 1
+		self._annule.set()
+		self._executor.shutdown(wait = False, cancel_futures = True)
 		self._statusVar.set("Ciao !")
 		self.after(1000, lambda: tkinter.Tk.destroy(self))
 
 	def _ordiPlay(self):
-		""" l'ordinateur tente de placer un domino """
+		""" l'ordinateur cherche un domino à placer, dans un fil d'exécution à part
+		sur une copie du plateau et de sa main, pendant que le joueur attend """
+		plateau = model.Plateau()
+		plateau.setDominos(self._plateauModel.getDominos())
+		main = model.Main(plateau, self._pipMax)
+		for domino in self._mainOrdiModel.getDominos(): main.addDomino(domino)
+
 		# en fonction du niveau de difficulté, on utilise la méthode adéquate
-		if self._difficult == 0: domino = self._ordi_getDomino()
-		else: domino = self._ordi_getDomino2()
-		
+		strategie = (self._ordi_getDomino, self._ordi_getDomino2, self._ordi_getDomino3)[self._difficult]
+		arguments = [plateau, main, len(self._mainJoueurModel), len(self._piocheModel)]
+		# seule la recherche de Monte Carlo dure assez pour être annulée
+		self._annule = threading.Event()
+		if self._difficult == 2: arguments.append(self._annule)
+		tache = self._executor.submit(strategie, *arguments)
+		self._reflechit = True
+		self._statusVar.set("L'ordinateur réfléchit…")
+		self.after(_ATTENTE, self._attendOrdi, tache, self._partie)
+
+	def _attendOrdi(self, tache, partie):
+		""" attend la fin du calcul de l'ordinateur, puis joue son domino """
+		# la partie a été abandonnée entre temps
+		if partie != self._partie: return
+		if not tache.done():
+			self.after(_ATTENTE, self._attendOrdi, tache, partie)
+			return
+		self._reflechit = False
+		self._ordiJoue(tache.result())
+
+	def _ordiJoue(self, domino):
+		""" l'ordinateur tente de placer le domino choisi """
 		# on pioche si l'ordi n'a pas pu trouver un domino jouable
 		if domino is None:
 			pioche = self._piocheModel.piocheDomino()
 			if pioche is None:
 				# On ne peut plus piocher
 				self._isPioche = False
+				self._enregistre(1, model.PASSE)
 			else:
 				# on ajoute la pioche et on passe
 				self._mainOrdiModel.addDomino(pioche)
 				self._statusVar.set("L'ordinateur a pioché !")
+				self._enregistre(1, model.PIOCHE, pioche)
 		else:
 			# dans le cas où il a un domino jouable
 			self._mainOrdiModel.playDomino(domino)
+			self._enregistre(1, domino, domino)
 			self._plateauView.update()
 			self._statusVar.set("L'ordinateur a joué {}".format(domino))
 			self._scoreOrdiVar.set(int(self._scoreOrdiVar.get()) + domino.getSomme())
@@ -387,10 +508,12 @@ class Application(tkinter.Tk):
 
 	def _joueurPlay(self, event = None):
 		""" le joueur tente de placer un domino """
+		if self._reflechit: return
 		id = self._mainJoueurView.getId()
 		domino = self._mainJoueurModel.playDominoById(id)
 		# si la pièce a bel et bien été placée
 		if domino:
+			self._enregistre(0, domino, domino)
 			self._mainJoueurView.update()
 			self._plateauView.update()
 			self._statusVar.set("Vous avez joué {}".format(domino))
@@ -405,16 +528,32 @@ class Application(tkinter.Tk):
 
 	def _joueurPioche(self, event = None):
 		""" le joueur pioche un nouveau domino """
+		if self._reflechit: return
 		pioche = self._piocheModel.piocheDomino()
 		if pioche is None:
 			self._isPioche = False
 			self._statusVar.set("Vous ne pouvez plus piocher !")
+			self._enregistre(0, model.PASSE)
 		else:
+			self._enregistre(0, model.PIOCHE, pioche)
 			self._statusVar.set("Vous avez pioché {}".format(pioche))
 			self._mainJoueurModel.addDomino(pioche)
 			self._mainJoueurView.update()
 		self._ordiPlay()
 
+	def _enregistre(self, joueur, coup, domino = None):
+		""" note un coup de la partie en cours """
+		if self._coups is not None:
+			self._coups.append((joueur, coup, domino))
+
+	def _termineEnregistrement(self):
+		""" écrit la partie terminée, si un enregistreur a été donné """
+		if self._enregistreur is not None and self._coups is not None:
+			scores = int(self._scoreJoueurVar.get()), int(self._scoreOrdiVar.get())
+			self._enregistreur.ecrit(("joueur", _NIVEAUX[self._difficult]),
+				self._donne, self._coups, scores)
+		self._coups = None
+
 	def _check(self):
 		""" vérifie si la partie est en condition de continuer
 		et effectue les modifications nécessaires à chaque tour """
@@ -439,6 +578,7 @@ class Application(tkinter.Tk):
 		
 		# la partie est terminée ou l'utilisateur a quitté la partie
 		if finish:
+			self._termineEnregistrement()
 			if scoreJoueur > scoreOrdi:
 				self._statusVar.set("Vous avez gagné !")
 			elif scoreJoueur < scoreOrdi:
@@ -496,6 +636,7 @@ class Application(tkinter.Tk):
 			"<- et ->  : faire défiler les dominos\n"
 			"control+n : nouvelle partie facile\n"
 			"control+d : nouvelle partie difficile\n"
+			"control+e : nouvelle partie experte\n"
 			"alt+r     : affiche les règles de jeu\n"
 			"alt+c     : affiche les commandes de jeu\n"
 			"alt+i     : affiche mes infos persos\n"
@@ -509,8 +650,13 @@ class Application(tkinter.Tk):
 		self._affiche("A propos de moi", text)
 
 def main():
-	app = Application()
+	# un fichier d'enregistrement des parties peut être donné en argument
+	enregistreur = None
+	if len(sys.argv) > 1:
+		enregistreur = enregistrement.Enregistreur(sys.argv[1])
+	app = Application(enregistreur)
 	app.mainloop()
+	if enregistreur is not None: enregistreur.fermer()
 
 if __name__ == "__main__":
 	main()
@@ -0,0 +1,201 @@
+# auteur: Ben Kabongo Buzangu
+# chronomètres et compteurs sur les chemins critiques du jeu
+
+""" Jeu de Domino - Instrumentation
+une fois activée, l'instrumentation remplace quelques méthodes du modèle
+et de l'interface par des versions chronométrées : la partie (Jeu.newPart),
+les coups de l'interface (Application._ordiPlay, _ordiJoue, _joueurPlay),
+la pose (Plateau.jouer), la génération des coups (Plateau.isJouableMain),
+les décisions de l'ordinateur (ordiAleatoire, ordiGrand, et celles de
+chaque niveau de l'interface, Application._ordi_getDomino*) et l'affichage.
+des compteurs notent les coups générés, les pioches et les mélanges.
+désactivée, elle rend les méthodes d'origine : elle ne coûte alors rien.
+à la fin de chaque partie, les mesures peuvent être écrites en JSON et au
+format « pile repliée » des flame graphs (une ligne par pile d'appels
+chronométrés, suivie de son temps propre en microsecondes), que lisent
+flamegraph.pl ou speedscope """
+
+import argparse
+import collections
+import functools
+import json
+import threading
+import time
+
+import model
+
+# par chronomètre : [appels, temps total, temps maximal]
+_chronos = collections.defaultdict(lambda: [0, 0.0, 0.0])
+_compteurs = collections.Counter()
+# temps total (appels imbriqués compris) par pile de chronomètres
+_piles = collections.Counter()
+# pile des chronomètres en cours, propre à chaque fil d'exécution :
+# l'interface fait réfléchir l'ordinateur dans un fil à part
+_fil = threading.local()
+# les mesures sont partagées par tous les fils
+_verrou = threading.Lock()
+# méthodes remplacées : (objet, attribut, valeur d'origine)
+_originaux = list()
+_fichiers = {"json": None, "flamme": None}
+
+def isActive():
+	""" vrai si l'instrumentation est active """
+	return len(_originaux) > 0
+
+def vide():
+	""" remet les mesures à zéro """
+	_chronos.clear()
+	_compteurs.clear()
+	_piles.clear()
+
+def compte(nom, n = 1):
+	""" incrémente un compteur """
+	with _verrou: _compteurs[nom] += n
+
+def _chronometre(fonction, nom, apres = None):
+	""" renvoie fonction chronométrée sous le nom donné
+	apres(resultat, *args, **kwargs) est appelée après chaque appel """
+	@functools.wraps(fonction)
+	def f(*args, **kwargs):
+		try: pile = _fil.pile
+		except AttributeError: pile = _fil.pile = list()
+		pile.append(nom)
+		debut = time.perf_counter()
+		try:
+			resultat = fonction(*args, **kwargs)
+		finally:
+			duree = time.perf_counter() - debut
+			with _verrou:
+				chrono = _chronos[nom]
+				chrono[0] += 1
+				chrono[1] += duree
+				if duree > chrono[2]: chrono[2] = duree
+				_piles[";".join(pile)] += duree
+			pile.pop()
+		if apres is not None: apres(resultat, *args, **kwargs)
+		return resultat
+	return f
+
+def _installe(objet, attribut, nom, apres = None):
+	""" remplace objet.attribut par sa version chronométrée """
+	fonction = getattr(objet, attribut)
+	_originaux.append((objet, attribut, fonction))
+	setattr(objet, attribut, _chronometre(fonction, nom, apres))
+
+def _coupsGrand(domino, plateau, main, *args):
+	""" compte les coups parmi lesquels ordiGrand a choisi : il ne passe pas
+	par Plateau.isJouableMain, qui compte ceux des autres stratégies """
+	left, right = plateau.getExtremites()
+	compte("coups générés", len(main) if left is None else len(main.getJouables(left, right)))
+
+def _finPartie(*args, **kwargs):
+	""" écrit les mesures dans les fichiers demandés à l'activation """
+	if _fichiers["json"] is not None: ecritJson(_fichiers["json"])
+	if _fichiers["flamme"] is not None: ecritFlamme(_fichiers["flamme"])
+
+def active(fichierJson = None, fichierFlamme = None):
+	""" active l'instrumentation
+	fichierJson, fichierFlamme : fichiers où écrire les mesures à la fin de chaque partie """
+	if isActive(): desactive()
+	_fichiers["json"], _fichiers["flamme"] = fichierJson, fichierFlamme
+
+	_installe(model.Jeu, "newPart", "Jeu.newPart", _finPartie)
+	_installe(model.Plateau, "jouer", "Plateau.jouer")
+	_installe(model.Plateau, "isJouableMain", "Plateau.isJouableMain",
+		lambda jouables, *args: compte("coups générés", len(jouables)))
+	# l'interface pioche par Main.piocheDomino, la partie en mode texte
+	# et les simulations par Jeu.appliqueCoup
+	_installe(model.Main, "piocheDomino", "Main.piocheDomino",
+		lambda domino, *args: domino is not None and compte("pioches"))
+	_installe(model.Jeu, "appliqueCoup", "Jeu.appliqueCoup",
+		lambda domino, jeu, joueur, coup, *args: coup == model.PIOCHE and compte("pioches"))
+	_installe(model.Jeu, "_distribue", "Jeu._distribue")
+	_installe(model.Main, "shuffleDominos", "Main.shuffleDominos",
+		lambda *args: compte("mélanges"))
+	# les stratégies de model.Jeu, de gui et de strategies passent par ces fonctions
+	_installe(model, "ordiAleatoire", "décision ordiAleatoire")
+	_installe(model, "ordiGrand", "décision ordiGrand", _coupsGrand)
+
+	# l'interface n'est instrumentée que si tkinter est disponible
+	try: import gui
+	except ImportError: return
+	# l'ordinateur décide dans un fil à part : _ordiPlay ne chronomètre que
+	# le lancement de la décision, chronométrée elle-même par niveau
+	_installe(gui.Application, "_ordiPlay", "Application._ordiPlay")
+	for niveau in ("_ordi_getDomino", "_ordi_getDomino2", "_ordi_getDomino3"):
+		_installe(gui.Application, niveau, "Application." + niveau)
+	_installe(gui.Application, "_ordiJoue", "Application._ordiJoue")
+	_installe(gui.Application, "_joueurPlay", "Application._joueurPlay")
+	_installe(gui.Application, "_termineEnregistrement", "Application._termineEnregistrement",
+		_finPartie)
+	_installe(gui.PlateauView, "update", "PlateauView.update")
+	_installe(gui.MainView, "update", "MainView.update")
+
+def desactive():
+	""" rend les méthodes d'origine, les mesures sont gardées """
+	while _originaux:
+		objet, attribut, fonction = _originaux.pop()
+		setattr(objet, attribut, fonction)
+	_fichiers["json"] = _fichiers["flamme"] = None
+
+def getMesures():
+	""" renvoie les mesures : chronomètres (appels, total et maximum en
+	secondes, moyenne) et compteurs """
+	chronos = dict()
+	for nom, (appels, total, maximum) in _chronos.items():
+		chronos[nom] = {"appels": appels, "total": total, "max": maximum,
+			"moyenne": total / appels if appels else 0.0}
+	return {"chronos": chronos, "compteurs": dict(_compteurs)}
+
+def getPiles():
+	""" renvoie le temps propre, en microsecondes, de chaque pile de
+	chronomètres : son temps total moins celui des piles qu'elle contient """
+	propres = dict(_piles)
+	for pile, duree in _piles.items():
+		parent = pile.rpartition(";")[0]
+		if parent: propres[parent] -= duree
+	return {pile: max(round(duree * 10 ** 6), 0) for pile, duree in propres.items()}
+
+def ecritJson(chemin):
+	""" écrit les mesures en JSON """
+	with open(chemin, "w") as fichier:
+		json.dump(getMesures(), fichier, indent = 2, ensure_ascii = False)
+
+def ecritFlamme(chemin):
+	""" écrit les piles au format replié des flame graphs """
+	with open(chemin, "w") as fichier:
+		for pile, duree in sorted(getPiles().items()):
+			fichier.write("{} {}\n".format(pile, duree))
+
+def main():
+	parser = argparse.ArgumentParser(description = "Jeu de dominos instrumenté")
+	parser.add_argument("interface", choices = ("texte", "gui", "simulation"), nargs = "?",
+		default = "simulation")
+	parser.add_argument("-n", "--parties", type = int, default = 1000,
+		help = "nombre de parties simulées")
+	parser.add_argument("--json", default = None, help = "fichier JSON des mesures")
+	parser.add_argument("--flamme", default = None, help = "fichier des piles pour un flame graph")
+	args = parser.parse_args()
+
+	active(args.json, args.flamme)
+	if args.interface == "texte":
+		import strategies
+		model.Jeu().newPart(strategies.get("finales"))
+	elif args.interface == "gui":
+		import gui
+		gui.Application().mainloop()
+	else:
+		import simulation
+		for resultat in simulation.Simulation().parties(args.parties): pass
+		_finPartie()
+	desactive()
+
+	for nom, chrono in sorted(getMesures()["chronos"].items()):
+		print("{:<36} {:>9} appels | {:>10.3f} ms | moyenne {:>8.2f} µs | max {:>8.2f} µs".format(
+			nom, chrono["appels"], 1000 * chrono["total"], 10 ** 6 * chrono["moyenne"],
+			10 ** 6 * chrono["max"]))
+	for nom, n in sorted(_compteurs.items()):
+		print("{:<36} {:>9}".format(nom, n))
+
+if __name__ == "__main__":
+	main()
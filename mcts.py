@@ -0,0 +1,236 @@
+# auteur: Ben Kabongo Buzangu
+# joueur par recherche de Monte Carlo
+
+""" Jeu de Domino - Monte Carlo
+l'ordinateur ne connaît ni la main adverse ni la pioche, seulement leur
+taille. pour choisir un domino, il tire au hasard une répartition des
+dominos inconnus entre la main adverse et la pioche, puis termine la
+partie à partir de chacun de ses coups possibles (un déroulé).
+le coup retenu est celui qui rapporte en moyenne le plus de points
+d'avance sur l'adversaire, sur l'ensemble des répartitions.
+les déroulés se font avec bitboard, au choix dans plusieurs processus,
+jusqu'à épuisement d'un nombre de déroulés ou d'une durée, ou jusqu'à
+ce que la recherche soit annulée.
+comme dans simulation.Simulation, un déroulé s'arrête à la fin du tour
+où une main se vide ou un joueur doit piocher dans une pioche vide :
+l'autre joueur finit le tour """
+
+import argparse
+import concurrent.futures
+import random
+import time
+
+import bitboard
+import model
+
+# intervalle, en secondes, entre deux vérifications de l'annulation
+# pendant que les processus de recherche travaillent
+_ATTENTE = 0.05
+
+def _masque(dominos):
+	""" renvoie le masque d'une liste de model.Domino """
+	masque = 0
+	for domino in dominos:
+		masque |= 1 << bitboard.BITS[domino.getId()]
+	return masque
+
+def _deroule(moi, adverse, pioche, left, right, politique, rng, premier = False, echec = False):
+	""" termine une partie où l'adversaire a la main, chacun jouant selon
+	politique ; la pioche est une liste de dominos tirés dans l'ordre
+	premier : moi a joué en premier dans le tour, que l'adversaire finit ;
+	sinon moi a fini le tour, et l'adversaire ouvre le suivant
+	echec : l'adversaire a échoué à piocher dans le tour que moi a fini
+	renvoie les points marqués par moi moins ceux marqués par l'adversaire """
+	# moi a fini un tour où une main s'est vidée ou l'adversaire a échoué à piocher
+	if not premier and (echec or moi == 0 or adverse == 0): return 0
+	mains = [adverse, moi]
+	points = [0, 0]
+	sommet = 0
+	joueur = 0
+	# l'adversaire finit le tour en cours si moi l'a ouvert
+	second = premier
+	isPioche = True
+	while True:
+		n = politique(mains[joueur], left, right, rng)
+		if n is None:
+			if sommet < len(pioche):
+				mains[joueur] |= 1 << pioche[sommet]
+				sommet += 1
+			else: isPioche = False
+		else:
+			mains[joueur] ^= 1 << n
+			left, right = bitboard.joue(n, left, right)
+			points[joueur] += bitboard.SOMMES[n]
+		# la partie ne s'arrête qu'à la fin d'un tour
+		if second and (not isPioche or mains[0] == 0 or mains[1] == 0): break
+		second = not second
+		joueur ^= 1
+	return points[1] - points[0]
+
+def _recherche(moi, left, right, inconnus, nbAdverse, coups, deroules, fin, politique, graine,
+	premier = False, echec = False, annule = None):
+	""" évalue chaque coup sur des répartitions tirées au hasard
+	premier, echec : place de moi dans le tour, voir _deroule
+	s'arrête après deroules déroulés, à l'instant fin de time.monotonic
+	ou dès que l'événement annule (threading.Event) est signalé
+	renvoie la somme des valeurs et le nombre de déroulés de chaque coup """
+	rng = random.Random(graine)
+	ids = bitboard.bits(inconnus)
+	sommes = [0] * len(coups)
+	nombres = [0] * len(coups)
+	total = 0
+	while deroules is None or total < deroules:
+		if fin is not None and time.monotonic() >= fin: break
+		if annule is not None and annule.is_set(): break
+		rng.shuffle(ids)
+		adverse = 0
+		for n in ids[:nbAdverse]: adverse |= 1 << n
+		pioche = ids[nbAdverse:]
+		for i, n in enumerate(coups):
+			l, r = bitboard.joue(n, left, right)
+			sommes[i] += bitboard.SOMMES[n] + _deroule(moi ^ (1 << n), adverse, pioche,
+				l, r, politique, rng, premier, echec)
+			nombres[i] += 1
+		total += len(coups)
+	return sommes, nombres
+
+class MonteCarlo:
+	""" joueur par recherche de Monte Carlo
+	deroules : nombre de déroulés par décision, None pour ne pas le limiter
+	duree : temps de réflexion par décision en secondes, None pour ne pas le limiter
+	processus : nombre de processus qui se partagent les déroulés
+	politique : stratégie de bitboard suivie pendant les déroulés """
+	def __init__(self, deroules = 1000, duree = None, processus = 1,
+		politique = bitboard.grand, graine = None):
+		if deroules is None and duree is None:
+			raise Exception("Il faut limiter le nombre de déroulés ou la durée")
+		self._deroules = deroules
+		self._duree = duree
+		self._processus = processus
+		self._politique = politique
+		self._rng = random.Random(graine)
+		self._executor = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.fermer()
+
+	def fermer(self):
+		""" arrête les processus de recherche """
+		if self._executor is not None:
+			self._executor.shutdown()
+			self._executor = None
+
+	def choisit(self, plateau, main, nbAdverse, nbPioche, rng = None, annule = None,
+		premier = False, echec = False):
+		""" renvoie le domino de la main à jouer, None si aucun n'est jouable
+		nbAdverse et nbPioche sont les tailles de la main adverse et de la pioche
+		rng : générateur qui donne les graines des recherches, celui du joueur par défaut
+		premier : la main joue en premier dans le tour ; par défaut elle joue
+		en second, comme l'ordinateur, et echec dit si l'adversaire vient
+		d'échouer à piocher : la partie s'arrête alors après ce coup
+		annule : threading.Event qui, une fois signalé, arrête la recherche au
+		déroulé suivant ; choisit renvoie alors None. avec plusieurs processus,
+		la décision est abandonnée sans attendre leurs derniers déroulés
+		les déroulés se font avec bitboard : la main doit être du double-six """
+		if main._pipMax != 6:
+			raise Exception("La recherche de Monte Carlo ne se joue qu'au double-six")
+		jouables = plateau.isJouableMain(main)
+		if len(jouables) <= 1:
+			return jouables[0] if jouables else None
+
+		moi = _masque(main.getDominos())
+		left, right, joues = bitboard.depuisPlateau(plateau)
+		coups = bitboard.bits(_masque(jouables))
+		inconnus = bitboard.TOUS & ~(moi | joues)
+		# si la donne n'est pas un jeu complet, il peut manquer des dominos inconnus
+		nbAdverse = min(nbAdverse, bitboard.compte(inconnus))
+
+		if rng is None: rng = self._rng
+		fin = None
+		if self._duree is not None: fin = time.monotonic() + self._duree
+		if self._processus <= 1:
+			sommes, nombres = _recherche(moi, left, right, inconnus, nbAdverse, coups,
+				self._deroules, fin, self._politique, rng.random(), premier, echec, annule)
+		else:
+			if self._executor is None:
+				self._executor = concurrent.futures.ProcessPoolExecutor(self._processus)
+			deroules = None
+			if self._deroules is not None:
+				deroules = -(-self._deroules // self._processus)
+			taches = [self._executor.submit(_recherche, moi, left, right, inconnus,
+				nbAdverse, coups, deroules, fin, self._politique, rng.random(), premier, echec)
+				for i in range(self._processus)]
+			if annule is not None:
+				while not annule.is_set():
+					if not concurrent.futures.wait(taches, _ATTENTE).not_done: break
+				if annule.is_set():
+					for tache in taches: tache.cancel()
+					return None
+			sommes, nombres = [0] * len(coups), [0] * len(coups)
+			for tache in taches:
+				_sommes, _nombres = tache.result()
+				for i in range(len(coups)):
+					sommes[i] += _sommes[i]
+					nombres[i] += _nombres[i]
+
+		if annule is not None and annule.is_set(): return None
+
+		# le meilleur coup en moyenne, le plus grand domino en cas d'égalité
+		meilleur = max(range(len(coups)),
+			key = lambda i: (sommes[i] / nombres[i] if nombres[i] else float("-inf"), coups[i]))
+		for domino in jouables:
+			if bitboard.BITS[domino.getId()] == coups[meilleur]:
+				return domino
+
+	def getDomino(self, jeu, main):
+		""" stratégie au sens de strategies : joue la main dans un model.Jeu
+		les recherches tirent leur graine du générateur du jeu : avec un nombre
+		de déroulés fixé, une partie se rejoue à l'identique
+		la main du joueur joue en premier dans chaque tour, celle de l'ordi en second """
+		premier = main is jeu._mainJoueur
+		adverse = jeu._mainOrdi if premier else jeu._mainJoueur
+		# le premier joueur a-t-il échoué à piocher dans ce tour ?
+		historique = jeu._historique
+		echec = not premier and len(historique) > 0 and historique[-1][:2] == (0, model.PASSE)
+		return self.choisit(jeu._plateau, main, len(adverse), len(jeu._pioche), jeu._rng,
+			premier = premier, echec = echec)
+
+def main():
+	import simulation
+
+	parser = argparse.ArgumentParser(description = "Monte Carlo contre une autre stratégie")
+	parser.add_argument("parties", type = int, nargs = "?", default = 100)
+	parser.add_argument("-d", "--deroules", type = int, default = None,
+		help = "nombre de déroulés par décision")
+	parser.add_argument("-t", "--duree", type = float, default = None,
+		help = "temps de réflexion par décision, en secondes")
+	parser.add_argument("-j", "--processus", type = int, default = 1)
+	parser.add_argument("--adversaire", default = "difficile")
+	args = parser.parse_args()
+	if args.deroules is None and args.duree is None: args.deroules = 1000
+
+	with MonteCarlo(args.deroules, args.duree, args.processus) as joueur:
+		decisions, duree = 0, 0.0
+		def strategie(jeu, main):
+			nonlocal decisions, duree
+			debut = time.perf_counter()
+			domino = joueur.getDomino(jeu, main)
+			duree += time.perf_counter() - debut
+			decisions += 1
+			return domino
+
+		jeu = simulation.Simulation(strategie, args.adversaire)
+		victoires = defaites = nuls = 0
+		for resultat in jeu.parties(args.parties):
+			if resultat.score1 > resultat.score2: victoires += 1
+			elif resultat.score1 < resultat.score2: defaites += 1
+			else: nuls += 1
+
+	print("montecarlo {} - {} {} ({} nuls)".format(victoires, defaites, args.adversaire, nuls))
+	print("{:.1f} ms par décision".format(1000 * duree / max(decisions, 1)))
+
+if __name__ == "__main__":
+	main()
@@ -1,7 +1,9 @@
 # auteur: Ben Kabongo Buzangu
 
 """ Jeu de Domino - Model 
-domino: liste de deux entiers entre 0 et 6 inclus
+domino: paire de deux entiers entre 0 et PIP_MAX inclus
+un jeu complet double-n contient tous les dominos d'extrêmités 0 à n :
+le double-six habituel, mais aussi les double-9, double-12 et double-15
 plateau de jeu: listes de dominos déjà posés
 main: domino possédés par un joueur
 un domino peut être posé sur le plateau ssi une de ses extrêmités
@@ -10,54 +12,121 @@ un plateau vide accepte n'importe quel domino
 les extrêmités d'un domino peuvent changer dans une main, mais
 pas dans un plateau """
 
+import collections
 import random
 
+# plus grande extrêmité possible, celle du double-15
+PIP_MAX = 15
+# nombre de dominos distincts du double-15, donc de numéros getId possibles
+NB_IDS = (PIP_MAX + 1) * (PIP_MAX + 2) // 2
+
 class Domino:
-	""" un domino """
-	def __init__(self, ext1, ext2):
+	""" un domino
+	chaque paire d'extrêmités n'existe qu'en un seul exemplaire :
+	Domino(a, b) renvoie toujours la même instance, qui n'est jamais modifiée.
+	l'identité d'un domino (getId) ne dépend pas de son sens,
+	alors que son orientation est donnée par l'instance elle-même :
+	Domino(a, b) et Domino(b, a) ont la même identité """
+	__slots__ = ("_left", "_right", "_somme", "_id", "_code", "_rang")
+
+	# instances uniques, indexées par (extrêmité gauche, extrêmité droite)
+	_instances = dict()
+
+	def __new__(cls, ext1, ext2):
+		try: return cls._instances[ext1, ext2]
+		except KeyError: pass
 		for ext in (ext1, ext2):
-			if ext < 0 or ext > 6:
+			if ext < 0 or ext > PIP_MAX:
 				raise Exception(
-					"La valeur de l'extrêmité doit se trouver entre 0 et 6"
+					"La valeur de l'extrêmité doit se trouver entre 0 et {}".format(PIP_MAX)
 					)
-		self._domino = [ext1, ext2]
+		self = object.__new__(cls)
+		self._left = ext1
+		self._right = ext2
+		self._somme = ext1 + ext2
+		# numéro du domino sans tenir compte du sens : 0 pour 0|0, 1 pour 0|1,
+		# 2 pour 1|1, 3 pour 0|2 ... jusqu'à 27 pour 6|6 : les dominos d'un
+		# jeu double-n ont les numéros 0 à (n + 1)(n + 2) / 2 - 1
+		low, high = min(ext1, ext2), max(ext1, ext2)
+		self._id = high * (high + 1) // 2 + low
+		# code unique du domino orienté
+		self._code = ext1 * (PIP_MAX + 1) + ext2
+		# rang du domino par somme, puis par numéro : de deux dominos, le plus
+		# grand est celui de plus grand rang (voir Main.getBigDomino)
+		self._rang = self._somme * NB_IDS + self._id
+		cls._instances[ext1, ext2] = self
+		return self
+
+	def __reduce__(self):
+		# la copie ou le passage entre processus renvoie l'instance unique
+		return Domino, (self._left, self._right)
 
 	def __eq__(self, domino):
 		""" compare deux dominos """
-		s1, s2 = self.get()
-		d1, d2 = domino.get()
-		if s1 == d1 and s2 == d2:
-			return True
-		return False
+		return self is domino
+
+	def __hash__(self):
+		return self._code
 
 	def __str__(self):
-		return "| {} | {} |".format(*self.get())
+		return "| {} | {} |".format(self._left, self._right)
 	
+	def getCode(self):
+		""" renvoie le code du domino orienté, entre 0 et (PIP_MAX + 1)² - 1 """
+		return self._code
+
 	def getSomme(self):
 		""" renvoie la somme des extrêmités """
-		return self._domino[0] + self._domino[1]
+		return self._somme
 	
 	def get(self):
 		""" renvoie les valeurs du domino """
-		return self._domino[0], self._domino[1]
+		return self._left, self._right
 
 	def getLeft(self):
 		""" renvoie l'extrêmité gauche """
-		return self._domino[0]
+		return self._left
 
 	def getRight(self):
 		""" renvoie l'extrêmité droite """
-		return self._domino[1]
+		return self._right
+
+	def getId(self):
+		""" renvoie le numéro du domino, indépendant de son sens """
+		return self._id
+
+	def getRang(self):
+		""" renvoie le rang du domino, par somme puis par numéro getId """
+		return self._rang
 
 	def reverse(self):
-		""" renverse le domino """
-		self._domino.reverse()
+		""" renvoie le domino renversé """
+		return Domino(self._right, self._left)
+
+# toutes les instances sont créées dès le chargement du module
+for _ext1 in range(PIP_MAX + 1):
+	for _ext2 in range(PIP_MAX + 1):
+		Domino(_ext1, _ext2)
+del _ext1, _ext2
 
 class Main:
-	""" une main de domino """
-	def __init__(self, plateau = None):
+	""" une main de domino
+	pipMax : plus grande extrêmité des dominos que la main peut recevoir """
+	def __init__(self, plateau = None, pipMax = 6):
 		self._main = list()
 		self._plateau = plateau
+		self._pipMax = pipMax
+		# index des dominos par extrêmité : self._pips[p] contient les dominos
+		# de la main ayant p pour extrêmité, un double n'y figurant qu'une fois.
+		# les coups jouables se lisent dans deux listes, quelle que soit la
+		# taille de la main ou du jeu
+		self._pips = [list() for p in range(pipMax + 1)]
+		# total des points de la main, et dominos par somme : self._sommes[s]
+		# contient les dominos de somme s, dans l'ordre où ils ont été ajoutés.
+		# self._max est la plus grande somme présente, 0 pour une main vide
+		self._points = 0
+		self._sommes = [list() for s in range(2 * pipMax + 1)]
+		self._max = 0
 	
 	def __len__(self):
 		return len(self._main)
@@ -68,14 +137,74 @@ class Main:
 	def addDomino(self, domino):
 		""" rajoute un domino dans la main """
 		self._main.append(domino)
+		self._ajouteIndex(domino)
+
+	# les index sont tenus à jour à chaque ajout et retrait : ces deux
+	# méthodes lisent directement les attributs du domino, pour aller plus vite
+
+	def _ajouteIndex(self, domino, places = None):
+		""" ajoute un domino à l'index par extrêmité et par somme
+		places : places du domino dans chaque liste de l'index, renvoyées par
+		_retireIndex, où le remettre ; à la fin des listes par défaut """
+		ext1, ext2, somme = domino._left, domino._right, domino._somme
+		if places is None:
+			self._pips[ext1].append(domino)
+			if ext2 != ext1: self._pips[ext2].append(domino)
+			self._sommes[somme].append(domino)
+		else:
+			self._pips[ext1].insert(places[0], domino)
+			if ext2 != ext1: self._pips[ext2].insert(places[1], domino)
+			self._sommes[somme].insert(places[2], domino)
+		self._points += somme
+		if somme > self._max: self._max = somme
+
+	def _retireIndex(self, domino):
+		""" retire un domino de l'index par extrêmité et par somme
+		renvoie ses places dans chaque liste de l'index """
+		ext1, ext2, somme = domino._left, domino._right, domino._somme
+		pips = self._pips[ext1]
+		place1 = pips.index(domino)
+		del pips[place1]
+		place2 = None
+		if ext2 != ext1:
+			pips = self._pips[ext2]
+			place2 = pips.index(domino)
+			del pips[place2]
+		self._points -= somme
+		sommes = self._sommes
+		place3 = sommes[somme].index(domino)
+		del sommes[somme][place3]
+		# la plus grande somme ne descend que d'au plus 2 * pipMax crans
+		if somme == self._max:
+			while self._max > 0 and not sommes[self._max]: self._max -= 1
+		return place1, place2, place3
 
 	def delDomino(self, domino):
 		""" retire un domino de la liste des dominos """
 		self._main.remove(domino)
-
-	def shuffleDominos(self):
-		""" mélange les dominos"""
-		random.shuffle(self._main)
+		self._retireIndex(domino)
+
+	def delDominoById(self, id):
+		""" retire et renvoie le domino à l'index id, sans le rechercher dans la main """
+		return self.retireDominoById(id)[0]
+
+	def retireDominoById(self, id):
+		""" comme delDominoById, mais renvoie (domino, places), places donnant
+		de quoi remettre le domino exactement où il était (voir addDominoById) """
+		domino = self._main.pop(id)
+		return domino, self._retireIndex(domino)
+
+	def addDominoById(self, id, domino, places = None):
+		""" rajoute un domino à l'index id, par exemple pour annuler delDominoById
+		places : renvoyées par retireDominoById ; la main, ses coups jouables
+		compris, redevient alors exactement ce qu'elle était avant le retrait """
+		self._main.insert(id, domino)
+		self._ajouteIndex(domino, places)
+
+	def shuffleDominos(self, rng = random):
+		""" mélange les dominos
+		rng : générateur aléatoire (random.Random), le module random par défaut """
+		rng.shuffle(self._main)
 
 	def playDominoById(self, id, plateau = None):
 		""" tente de jouer un domino via son id 
@@ -90,7 +219,7 @@ class Main:
 				if self._plateau is not None: _plateau = self._plateau
 			if _plateau is not None:
 				if _plateau.jouer(domino):
-					self.delDomino(domino)
+					self.delDominoById(id)
 					return domino
 			return None
 
@@ -103,6 +232,11 @@ class Main:
 	def reset(self):
 		""" réinitialise la main """
 		self._main = list()
+		# les index sont vidés sur place, sans recréer leurs listes
+		for dominos in self._pips: dominos.clear()
+		for dominos in self._sommes: dominos.clear()
+		self._points = 0
+		self._max = 0
 
 	def getDominos(self):
 		""" renvoie les dominos d'une amin """
@@ -114,208 +248,441 @@ class Main:
 		try: return self._main[id]
 		except IndexError: return None
 
+	def getDominosByPip(self, pip):
+		""" renvoie les dominos de la main ayant pip pour extrêmité """
+		return list(self._pips[pip])
+
+	def getJouables(self, left, right):
+		""" renvoie les dominos de la main ayant left ou right pour extrêmité
+		sans parcourir toute la main """
+		jouables = list(self._pips[left])
+		if right != left:
+			for domino in self._pips[right]:
+				# les dominos left | right sont déjà dans la liste
+				ext1, ext2 = domino.get()
+				if ext1 != left and ext2 != left: jouables.append(domino)
+		return jouables
+
 	def getPoints(self):
 		""" compte les points de la main """
-		points = 0
-		for domino in self._main:
-			points += domino.getSomme()
-		return points
+		return self._points
 	
 	def getBigDomino(self):
-		""" retourne le domino ayant la plus grande valeur """
+		""" retourne le domino ayant la plus grande valeur
+		à valeur égale, celui de plus grand numéro getId, comme bitboard.grand ;
+		le double zéro, qui ne vaut rien, n'est jamais renvoyé """
+		if self._max == 0: return None
+		dominos = self._sommes[self._max]
+		_domino = dominos[0]
+		for domino in dominos:
+			if domino._id > _domino._id: _domino = domino
+		return _domino
+
+	def getBigJouable(self, left, right):
+		""" retourne le plus grand domino ayant left ou right pour extrêmité,
+		celui de plus grand numéro à valeur égale (voir getBigDomino), sans
+		construire la liste des jouables : seuls deux index par extrêmité sont
+		parcourus. comme getBigDomino, ne renvoie jamais le double zéro """
+		# une liste de l'index n'a jamais plus de pipMax + 1 dominos distincts,
+		# quelques-uns en pratique : un maximum tenu par extrêmité coûterait
+		# plus à chaque ajout et retrait qu'il ne fait gagner ici
 		_domino = None
-		_som = 0
-		for domino in self._main:
-			som = domino.getSomme()
-			if som > _som:
-				_som = som
+		_rang = 0
+		for domino in self._pips[left]:
+			rang = domino._rang
+			if rang > _rang:
+				_rang = rang
 				_domino = domino
+		# les dominos left | right, déjà vus, ne peuvent pas faire mieux
+		if right != left:
+			for domino in self._pips[right]:
+				rang = domino._rang
+				if rang > _rang:
+					_rang = rang
+					_domino = domino
 		return _domino
 
-	def piocheDomino(self):
-		""" piocher un domino au hasard et l'efface """
+	def piocheDomino(self, rng = random):
+		""" piocher un domino au hasard et l'efface
+		rng : générateur aléatoire (random.Random), le module random par défaut """
 		if len(self._main) == 0:
 			return None
-		_domino = random.choice(self._main)
-		self.delDomino(_domino)
-		return _domino
+		return self.delDominoById(rng.randrange(len(self._main)))
 	
+# côtés du plateau
+GAUCHE, DROITE = 0, 1
+
 class Plateau:
-	""" plateau de jeu """
+	""" plateau de jeu
+	les dominos sont rangés de gauche à droite dans une file à deux bouts,
+	et les extrêmités du plateau sont gardées à part sous forme d'entiers """
 	def __init__(self):
-		self._plateau = list()
+		self._plateau = collections.deque()
+		# extrêmités gauche et droite, None tant que le plateau est vide
+		self._left = None
+		self._right = None
+
+	def __len__(self):
+		return len(self._plateau)
 
 	def reset(self):
 		""" réinitialise le plateau de jeu """
-		self._plateau = list()
+		self._plateau = collections.deque()
+		self._left = None
+		self._right = None
 
 	def getDominos(self):
-		""" renvoie la liste des dominos du plateau """
-		return self._plateau
+		""" renvoie la liste des dominos du plateau, de gauche à droite """
+		return list(self._plateau)
+
+	def setDominos(self, dominos):
+		""" remplace le plateau par une chaîne de dominos, de gauche à droite
+		les dominos doivent déjà être orientés """
+		self.reset()
+		self._plateau.extend(dominos)
+		if len(self._plateau) > 0:
+			self._left = self._plateau[0].getLeft()
+			self._right = self._plateau[-1].getRight()
+
+	def getExtremites(self):
+		""" renvoie les extrêmités gauche et droite du plateau
+		(None, None) si le plateau est vide """
+		return self._left, self._right
 
 	def __str__(self):
 		return "<| {} |>".format("".join([domino.__str__() for domino in self._plateau]))
 	
 	def isJouableDomino(self, domino):
 		""" renvoie True si un domino est jouable, False sinon"""
-		# on récupère les extrêmités du domino
-		if len(self._plateau) == 0:
+		if self._left is None:
 			return True
-
 		d_ext1, d_ext2 = domino.get()
-		# on recupère les extrêmités du plateau
-		# ces extrêmités sont des dominos
-		p_d1_ext = self._plateau[0].getLeft()
-		p_d2_ext = self._plateau[-1].getRight()
+		return (d_ext1 == self._left or d_ext1 == self._right
+			or d_ext2 == self._left or d_ext2 == self._right)
 
-		# on vérifie si les extrêmotés coincident
-		for ext in (d_ext1, d_ext2):
-			if ext in (p_d1_ext, p_d2_ext):
-				return True
-		return False
+	def pose(self, domino):
+		""" joue un domino
+		renvoie le côté où il a été posé, GAUCHE ou DROITE,
+		None si la tentative échoue """
+		d_ext1, d_ext2 = domino.get()
+		if self._left is None:
+			self._plateau.append(domino)
+			self._left, self._right = d_ext1, d_ext2
+			return DROITE
+		elif d_ext1 == self._left:
+			self._plateau.appendleft(domino.reverse())
+			self._left = d_ext2
+			return GAUCHE
+		elif d_ext1 == self._right:
+			self._plateau.append(domino)
+			self._right = d_ext2
+			return DROITE
+		elif d_ext2 == self._left:
+			self._plateau.appendleft(domino)
+			self._left = d_ext1
+			return GAUCHE
+		elif d_ext2 == self._right:
+			self._plateau.append(domino.reverse())
+			self._right = d_ext1
+			return DROITE
+		return None
 
 	def jouer(self, domino):
 		""" joue un domino 
 		renvoie True si la tentative marche,
 		False si elle échoue """
-		if self.isJouableDomino(domino):
-			if len(self._plateau) == 0:
-				self._plateau.append(domino)
-				return True
-			else:
-				d_ext1, d_ext2 = domino.get()
-				p_d1_ext = self._plateau[0].getLeft()
-				p_d2_ext = self._plateau[-1].getRight()
-				if d_ext1 == p_d1_ext:
-					domino.reverse()
-					self._plateau = [domino] + self._plateau
-					return True
-				elif d_ext1 == p_d2_ext:
-					self._plateau.append(domino)
-					return True
-				elif d_ext2 == p_d1_ext:
-					self._plateau = [domino] + self._plateau
-					return True
-				else:
-					if d_ext2 == p_d2_ext:
-						domino.reverse()
-						self._plateau.append(domino)
-						return True
-		return False
+		return self.pose(domino) is not None
+
+	def retire(self, cote):
+		""" retire le domino posé en dernier du côté cote, GAUCHE ou DROITE
+		et le renvoie dans le sens où il est posé """
+		if cote == GAUCHE:
+			domino = self._plateau.popleft()
+		else:
+			domino = self._plateau.pop()
+		if len(self._plateau) == 0:
+			self._left = self._right = None
+		elif cote == GAUCHE:
+			self._left = self._plateau[0].getLeft()
+		else:
+			self._right = self._plateau[-1].getRight()
+		return domino
 
 	def isJouableMain(self, main):
 		""" renvoie la liste des dominos jouables d'une main """
-		return [domino for domino in main.getDominos() if self.isJouableDomino(domino)]
+		if self._left is None:
+			return main.getDominos()
+		return main.getJouables(self._left, self._right)
+
+def ordiAleatoire(plateau, main, rng = random):
+	""" renvoie un domino au hasard parmi les dominos jouables d'une main """
+	_dominos = plateau.isJouableMain(main)
+	if len(_dominos) > 0: return rng.choice(_dominos)
+	return None
+
+def ordiGrand(plateau, main):
+	""" renvoie le plus grand des dominos jouables d'une main """
+	left, right = plateau.getExtremites()
+	# sur un plateau vide, tous les dominos sont jouables
+	if left is None: return main.getBigDomino()
+	return main.getBigJouable(left, right)
+
+# coups autres que la pose d'un domino
+PIOCHE, PASSE = "pioche", "passe"
+
+def jeuComplet(pipMax = 6):
+	""" renvoie les dominos du jeu complet double-pipMax,
+	orientés (petite, grande) et rangés par getId """
+	return tuple(Domino(low, high) for high in range(pipMax + 1) for low in range(high + 1))
+
+# les 28 dominos du jeu double-six
+DOMINOS = jeuComplet()
+_jeux = {6: DOMINOS}
+
+def newDistribution(pipMax = 6, rng = random):
+	""" renvoie les dominos du jeu complet double-pipMax, mélangés """
+	if pipMax not in _jeux: _jeux[pipMax] = jeuComplet(pipMax)
+	dominos = list(_jeux[pipMax])
+	rng.shuffle(dominos)
+	return dominos
+
+def sousGraine(graine, *indices):
+	""" renvoie la graine du sous-flux indices de graine (voir flux) """
+	return "/".join(str(n) for n in (graine,) + indices)
+
+def flux(graine, *indices):
+	""" renvoie le générateur aléatoire du sous-flux indices de graine
+	un sous-flux ne dépend que de la graine et de ses indices, ni de l'ordre
+	des tirages ni du processus qui l'utilise : la partie numéro i d'une
+	campagne peut ainsi être rejouée à l'identique, seule ou ailleurs """
+	return random.Random(sousGraine(graine, *indices))
+
+def distribue(dominos, main1, main2, pioche, taille = 8):
+	""" donne taille dominos à chaque main, un sur deux, et met le reste dans la pioche
+	les dominos sont donnés dans l'ordre de la liste, qui doit déjà être mélangée """
+	if 2 * taille > len(dominos):
+		raise Exception("Il n'y a pas assez de dominos pour des mains de {}".format(taille))
+	main1.reset()
+	main2.reset()
+	pioche.reset()
+	for domino in dominos[0:2 * taille:2]: main1.addDomino(domino)
+	for domino in dominos[1:2 * taille:2]: main2.addDomino(domino)
+	for domino in dominos[2 * taille:]: pioche.addDomino(domino)
+
+# textes des commandes r et i
+REGLES = (
+	"|----------------------------------------------|\n"
+	"|------ Domino Games -- Règles de jeu ---------|\n"
+	"|----------------------------------------------|\n"
+	"| Au début de la partie, le plateau de jeu est |\n"
+	"| vide. Vous avez le choix de placer n'importe |\n"
+	"| quel domino pour commencer.                  |\n"
+	"| Dès lors qu'il y a un domino sur le plateau  |\n"
+	"| les dominos à placer sur le plateau doivent  |\n"
+	"| avoir au moins une extrêmité commune avec    |\n"
+	"| l'une des deux extrêmités du plateau.        |\n"
+	"| Sachant que l'extrêmité droite du plateau    |\n"
+	"| correspond à l'extrêmité du domino le plus   |\n"
+	"| à droite ; pareil pour la gauche.            |\n"
+	"| Ne vous inquiétez pas! Dans une partie simple|\n"
+	"| les extrêmités d'un domino sont inter-       |\n"
+	"| changeables.                                 |\n"
+	"| Votre score est calculé en fonction des      |\n"
+	"| valeursdes dominos que vous arrivez à placer.|\n"
+	"| La partie s'arrête quand il n'y a plus aucun |\n"
+	"| domino à piocher et que tous les deux joueurs|\n"
+	"| ne peuvent plus jouer.                       |\n"
+	"|                                              |\n"
+	"| Quand c'est votre tour:                      |\n"
+	"| - Tapez 'r' pour afficher les règles de jeu  |\n"
+	"| - Pour pouvoir jouer un domino, tapez son    |\n"
+	"|   numéro correspondant. S'il est jouable,    |\n"
+	"|	 vous gagnez des points. S'il ne l'est pas, |\n"
+	"| 	 dans une partie simple, vous pourrez       |\n"
+	"| 	 retenter votre chance.                     |\n"
+	"| - Si vous êtes dans l'incapacité de jouer,   |\n"
+	"| 	 tapez 'p' pour piocher un domino, qui sera |\n"
+	"| 	 rajouté à votre main.                      |\n"
+	"| - Tapez 'q' pour quitter et abandonner la    |\n"
+	"|   partie.                                    |\n"
+	"| - Tapez 'i' pour avoir des infos sur l'auteur|\n"
+	"|   du jeu.                                    |\n"
+	"| Cordialement, Ben Kabongo.                   |\n"
+	"|----------------------------------------------|\n"
+)
+
+INFOS = (
+	"|----------------------------------------------|\n"
+	"|------ Domino Games -- A propos de moi--------|\n"
+	"|----------------------------------------------|\n"
+	"| Jeu codé par Ben Kabongo Buzangu             |\n"
+	"| Etudiant en L1 Informatique de l'Unicaen     |\n"
+	"| 21911598                                     |\n"
+	"|----------------------------------------------|\n"
+)
 
 class Jeu:
-	""" jeu principal """
-	def __init__(self):
+	""" jeu principal
+	l'état de la partie peut être modifié coup par coup, et chaque coup
+	annulé, sans aucune copie : voir appliqueCoup et annuleCoup
+	tous les tirages au hasard d'un jeu passent par son propre générateur,
+	initialisé par graine : voir aussi setFlux """
+	def __init__(self, taille = 8, pipMax = 6, graine = None):
 		self._plateau = Plateau()
-		self._mainOrdi = Main(self._plateau)
-		self._mainJoueur = Main(self._plateau)
-		self._pioche = Main() # main de dominos restants lors d'une distribution
+		# nombre de dominos de chaque main à la distribution
+		self._taille = taille
+		# les parties se jouent avec le jeu complet double-pipMax
+		self._pipMax = pipMax
+		self._mainOrdi = Main(self._plateau, pipMax)
+		self._mainJoueur = Main(self._plateau, pipMax)
+		self._pioche = Main(pipMax = pipMax) # main de dominos restants lors d'une distribution
+		# sans graine, le jeu en tire une au hasard, que getGraine renvoie
+		if graine is None: graine = random.getrandbits(64)
+		self.setGraine(graine)
+		# mains et scores indexés par joueur : 0 pour le joueur, 1 pour l'ordi
+		self._mains = (self._mainJoueur, self._mainOrdi)
+		self._scores = [0, 0]
+		# coups appliqués, de quoi les annuler : (joueur, coup, index, côté, domino)
+		self._historique = list()
+		# pour chaque coup de l'historique, places du domino retiré dans
+		# l'index de sa main (voir Main.retireDominoById), None pour PASSE
+		self._places = list()
+
+	def getGraine(self):
+		""" renvoie la graine du jeu """
+		return self._graine
+
+	def setGraine(self, graine):
+		""" repart d'un générateur initialisé par graine, comme un jeu neuf
+		(pour un sous-flux, voir sousGraine) """
+		self._graine = graine
+		self._rng = random.Random(graine)
+
+	def setFlux(self, *indices):
+		""" passe au sous-flux indices de la graine du jeu (voir flux) """
+		self._rng = flux(self._graine, *indices)
+
+	def getCoups(self, joueur):
+		""" renvoie les coups possibles d'un joueur : ses dominos jouables,
+		sinon PIOCHE s'il reste des dominos à piocher, sinon PASSE """
+		dominos = self._plateau.isJouableMain(self._mains[joueur])
+		if len(dominos) > 0: return dominos
+		if len(self._pioche) > 0: return [PIOCHE]
+		return [PASSE]
+
+	def getScores(self):
+		""" renvoie les scores du joueur et de l'ordi """
+		return self._scores[0], self._scores[1]
+
+	def appliqueCoup(self, joueur, coup, id = None):
+		""" applique un coup d'un joueur : un domino de sa main, PIOCHE ou PASSE
+		pour PIOCHE, id est l'index du domino pris dans la pioche,
+		tiré au hasard s'il n'est pas donné
+		renvoie le domino joué ou pioché, None pour PASSE """
+		main = self._mains[joueur]
+		if coup == PASSE:
+			self._historique.append((joueur, PASSE, None, None, None))
+			self._places.append(None)
+			return None
+		if coup == PIOCHE:
+			if id is None: id = self._rng.randrange(len(self._pioche))
+			domino, places = self._pioche.retireDominoById(id)
+			main.addDomino(domino)
+			self._historique.append((joueur, PIOCHE, id, None, domino))
+			self._places.append(places)
+			return domino
+		if id is None: id = main._main.index(coup)
+		cote = self._plateau.pose(coup)
+		if cote is None:
+			raise Exception("Le domino {} n'est pas jouable".format(coup))
+		places = main.retireDominoById(id)[1]
+		self._scores[joueur] += coup.getSomme()
+		self._historique.append((joueur, coup, id, cote, coup))
+		self._places.append(places)
+		return coup
+
+	def annuleCoup(self):
+		""" annule le dernier coup appliqué, et renvoie (joueur, coup) """
+		joueur, coup, id, cote, domino = self._historique.pop()
+		places = self._places.pop()
+		main = self._mains[joueur]
+		if coup == PIOCHE:
+			# le domino pioché est le dernier de la main et de ses index
+			main.delDominoById(len(main) - 1)
+			self._pioche.addDominoById(id, domino, places)
+		elif coup != PASSE:
+			self._plateau.retire(cote)
+			main.addDominoById(id, domino, places)
+			self._scores[joueur] -= domino.getSomme()
+		return joueur, coup
+
+	# ----------------------------------------- règles d'un tour
+	# un tour est fait du coup du joueur puis de celui de l'ordi ; un joueur
+	# sans domino jouable pioche, ou passe si la pioche est vide. la partie
+	# s'arrête à la fin d'un tour où un joueur a passé ou une main s'est vidée
+
+	def joue(self, joueur, domino, pioche = None):
+		""" fait jouer un joueur : il pose le domino, ou, pour None, pioche
+		(le domino d'index pioche, au hasard par défaut) ou passe si la
+		pioche est vide
+		renvoie False si le joueur a passé """
+		if domino is not None:
+			self.appliqueCoup(joueur, domino)
+		elif len(self._pioche) > 0:
+			self.appliqueCoup(joueur, PIOCHE, pioche)
+		else:
+			self.appliqueCoup(joueur, PASSE)
+			return False
+		return True
+
+	def _tour(self, joueur, strategie):
+		""" fait jouer un joueur selon une stratégie (voir strategies)
+		renvoie False s'il devait piocher mais que la pioche est vide """
+		return self.joue(joueur, strategie(self, self._mains[joueur]))
+
+	def isFinie(self, isPioche):
+		""" vrai si la partie s'arrête à la fin du tour qui vient d'être joué
+		isPioche : faux si un joueur a passé dans ce tour """
+		return not isPioche or len(self._mainJoueur) == 0 or len(self._mainOrdi) == 0
 
 	def _newDistribution(self):
-		""" renvoie une nouvelle distribution de 28 dominos """
-		dominos = list()
-		for i in range(28):
-			domino = Domino(random.randrange(0, 7), random.randrange(0, 7))
-			dominos.append(domino)
-		return dominos
+		""" renvoie une nouvelle distribution : le jeu complet mélangé """
+		return newDistribution(self._pipMax, self._rng)
 		
 	def _distribue(self, dominos):
-		""" donne 8 dominos au premier joueuur
-		8 au second et met le reste dans la pioche """
-		dominos = list(dominos)
-		self._mainOrdi.reset()
-		self._mainJoueur.reset()
-		self._pioche.reset()
-	
-		def _addRandomDomino(main):
-			nonlocal dominos
-			_domino = random.choice(dominos)
-			dominos.remove(_domino)
-			main.addDomino(_domino)
-
-		for i in range(8):
-			for main in (self._mainJoueur, self._mainOrdi):
-				_addRandomDomino(main)
-
-		for _domino in dominos:
-			self._pioche.addDomino(_domino)
-
-	def _ordi_getDomino(self):
-		""" renvoie un domino au hasard parmi une liste de dominos jouables """
-		_dominos = self._plateau.isJouableMain(self._mainOrdi)
-		if len(_dominos) > 0: return random.choice(_dominos)
-		return None
-
-	def _ordi_getDomino2(self):
-		""" renvoie le plus grand domino d'une liste de dominos jouables """
-		_dominos = self._plateau.isJouableMain(self._mainOrdi)
-		if len(_dominos) > 0:
-			# on crée une main, pour réutiliser la méthode getBigDomino
-			main = Main()
-			for d in _dominos: main.addDomino(d)
-			return main.getBigDomino()
-		return None
+		""" donne self._taille dominos au premier joueur,
+		autant au second et met le reste dans la pioche """
+		self._scores[0] = self._scores[1] = 0
+		self._historique.clear()
+		self._places.clear()
+		distribue(dominos, self._mainJoueur, self._mainOrdi, self._pioche, self._taille)
+
+	def _ordi_getDomino(self, main = None):
+		""" renvoie un domino au hasard parmi une liste de dominos jouables
+		la main de l'ordinateur est utilisée si aucune main n'est passée """
+		if main is None: main = self._mainOrdi
+		return ordiAleatoire(self._plateau, main, self._rng)
+
+	def _ordi_getDomino2(self, main = None):
+		""" renvoie le plus grand domino d'une liste de dominos jouables
+		la main de l'ordinateur est utilisée si aucune main n'est passée """
+		if main is None: main = self._mainOrdi
+		return ordiGrand(self._plateau, main)
 
 	def _afficheRegles(self):
 		""" affiche les règles du jeu """
-		print(	"|----------------------------------------------|\n"
-				"|------ Domino Games -- Règles de jeu ---------|\n"
-				"|----------------------------------------------|\n"
-				"| Au début de la partie, le plateau de jeu est |\n"
-				"| vide. Vous avez le choix de placer n'importe |\n"
-				"| quel domino pour commencer.                  |\n"
-				"| Dès lors qu'il y a un domino sur le plateau  |\n"
-				"| les dominos à placer sur le plateau doivent  |\n"
-				"| avoir au moins une extrêmité commune avec    |\n"
-				"| l'une des deux extrêmités du plateau.        |\n"
-				"| Sachant que l'extrêmité droite du plateau    |\n"
-				"| correspond à l'extrêmité du domino le plus   |\n"
-				"| à droite ; pareil pour la gauche.            |\n"
-				"| Ne vous inquiétez pas! Dans une partie simple|\n"
-				"| les extrêmités d'un domino sont inter-       |\n"
-				"| changeables.                                 |\n"
-				"| Votre score est calculé en fonction des      |\n"
-				"| valeursdes dominos que vous arrivez à placer.|\n"
-				"| La partie s'arrête quand il n'y a plus aucun |\n"
-				"| domino à piocher et que tous les deux joueurs|\n"
-				"| ne peuvent plus jouer.                       |\n"
-				"|                                              |\n"
-				"| Quand c'est votre tour:                      |\n"
-				"| - Tapez 'r' pour afficher les règles de jeu  |\n"
-				"| - Pour pouvoir jouer un domino, tapez son    |\n"
-				"|   numéro correspondant. S'il est jouable,    |\n"
-				"|	 vous gagnez des points. S'il ne l'est pas, |\n"
-				"| 	 dans une partie simple, vous pourrez       |\n"
-				"| 	 retenter votre chance.                     |\n"
-				"| - Si vous êtes dans l'incapacité de jouer,   |\n"
-				"| 	 tapez 'p' pour piocher un domino, qui sera |\n"
-				"| 	 rajouté à votre main.                      |\n"
-				"| - Tapez 'q' pour quitter et abandonner la    |\n"
-				"|   partie.                                    |\n"
-				"| - Tapez 'i' pour avoir des infos sur l'auteur|\n"
-				"|   du jeu.                                    |\n"
-				"| Cordialement, Ben Kabongo.                   |\n"
-				"|----------------------------------------------|\n"
-				)
+		print(REGLES)
 
 	def _afficheInfos(self):
 		""" affiche les infos sur le concepteur du jeu """
-		""" affiche les règles du jeu """
-		print(	"|----------------------------------------------|\n"
-				"|------ Domino Games -- A propos de moi--------|\n"
-				"|----------------------------------------------|\n"
-				"| Jeu codé par Ben Kabongo Buzangu             |\n"
-				"| Etudiant en L1 Informatique de l'Unicaen     |\n"
-				"| 21911598                                     |\n"
-				"|----------------------------------------------|\n"
-				)
-
-	def newPart(self):
-		""" lance une nouvelle partie """
+		print(INFOS)
+
+	def newPart(self, difficile = None):
+		""" lance une nouvelle partie
+		difficile : stratégie de l'ordinateur au niveau difficile, une fonction
+		(jeu, main) comme celles de strategies ; _ordi_getDomino2 par défaut
+		les coups passent par appliqueCoup, et sont donc dans l'historique """
+		if difficile is None: difficile = Jeu._ordi_getDomino2
 		print(	"-----------------Domino Games----------------\n"
 				"----- auteur : Ben Kabongo Buzangu ----------\n"
 				"---------------------------------------------")
@@ -374,13 +741,9 @@ class Jeu:
 					scan = input().strip().lower()
 					# on pioche	
 					if scan == "p": 
-						pioche = self._pioche.piocheDomino()
-						if pioche is None:
-							isPioche = False
-							print("Vous ne pouvez plus piocher !")
-						else:
-							print("Vous avez pioché ", pioche)
-							self._mainJoueur.addDomino(pioche)
+						isPioche = self.joue(0, None)
+						if isPioche: print("Vous avez pioché ", self._historique[-1][4])
+						else: print("Vous ne pouvez plus piocher !")
 						essaie = False
 					# on quitte la partie	
 					elif scan == "q": 
@@ -404,7 +767,10 @@ class Jeu:
 						else: 
 							# si le joueur n'a pas pioché
 							if id is not None:
-								domino = self._mainJoueur.playDominoById(id)
+								domino = self._mainJoueur.getDominoById(id)
+								if domino is not None and self._plateau.isJouableDomino(domino):
+									self.appliqueCoup(0, domino, id)
+								else: domino = None
 								essaie = False
 
 				# quitter
@@ -422,37 +788,23 @@ class Jeu:
 				
 				# en fonction du niveau de difficulté, on utilise la méthode adéquate
 				if not difficult: domino = self._ordi_getDomino()
-				else: domino = self._ordi_getDomino2()
+				else: domino = difficile(self, self._mainOrdi)
 				
-				# on pioche si l'ordi n'a pas pu trouver un domino jouable
-				if domino is None:
-					pioche = self._pioche.piocheDomino()
-					if pioche is None:
-						# On ne peut plus piocher
-						isPioche = False
-					else:
-						# on ajoute la pioche et on passe
-						self._mainOrdi.addDomino(pioche)
-						print("L'ordinateur a pioché !")
-				else:
-					# dans le cas où il a un domino jouable
-					self._mainOrdi.playDomino(domino)
+				# l'ordi pioche s'il n'a pas pu trouver un domino jouable
+				isPioche = self.joue(1, domino) and isPioche
+				if domino is not None:
 					print("L'ordinateur a joué :", domino)
 					scoreOrdi += domino.getSomme()
+				elif self._historique[-1][1] == PIOCHE:
+					print("L'ordinateur a pioché !")
 
-				# si on ne peut plus piocher, on quitte la partie
-				if not isPioche:
-					play = 0
+				# si on ne peut plus piocher, ou si une main est vide, la partie est finie
+				if self.isFinie(isPioche): break
 				# si on peut continuer, on mélange les dominos et on repart
-				else:
-					self._mainOrdi.shuffleDominos()
-					self._mainJoueur.shuffleDominos()
-					print("Score | Ordi {} - {} Vous".format(scoreOrdi, scoreJoueur))
-					print()
-
-				# toutefois, si un des joueurs a placé tous ses dominos, la partie est finie
-				if self._mainOrdi.__len__() == 0 or self._mainJoueur.__len__() == 0:
-					break
+				self._mainOrdi.shuffleDominos(self._rng)
+				self._mainJoueur.shuffleDominos(self._rng)
+				print("Score | Ordi {} - {} Vous".format(scoreOrdi, scoreJoueur))
+				print()
 
 			# la partie est terminée ou l'utilisateur a quitté la partie
 			print("Score | Ordi {} - {} Vous".format(scoreOrdi, scoreJoueur))
@@ -467,7 +819,11 @@ class Jeu:
 			print("Merci d'avoir joué ! Ciao !")
 
 def main():
-	Jeu().newPart()
+	# au niveau difficile, l'ordinateur lit la table des finales quand elle
+	# couvre la position (voir strategies) ; le jeu est pris dans le module
+	# model importé par strategies, dont il partage les dominos
+	import strategies
+	strategies.model.Jeu().newPart(strategies.get("finales"))
 
 if __name__ == "__main__":
 	main()
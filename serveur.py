@@ -0,0 +1,223 @@
+# auteur: Ben Kabongo Buzangu
+# serveur de parties de dominos
+
+""" Jeu de Domino - Serveur
+un serveur asyncio, sur une socket TCP ou Unix locale : chaque connexion
+joue sa propre partie contre l'ordinateur, toutes les parties tournant
+sur une seule boucle d'événements.
+le protocole reprend les commandes de la partie en mode texte
+(model.Jeu.newPart), une commande par ligne :
+	un numéro : pose le domino de ce numéro de la main (à partir de 1)
+	p : pioche, ou passe quand la pioche est vide
+	r : règles du jeu, i : informations sur l'auteur
+	n [stratégie] : abandonne la partie et en commence une nouvelle
+	q : quitte
+chaque réponse est un bloc de lignes terminé par une ligne vide. après
+un coup, le bloc donne les coups du joueur et de l'ordinateur, puis
+l'état de la partie :
+	plateau <| ... |>
+	main -| ... |-
+	jouables <numéros des dominos jouables>
+	pioche <taille de la pioche> ordi <taille de la main de l'ordinateur>
+	score <points de l'ordinateur> <points du joueur>
+une ligne « fin gagné|perdu|nul <ordi> <joueur> » annonce la fin de la
+partie : l'état qui suit est celui de la partie suivante.
+un domino non jouable ou une commande inconnue donne une ligne
+« erreur ... », sans que le tour soit perdu.
+les stratégies trop lentes pour la boucle d'événements (LOURDES) jouent
+dans un pool de processus """
+
+import argparse
+import asyncio
+import concurrent.futures
+
+import model
+import strategies
+
+HOTE = "127.0.0.1"
+PORT = 5555
+
+# stratégies jouées hors de la boucle d'événements
+LOURDES = {"montecarlo"}
+
+def _decide(nom, jeu):
+	""" renvoie, dans un processus du pool, le coup de l'ordinateur selon la stratégie nom """
+	return strategies.get(nom)(jeu, jeu._mainOrdi)
+
+class Session:
+	""" partie d'un client contre l'ordinateur
+	adversaire : nom de la stratégie de l'ordinateur
+	executor : pool où jouent les stratégies de LOURDES, None pour les
+	jouer dans la boucle d'événements """
+	def __init__(self, adversaire = "difficile", taille = 8, pipMax = 6, graine = None,
+		executor = None):
+		self._jeu = model.Jeu(taille, pipMax, graine)
+		self._executor = executor
+		self.nouvelle(adversaire)
+
+	def nouvelle(self, adversaire):
+		""" commence une nouvelle partie contre la stratégie adversaire """
+		strategies.verifie(adversaire, self._jeu._pipMax)
+		self._strategie = strategies.get(adversaire)
+		self._adversaire = adversaire
+		jeu = self._jeu
+		jeu._plateau.reset()
+		jeu._distribue(jeu._newDistribution())
+
+	def getEtat(self):
+		""" renvoie les lignes décrivant l'état de la partie """
+		jeu = self._jeu
+		main = jeu._mainJoueur
+		jouables = [str(id + 1) for id, domino in enumerate(main._main)
+			if jeu._plateau.isJouableDomino(domino)]
+		scoreJoueur, scoreOrdi = jeu.getScores()
+		return ["plateau {}".format(jeu._plateau), "main {}".format(main),
+			"jouables {}".format(" ".join(jouables)).rstrip(),
+			"pioche {} ordi {}".format(len(jeu._pioche), len(jeu._mainOrdi)),
+			"score {} {}".format(scoreOrdi, scoreJoueur)]
+
+	async def _coupOrdi(self):
+		""" renvoie le domino que joue l'ordinateur, None s'il doit piocher """
+		jeu = self._jeu
+		if self._executor is not None and self._adversaire in LOURDES:
+			# la session attend la réponse avant de lire la commande suivante :
+			# le jeu ne change pas pendant que le processus réfléchit
+			boucle = asyncio.get_running_loop()
+			return await boucle.run_in_executor(self._executor, _decide, self._adversaire, jeu)
+		return self._strategie(jeu, jeu._mainOrdi)
+
+	async def commande(self, ligne):
+		""" exécute une commande du client
+		renvoie les lignes de la réponse, None si le client quitte """
+		jeu = self._jeu
+		mots = ligne.split()
+		commande = mots[0].lower() if mots else ""
+		if commande == "q": return None
+		if commande == "r": return model.REGLES.splitlines()
+		if commande == "i": return model.INFOS.splitlines()
+		if commande == "n":
+			try: self.nouvelle(mots[1] if len(mots) > 1 else self._adversaire)
+			except Exception as e: return ["erreur {}".format(e)]
+			return self.getEtat()
+
+		# coup du joueur : un tour comme ceux de simulation.Simulation, dont
+		# le coup de l'ordinateur est attendu s'il est joué dans le pool
+		if commande == "p":
+			domino = None
+		else:
+			try: id = int(commande) - 1
+			except ValueError: return ["erreur commande inconnue : {}".format(ligne.strip())]
+			domino = jeu._mainJoueur.getDominoById(id) if id >= 0 else None
+			if domino is None:
+				return ["erreur pas de domino numéro {}".format(commande)]
+			if not jeu._plateau.isJouableDomino(domino):
+				return ["erreur le domino {} n'est pas jouable".format(domino)]
+		isPioche = jeu.joue(0, domino)
+		joueur, coup, id, cote, domino = jeu._historique[-1]
+		if coup == model.PASSE: lignes = ["vous passez"]
+		elif coup == model.PIOCHE: lignes = ["vous piochez {}".format(domino)]
+		else: lignes = ["vous jouez {}".format(domino)]
+
+		# coup de l'ordinateur, dont le domino pioché reste caché
+		isPioche = jeu.joue(1, await self._coupOrdi()) and isPioche
+		joueur, coup, id, cote, domino = jeu._historique[-1]
+		if coup == model.PASSE: lignes.append("ordi passe")
+		elif coup == model.PIOCHE: lignes.append("ordi pioche")
+		else: lignes.append("ordi joue {}".format(domino))
+
+		if jeu.isFinie(isPioche):
+			scoreJoueur, scoreOrdi = jeu.getScores()
+			if scoreJoueur > scoreOrdi: issue = "gagné"
+			elif scoreJoueur < scoreOrdi: issue = "perdu"
+			else: issue = "nul"
+			lignes.append("fin {} {} {}".format(issue, scoreOrdi, scoreJoueur))
+			self.nouvelle(self._adversaire)
+		return lignes + self.getEtat()
+
+def _bloc(lignes):
+	""" encode les lignes d'une réponse, terminée par une ligne vide """
+	return ("\n".join(lignes) + "\n\n").encode()
+
+class Serveur:
+	""" serveur de parties de dominos (voir Session)
+	graine : la session numéro k joue sur le sous-flux k de cette graine
+	processus : taille du pool des stratégies de LOURDES, tous les coeurs par défaut """
+	def __init__(self, adversaire = "difficile", taille = 8, pipMax = 6, graine = None,
+		processus = None):
+		strategies.verifie(adversaire, pipMax)
+		self._adversaire = adversaire
+		self._taille = taille
+		self._pipMax = pipMax
+		self._graine = graine
+		self._processus = processus
+		self._executor = None
+		self._sessions = 0
+		self._actives = 0
+
+	def getNbSessions(self):
+		""" renvoie le nombre de sessions ouvertes depuis le lancement, et de sessions actives """
+		return self._sessions, self._actives
+
+	async def _connexion(self, lecteur, ecrivain):
+		""" joue la session d'un client """
+		graine = None
+		if self._graine is not None: graine = model.sousGraine(self._graine, self._sessions)
+		session = Session(self._adversaire, self._taille, self._pipMax, graine, self._executor)
+		self._sessions += 1
+		self._actives += 1
+		try:
+			ecrivain.write(_bloc(["dominos {}".format(self._adversaire)] + session.getEtat()))
+			while True:
+				ligne = await lecteur.readline()
+				if not ligne: break
+				lignes = await session.commande(ligne.decode(errors = "replace"))
+				if lignes is None:
+					ecrivain.write(_bloc(["au revoir"]))
+					break
+				ecrivain.write(_bloc(lignes))
+				await ecrivain.drain()
+			await ecrivain.drain()
+		except ConnectionError: pass
+		finally:
+			self._actives -= 1
+			ecrivain.close()
+
+	async def sert(self, hote = HOTE, port = PORT, unix = None, pret = None):
+		""" sert les clients jusqu'à l'annulation de la tâche
+		unix : chemin d'une socket Unix, à la place de hote et port
+		pret : asyncio.Event signalé quand le serveur écoute """
+		with concurrent.futures.ProcessPoolExecutor(self._processus) as self._executor:
+			# des milliers de clients peuvent se connecter d'un coup
+			if unix is not None:
+				serveur = await asyncio.start_unix_server(self._connexion, unix, backlog = 4096)
+			else:
+				serveur = await asyncio.start_server(self._connexion, hote, port, backlog = 4096)
+			async with serveur:
+				if pret is not None: pret.set()
+				await serveur.serve_forever()
+
+def main():
+	parser = argparse.ArgumentParser(description = "Serveur de parties de dominos")
+	parser.add_argument("--hote", default = HOTE)
+	parser.add_argument("--port", type = int, default = PORT)
+	parser.add_argument("-u", "--unix", default = None, help = "chemin d'une socket Unix")
+	parser.add_argument("-a", "--adversaire", default = "difficile",
+		help = "stratégie de l'ordinateur par défaut : " + ", ".join(strategies.noms()))
+	parser.add_argument("-t", "--taille", type = int, default = 8,
+		help = "nombre de dominos de chaque main")
+	parser.add_argument("-p", "--pips", type = int, default = 6,
+		help = "plus grande extrêmité du jeu : 6 pour le double-six")
+	parser.add_argument("-j", "--processus", type = int, default = None,
+		help = "processus des stratégies lourdes, tous les coeurs par défaut")
+	parser.add_argument("-s", "--graine", type = int, default = None)
+	args = parser.parse_args()
+	try: strategies.verifie(args.adversaire, args.pips)
+	except Exception as e: parser.error(str(e))
+
+	serveur = Serveur(args.adversaire, args.taille, args.pips, args.graine, args.processus)
+	print("serveur à l'écoute sur", args.unix or "{}:{}".format(args.hote, args.port))
+	try: asyncio.run(serveur.sert(args.hote, args.port, args.unix))
+	except KeyboardInterrupt: pass
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,114 @@
+# auteur: Ben Kabongo Buzangu
+# jeu de domino sans interface : l'ordinateur contre l'ordinateur
+
+""" Jeu de Domino - Simulation
+une partie simulée suit les règles de model.Jeu.newPart sans aucune
+entrée/sortie : à chaque tour, chaque joueur pose un domino jouable
+choisi par sa stratégie, ou pioche s'il n'en a aucun.
+la partie s'arrête quand un joueur doit piocher alors que la pioche
+est vide, ou quand un des joueurs n'a plus de domino en main.
+le premier joueur utilise la main du joueur, le second celle de l'ordi """
+
+import argparse
+import collections
+import time
+
+import enregistrement
+import model
+import strategies
+
+# résultat d'une partie simulée
+# score1, score2 : points marqués par chacun des joueurs
+# tours : nombre de tours joués
+# plateau : dominos posés, de gauche à droite
+Resultat = collections.namedtuple("Resultat", ("score1", "score2", "tours", "plateau"))
+
+class Simulation(model.Jeu):
+	""" partie de dominos entre deux ordinateurs
+	une stratégie est donnée par son nom dans strategies, ou directement
+	si un enregistrement.Enregistreur est donné, chaque partie y est écrite
+	taille : nombre de dominos de chaque main à la distribution
+	pipMax : les parties se jouent avec le jeu double-pipMax ; les stratégies
+	de bitboard, dont montecarlo, ne connaissent que le double-six (voir
+	strategies.DOUBLE_SIX)
+	graine : graine des tirages au hasard ; la partie numéro i est jouée sur
+	le sous-flux i de la graine, et se rejoue donc seule à l'identique """
+	def __init__(self, strategie1 = "facile", strategie2 = "difficile", enregistreur = None,
+		taille = 8, pipMax = 6, graine = None):
+		model.Jeu.__init__(self, taille, pipMax, graine)
+		for strategie in (strategie1, strategie2):
+			if not callable(strategie): strategies.verifie(strategie, pipMax)
+		self._noms = tuple(s if isinstance(s, str) else s.__name__ for s in (strategie1, strategie2))
+		self._strategie1 = strategie1 if callable(strategie1) else strategies.get(strategie1)
+		self._strategie2 = strategie2 if callable(strategie2) else strategies.get(strategie2)
+		self._enregistreur = enregistreur
+
+	def partie(self, numero = None):
+		""" joue une partie complète et renvoie son résultat
+		numero : numéro de la partie, qui fixe son sous-flux aléatoire ;
+		sans numéro, la partie suit les tirages de la précédente """
+		if numero is not None: self.setFlux(numero)
+		self._plateau.reset()
+		self._distribue(self._newDistribution())
+		if self._enregistreur is not None:
+			donne = [main.getDominos() for main in (self._mainJoueur, self._mainOrdi, self._pioche)]
+
+		tours = 0
+		while True:
+			tours += 1
+			isPioche = self._tour(0, self._strategie1)
+			isPioche = self._tour(1, self._strategie2) and isPioche
+			if self.isFinie(isPioche): break
+
+		score1, score2 = self.getScores()
+		if self._enregistreur is not None:
+			self._enregistreur.ecritJeu(self, self._noms, donne)
+		return Resultat(score1, score2, tours, self._plateau.getDominos())
+
+	def parties(self, n, debut = 0):
+		""" générateur des résultats des n parties numérotées à partir de debut """
+		for numero in range(debut, debut + n):
+			yield self.partie(numero)
+
+def main():
+	parser = argparse.ArgumentParser(description = "Simulation de parties de dominos")
+	parser.add_argument("parties", type = int, nargs = "?", default = 100000,
+		help = "nombre de parties à simuler")
+	parser.add_argument("--strategie1", choices = strategies.noms(), default = "facile")
+	parser.add_argument("--strategie2", choices = strategies.noms(), default = "difficile")
+	parser.add_argument("-e", "--enregistre", metavar = "FICHIER", default = None,
+		help = "ajoute les parties à un fichier d'enregistrement")
+	parser.add_argument("-t", "--taille", type = int, default = 8,
+		help = "nombre de dominos de chaque main à la distribution")
+	parser.add_argument("-p", "--pips", type = int, default = 6,
+		help = "plus grande extrêmité du jeu : 6, 9, 12 ou 15")
+	parser.add_argument("-s", "--graine", type = int, default = None)
+	args = parser.parse_args()
+	for nom in (args.strategie1, args.strategie2):
+		try: strategies.verifie(nom, args.pips)
+		except Exception as e: parser.error(str(e))
+
+	enregistreur = None
+	if args.enregistre is not None:
+		enregistreur = enregistrement.Enregistreur(args.enregistre)
+	simulation = Simulation(args.strategie1, args.strategie2, enregistreur, args.taille, args.pips,
+		args.graine)
+	victoires1 = victoires2 = nuls = tours = 0
+
+	debut = time.perf_counter()
+	for resultat in simulation.parties(args.parties):
+		tours += resultat.tours
+		if resultat.score1 > resultat.score2: victoires1 += 1
+		elif resultat.score1 < resultat.score2: victoires2 += 1
+		else: nuls += 1
+	duree = time.perf_counter() - debut
+	if enregistreur is not None: enregistreur.fermer()
+
+	print("{} parties en {:.2f} s : {:.0f} parties/s".format(
+		args.parties, duree, args.parties / duree if duree > 0 else 0))
+	print("{} {} - {} {} ({} nuls)".format(
+		args.strategie1, victoires1, victoires2, args.strategie2, nuls))
+	print("tours par partie : {:.2f}".format(tours / max(args.parties, 1)))
+
+if __name__ == "__main__":
+	main()
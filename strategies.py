@@ -0,0 +1,63 @@
+# auteur: Ben Kabongo Buzangu
+# registre des stratégies de l'ordinateur
+
+""" Jeu de Domino - Stratégies
+une stratégie est une fonction strategie(jeu, main) qui renvoie le
+domino de la main à jouer sur le plateau du model.Jeu, ou None si la
+main doit piocher. le jeu donne aussi accès à ce que le joueur peut
+savoir de la partie : le plateau, la taille de la pioche et celle de
+la main adverse.
+les stratégies sont enregistrées sous un nom, ce qui permet de les
+désigner depuis la ligne de commande ou dans un processus fils """
+
+import mcts
+import model
+import tablebase
+
+_strategies = dict()
+
+def enregistre(nom, strategie = None):
+	""" enregistre une stratégie sous un nom
+	s'utilise directement ou comme décorateur :
+		@enregistre("nom")
+		def strategie(jeu, main): ... """
+	def _enregistre(strategie):
+		if nom in _strategies:
+			raise Exception("La stratégie {} existe déjà".format(nom))
+		_strategies[nom] = strategie
+		return strategie
+
+	if strategie is None: return _enregistre
+	return _enregistre(strategie)
+
+def get(nom):
+	""" renvoie la stratégie enregistrée sous ce nom """
+	try: return _strategies[nom]
+	except KeyError:
+		raise Exception("Stratégie inconnue : {}".format(nom)) from None
+
+def noms():
+	""" renvoie la liste triée des noms de stratégies """
+	return sorted(_strategies)
+
+# stratégies qui ne jouent qu'avec le jeu double-six
+DOUBLE_SIX = {"montecarlo"}
+
+def verifie(nom, pipMax = 6):
+	""" vérifie que la stratégie nom existe et se joue avec le jeu double-pipMax """
+	get(nom)
+	if pipMax != 6 and nom in DOUBLE_SIX:
+		raise Exception("La stratégie {} ne se joue qu'au double-six".format(nom))
+
+enregistre("facile", model.Jeu._ordi_getDomino)
+enregistre("difficile", model.Jeu._ordi_getDomino2)
+enregistre("montecarlo", mcts.MonteCarlo(deroules = 200).getDomino)
+
+@enregistre("finales")
+def finales(jeu, main):
+	""" le plus grand domino jouable, comme difficile, sauf quand la pioche
+	est vide : le meilleur coup est alors lu dans la table des finales, si
+	elle a été générée et couvre la position (voir tablebase) """
+	domino = tablebase.getDomino(jeu, main)
+	if domino is None: domino = jeu._ordi_getDomino2(main)
+	return domino
@@ -0,0 +1,359 @@
+# auteur: Ben Kabongo Buzangu
+# table des fins de partie précalculées
+
+""" Jeu de Domino - Table des finales
+quand la pioche est vide, chaque joueur connaît la main de l'autre : ce
+sont les dominos qui ne sont ni posés ni dans sa main. les fins de partie
+du double-six où il reste peu de dominos dans les deux mains sont alors
+résolues une fois pour toutes, et leur meilleur coup est rangé dans une
+table sur disque, que l'ordinateur consulte au lieu de chercher.
+les règles et les valeurs sont celles de finale.Solveur : la valeur d'une
+position est le nombre de points que le joueur au trait marquera encore,
+moins celui que marquera son adversaire.
+une position est donnée par les masques de bitboard des deux mains, les
+extrêmités du plateau et le trait : 0 pour le premier joueur du tour, 1
+pour le second. les dominos posés sont tous les autres, et les extrêmités
+sont rangées dans l'ordre croissant, la position retournée ayant même
+valeur et même meilleur coup. ne sont rangées que les positions où le
+joueur au trait a un domino jouable : les autres, comme celles où le
+premier joueur vient d'échouer à piocher, se calculent aussitôt.
+la table est construite couche par couche, en partant d'un domino restant :
+chaque coup mène à une position de la couche précédente, déjà connue.
+une couche est découpée en tranches calculées par un ensemble de
+processus ; chaque tranche est écrite dans son propre fichier, si bien
+qu'une génération interrompue reprend là où elle s'était arrêtée.
+le fichier de la table contient un en-tête, puis les clés des positions
+triées (entiers de 64 bits), leurs meilleurs coups et leurs valeurs
+(un octet chacun). il est projeté en mémoire, et une consultation est une
+recherche dichotomique sur les clés """
+
+import argparse
+import bisect
+import concurrent.futures
+import heapq
+import itertools
+import math
+import mmap
+import os
+import random
+import struct
+import time
+from array import array
+
+import bitboard
+import model
+
+FICHIER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebase.bin")
+
+# en-tête : signature, nombre de positions, nombre de dominos des couches calculées
+_ENTETE = struct.Struct("<8sQI12x")
+_SIGNATURE = b"DOMFIN01"
+
+# nombre d'ensembles de dominos restants par tranche
+_TRANCHE = 2000
+
+def cle(main, adverse, left, right, trait):
+	""" renvoie la clé d'une position, ses extrêmités étant dans l'ordre croissant """
+	return (((main << bitboard.NB_DOMINOS | adverse) << 6 | left << 3 | right) << 1) | trait
+
+class Table:
+	""" table des finales projetée en mémoire depuis le fichier chemin """
+	def __init__(self, chemin = FICHIER):
+		self._fichier = open(chemin, "rb")
+		self._mmap = mmap.mmap(self._fichier.fileno(), 0, access = mmap.ACCESS_READ)
+		signature, n, self._tuiles = _ENTETE.unpack_from(self._mmap)
+		if signature != _SIGNATURE:
+			raise Exception("{} n'est pas une table des finales".format(chemin))
+		debut = _ENTETE.size
+		vue = memoryview(self._mmap)
+		self._cles = vue[debut:debut + 8 * n].cast("Q")
+		self._coups = vue[debut + 8 * n:debut + 9 * n]
+		self._valeurs = vue[debut + 9 * n:debut + 10 * n].cast("b")
+		self._n = n
+
+	def __len__(self):
+		return self._n
+
+	def __iter__(self):
+		""" parcourt les entrées (clé, coup, valeur) dans l'ordre des clés """
+		return zip(self._cles, self._coups, self._valeurs)
+
+	def fermer(self):
+		""" libère la projection et le fichier """
+		for vue in (self._cles, self._coups, self._valeurs): vue.release()
+		self._mmap.close()
+		self._fichier.close()
+
+	def getTuiles(self):
+		""" renvoie le plus grand nombre de dominos restants couvert par la table """
+		return self._tuiles
+
+	def cherche(self, cle):
+		""" renvoie (coup, valeur) de la position de cette clé, None si elle n'y est pas """
+		i = bisect.bisect_left(self._cles, cle)
+		if i < self._n and self._cles[i] == cle: return self._coups[i], self._valeurs[i]
+		return None
+
+	def resout(self, main, adverse, left, right, trait, echec = False):
+		""" renvoie (valeur, coup) d'une position pour le joueur au trait,
+		le coup étant le bit du domino à jouer, None s'il faut piocher
+		echec : vrai si le premier joueur vient d'échouer à piocher
+		renvoie None si la position n'est pas dans la table """
+		jouables = main & (bitboard.PIPS[left] | bitboard.PIPS[right])
+		if jouables == 0:
+			# la pioche échoue : au second joueur, la partie est finie
+			if trait == 1: return 0, None
+			solution = self.resout(adverse, main, left, right, 1, True)
+			if solution is None: return None
+			return -solution[0], None
+		# le second joueur joue son dernier coup : le plus grand domino jouable
+		if trait == 1 and echec:
+			n = jouables.bit_length() - 1
+			return bitboard.SOMMES[n], n
+		if left > right: left, right = right, left
+		entree = self.cherche(cle(main, adverse, left, right, trait))
+		if entree is None: return None
+		return entree[1], entree[0]
+
+# ----------------------------------------- consultation par l'ordinateur
+
+_table = dict()
+
+def getTable(chemin = FICHIER):
+	""" renvoie la table projetée en mémoire, None si elle n'a pas été générée
+	la table est ouverte une seule fois par processus """
+	if chemin not in _table:
+		_table[chemin] = Table(chemin) if os.path.exists(chemin) else None
+	return _table[chemin]
+
+def _domino(main, n):
+	""" renvoie le domino de la main qui occupe le bit n """
+	id = bitboard.IDS[n]
+	for domino in main.getDominos():
+		if domino.getId() == id: return domino
+	return None
+
+def getDomino(jeu, main):
+	""" renvoie le meilleur domino de main, l'une des mains du model.Jeu
+	dont la pioche est vide, None si la table ne couvre pas la position
+	ou si la main n'a aucun domino jouable """
+	table = getTable()
+	if table is None or jeu._pipMax != 6 or len(jeu._pioche) > 0: return None
+	if main is jeu._mainJoueur: trait, adverse = 0, jeu._mainOrdi
+	elif main is jeu._mainOrdi: trait, adverse = 1, jeu._mainJoueur
+	else: return None
+	left, right = jeu._plateau.getExtremites()
+	if left is None or len(main) + len(adverse) > table.getTuiles(): return None
+	# le premier joueur a-t-il échoué à piocher dans ce tour ?
+	historique = jeu._historique
+	echec = trait == 1 and len(historique) > 0 and historique[-1][:2] == (0, model.PASSE)
+	solution = table.resout(bitboard.depuisMain(main), bitboard.depuisMain(adverse),
+		left, right, trait, echec)
+	if solution is None or solution[1] is None: return None
+	return _domino(main, solution[1])
+
+def getDominoPlateau(plateau, main, premier = False, echec = False):
+	""" comme getDomino, pour une main et un model.Plateau du double-six
+	quand la pioche est vide : la main adverse est faite des dominos
+	ni posés ni dans la main """
+	table = getTable()
+	if table is None: return None
+	left, right, joues = bitboard.depuisPlateau(plateau)
+	if joues == 0: return None
+	masque = bitboard.depuisMain(main)
+	adverse = bitboard.TOUS & ~(joues | masque)
+	if bitboard.compte(masque | adverse) > table.getTuiles(): return None
+	solution = table.resout(masque, adverse, left, right, 0 if premier else 1, echec)
+	if solution is None or solution[1] is None: return None
+	return _domino(main, solution[1])
+
+# ----------------------------------------- génération
+
+def _extremites(restants):
+	""" renvoie les extrêmités (left <= right) possibles du plateau quand
+	restent les dominos du masque restants : les sommets de degré impair
+	du graphe des dominos posés, ou n'importe quel sommet s'il n'y en a pas """
+	impairs = list()
+	for p in range(7):
+		degre = 0
+		for n in bitboard.bits(restants & bitboard.PIPS[p]):
+			low, high = bitboard.DOMINOS[n]
+			if low != high: degre += 1
+		if degre % 2: impairs.append(p)
+	if len(impairs) == 2: return [tuple(impairs)]
+	if len(impairs) == 0:
+		# l'extrêmité doit toucher un domino posé
+		return [(p, p) for p in range(7) if bitboard.PIPS[p] & ~restants]
+	return list()
+
+def _resout(table, main, adverse, left, right, trait):
+	""" calcule (valeur, coup) d'une position, les positions ayant un
+	domino de moins étant dans la table """
+	meilleur = meilleurCoup = None
+	jouables = main & (bitboard.PIPS[left] | bitboard.PIPS[right])
+	# les plus grands dominos d'abord : à valeur égale, le plus grand est gardé
+	for n in reversed(bitboard.bits(jouables)):
+		gain = bitboard.SOMMES[n]
+		reste = main ^ (1 << n)
+		l, r = bitboard.joue(n, left, right)
+		if trait == 1 and (reste == 0 or adverse == 0):
+			valeur = gain
+		else:
+			solution = table.resout(adverse, reste, l, r, 1 - trait)
+			if solution is None:
+				raise Exception("Position absente de la table : couche précédente incomplète")
+			valeur = gain - solution[0]
+		if meilleur is None or valeur > meilleur:
+			meilleur, meilleurCoup = valeur, n
+	return meilleur, meilleurCoup
+
+def _ecrit(chemin, entrees, n, tuiles):
+	""" écrit n entrées (clé, coup, valeur) triées dans une table,
+	par un fichier temporaire renommé à la fin """
+	temporaire = chemin + ".tmp"
+	coups, valeurs = bytearray(), array("b")
+	with open(temporaire, "wb") as fichier:
+		fichier.write(_ENTETE.pack(_SIGNATURE, n, tuiles))
+		cles = array("Q")
+		for c, coup, valeur in entrees:
+			cles.append(c)
+			coups.append(coup)
+			valeurs.append(valeur)
+			if len(cles) >= 1 << 16:
+				cles.tofile(fichier)
+				cles = array("Q")
+		cles.tofile(fichier)
+		fichier.write(coups)
+		valeurs.tofile(fichier)
+	os.replace(temporaire, chemin)
+
+def _genereTranche(chemin, tuiles, debut, fin, sortie):
+	""" calcule, dans un processus fils, les positions à tuiles dominos
+	restants dont l'ensemble est entre le numéro debut et fin - 1 des
+	combinaisons, et les écrit triées dans le fichier sortie """
+	table = Table(chemin)
+	entrees = list()
+	for combinaison in itertools.islice(itertools.combinations(range(bitboard.NB_DOMINOS), tuiles),
+		debut, fin):
+		restants = 0
+		for n in combinaison: restants |= 1 << n
+		for left, right in _extremites(restants):
+			jouables = bitboard.PIPS[left] | bitboard.PIPS[right]
+			# toutes les répartitions des dominos restants entre les deux mains
+			main = restants
+			while main:
+				adverse = restants ^ main
+				if main & jouables:
+					for trait in (0, 1):
+						# le premier joueur du tour a toujours des dominos
+						if trait == 0 and adverse == 0: continue
+						valeur, coup = _resout(table, main, adverse, left, right, trait)
+						entrees.append((cle(main, adverse, left, right, trait), coup, valeur))
+				main = (main - 1) & restants
+	table.fermer()
+	entrees.sort()
+	_ecrit(sortie, entrees, len(entrees), tuiles)
+	return len(entrees)
+
+def _fusionne(chemin, parties, tuiles):
+	""" fusionne la table et les tranches d'une nouvelle couche en une table """
+	tables = [Table(chemin)] + [Table(partie) for partie in parties]
+	n = sum(len(table) for table in tables)
+	_ecrit(chemin, heapq.merge(*tables), n, tuiles)
+	for table in tables: table.fermer()
+	for partie in parties: os.remove(partie)
+
+def genere(tuiles = 5, chemin = FICHIER, processus = None, affiche = print):
+	""" génère ou complète la table jusqu'à tuiles dominos restants
+	processus : nombre de processus, tous les coeurs par défaut
+	les couches déjà calculées et les tranches déjà écrites sont gardées """
+	if not os.path.exists(chemin): _ecrit(chemin, [], 0, 0)
+	table = Table(chemin)
+	fait = table.getTuiles()
+	table.fermer()
+
+	for couche in range(fait + 1, tuiles + 1):
+		debut = time.perf_counter()
+		total = math.comb(bitboard.NB_DOMINOS, couche)
+		parties = list()
+		# un pool par couche : les fils ouvrent la table à jour
+		with concurrent.futures.ProcessPoolExecutor(processus) as executor:
+			taches = list()
+			for i, premier in enumerate(range(0, total, _TRANCHE)):
+				partie = "{}.{}.{}".format(chemin, couche, i)
+				parties.append(partie)
+				if os.path.exists(partie): continue
+				taches.append(executor.submit(_genereTranche, chemin, couche, premier,
+					min(premier + _TRANCHE, total), partie))
+			for tache in concurrent.futures.as_completed(taches): tache.result()
+		_fusionne(chemin, parties, couche)
+		if affiche is not None:
+			affiche("couche {} : {:.1f} s".format(couche, time.perf_counter() - debut))
+
+# ----------------------------------------- vérification
+
+def _positions(tuiles, rng):
+	""" tire au hasard des positions d'au plus tuiles dominos restants
+	où le premier joueur du tour a un domino jouable """
+	while True:
+		restants = 0
+		for n in rng.sample(range(bitboard.NB_DOMINOS), rng.randint(2, tuiles)):
+			restants |= 1 << n
+		extremites = _extremites(restants)
+		if not extremites: continue
+		left, right = rng.choice(extremites)
+		main = 0
+		for n in bitboard.bits(restants):
+			if rng.random() < 0.5: main |= 1 << n
+		adverse = restants ^ main
+		if main == 0 or adverse == 0 or not bitboard.coups(main, left, right): continue
+		try: plateau = bitboard.versPlateau(left, right, bitboard.TOUS & ~restants)
+		except Exception: continue
+		yield plateau, main, adverse
+
+def main():
+	import finale
+
+	parser = argparse.ArgumentParser(description = "Table des finales du double-six")
+	parser.add_argument("-k", "--tuiles", type = int, default = 5,
+		help = "nombre maximal de dominos restants dans les deux mains")
+	parser.add_argument("-f", "--fichier", default = FICHIER)
+	parser.add_argument("-j", "--processus", type = int, default = None,
+		help = "nombre de processus, tous les coeurs par défaut")
+	parser.add_argument("-v", "--verifie", type = int, default = 200,
+		help = "positions comparées au solveur de finale")
+	parser.add_argument("-s", "--graine", type = int, default = 0)
+	args = parser.parse_args()
+
+	genere(args.tuiles, args.fichier, args.processus)
+	table = Table(args.fichier)
+	print("{} positions | {} dominos restants au plus | {:.1f} Mo".format(
+		len(table), table.getTuiles(), os.path.getsize(args.fichier) / 10 ** 6))
+
+	# comparaison avec la recherche alpha-bêta et durée des consultations
+	rng = random.Random(args.graine)
+	solveur = finale.Solveur()
+	positions = list()
+	erreurs = 0
+	for plateau, masque, adverse in itertools.islice(_positions(table.getTuiles(), rng), args.verifie):
+		left, right = plateau.getExtremites()
+		positions.append((masque, adverse, left, right))
+		for trait in (0, 1):
+			solveur.vide()
+			solution = solveur.resout(plateau, bitboard.versMain(masque, plateau),
+				bitboard.versMain(adverse, plateau), premier = trait == 0)
+			if table.resout(masque, adverse, left, right, trait)[0] != solution.valeur: erreurs += 1
+	print("{} positions vérifiées aux deux traits | {} erreurs".format(len(positions), erreurs))
+
+	if positions:
+		n = 100000 // len(positions) + 1
+		debut = time.perf_counter()
+		for i in range(n):
+			for masque, adverse, left, right in positions:
+				table.resout(masque, adverse, left, right, 0)
+		duree = time.perf_counter() - debut
+		print("consultation : {:.2f} µs".format(10 ** 6 * duree / (n * len(positions))))
+	table.fermer()
+
+if __name__ == "__main__":
+	main()
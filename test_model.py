@@ -0,0 +1,304 @@
+# auteur: Ben Kabongo Buzangu
+# tests du modèle
+
+""" Jeu de Domino - Tests du modèle
+python -m pytest, ou python -m unittest """
+
+import os
+import random
+import struct
+import tempfile
+import unittest
+
+import model
+
+def _etatMain(main):
+	""" renvoie tout l'état d'une main, index compris """
+	return (list(main._main), [list(dominos) for dominos in main._pips],
+		[list(dominos) for dominos in main._sommes], main._points, main._max)
+
+def _etat(jeu):
+	""" renvoie tout l'état d'un jeu, de quoi le comparer après annulation """
+	return ([_etatMain(main) for main in (jeu._mainJoueur, jeu._mainOrdi, jeu._pioche)],
+		jeu._plateau.getDominos(), jeu._plateau.getExtremites(), jeu.getScores(),
+		list(jeu._historique), [jeu.getCoups(joueur) for joueur in (0, 1)])
+
+class TestAnnuleCoup(unittest.TestCase):
+	""" appliqueCoup puis annuleCoup rend exactement le même jeu """
+
+	def _verifie(self, jeu, joueur, coup):
+		avant = _etat(jeu)
+		jeu.appliqueCoup(joueur, coup)
+		jeu.annuleCoup()
+		self.assertEqual(_etat(jeu), avant, "coup {} du joueur {}".format(coup, joueur))
+
+	def test_tousLesCoups(self):
+		for pipMax in (6, 9):
+			for graine in range(30):
+				jeu = model.Jeu(pipMax = pipMax, graine = graine)
+				jeu._distribue(jeu._newDistribution())
+				rng = random.Random(graine)
+				joueur = 0
+				while len(jeu._mainJoueur) > 0 and len(jeu._mainOrdi) > 0:
+					# chaque type de coup : chaque domino jouable, la pioche et la passe
+					coups = list(jeu._plateau.isJouableMain(jeu._mains[joueur]))
+					if len(jeu._pioche) > 0: coups.append(model.PIOCHE)
+					coups.append(model.PASSE)
+					for coup in coups: self._verifie(jeu, joueur, coup)
+
+					# la partie avance d'un coup au hasard, pour annuler ensuite
+					# des coups dans des positions variées
+					coup = rng.choice(jeu.getCoups(joueur))
+					if coup == model.PASSE: break
+					jeu.appliqueCoup(joueur, coup)
+					joueur ^= 1
+
+				# toute la partie s'annule, jusqu'à la donne
+				while jeu._historique: jeu.annuleCoup()
+				donne = model.Jeu(pipMax = pipMax, graine = graine)
+				donne._distribue(donne._newDistribution())
+				self.assertEqual(_etat(jeu), _etat(donne))
+
+class TestGrand(unittest.TestCase):
+	""" ordiGrand choisit le même domino que bitboard.grand """
+
+	def test_memeDomino(self):
+		import bitboard
+		rng = random.Random(0)
+		for i in range(2000):
+			main1, main2, pioche = bitboard.distribue(rng)
+			main = bitboard.versMain(main1)
+			plateau = model.Plateau()
+			left = right = bitboard.VIDE
+			if rng.random() < 0.9:
+				left, right = rng.randrange(7), rng.randrange(7)
+				plateau.setDominos([model.Domino(left, right)])
+			domino = model.ordiGrand(plateau, main)
+			n = bitboard.grand(main1, left, right)
+			self.assertEqual(None if domino is None else bitboard.BITS[domino.getId()], n)
+
+	def test_lots(self):
+		# coupsLot et grandsLot rendent, voie par voie, coups et grand
+		import bitboard
+		rng = random.Random(0)
+		mains, extremites = list(), bytearray()
+		for i in range(500):
+			mains.append(rng.getrandbits(bitboard.NB_DOMINOS) if i % 2 else bitboard.distribue(rng)[0])
+			left, right = rng.choice([(bitboard.VIDE, bitboard.VIDE), (rng.randrange(7), rng.randrange(7))])
+			extremites.append(left << 3 | right)
+		lot = bitboard.lot(mains)
+		jouables = bitboard.masquesLot(bitboard.coupsLot(lot, bytes(extremites)), len(mains))
+		grands = bitboard.grandsLot(lot, bytes(extremites))
+		for main, e, masque, n in zip(mains, extremites, jouables, grands):
+			self.assertEqual(masque, bitboard.coups(main, e >> 3, e & 7))
+			grand = bitboard.grand(main, e >> 3, e & 7)
+			self.assertEqual(n, -1 if grand is None else grand)
+
+class TestDeroule(unittest.TestCase):
+	""" mcts._deroule marque les mêmes points qu'une partie de model.Jeu au
+	plus grand domino, où la pioche se prend dans le même ordre """
+
+	def test_memesPoints(self):
+		import bitboard
+		import mcts
+		rng = random.Random(0)
+		deroules = 0
+		for i in range(1000):
+			jeu = model.Jeu()
+			jeu._distribue(model.newDistribution(6, rng))
+			# le déroulé part de la position qui suit le coup numéro k, si ce
+			# coup pose un domino, et court jusqu'à la fin de la partie
+			k = rng.randrange(40)
+			coups, depart = 0, None
+			fini = False
+			while not fini:
+				isPioche = True
+				for joueur in (0, 1):
+					domino = model.ordiGrand(jeu._plateau, jeu._mains[joueur])
+					if domino is not None:
+						jeu.appliqueCoup(joueur, domino)
+					elif len(jeu._pioche) > 0:
+						jeu.appliqueCoup(joueur, model.PIOCHE, 0)
+					else:
+						jeu.appliqueCoup(joueur, model.PASSE)
+						isPioche = False
+					if coups == k and domino is not None:
+						left, right, joues = bitboard.depuisPlateau(jeu._plateau)
+						depart = (joueur, bitboard.depuisMain(jeu._mains[joueur]),
+							bitboard.depuisMain(jeu._mains[1 - joueur]),
+							[bitboard.BITS[d.getId()] for d in jeu._pioche.getDominos()],
+							left, right, not isPioche, jeu.getScores())
+					coups += 1
+				fini = not isPioche or len(jeu._mainJoueur) == 0 or len(jeu._mainOrdi) == 0
+			if depart is None: continue
+
+			joueur, moi, adverse, pioche, left, right, echec, scores = depart
+			points = mcts._deroule(moi, adverse, pioche, left, right, bitboard.grand, rng,
+				premier = joueur == 0, echec = echec)
+			fin = jeu.getScores()
+			self.assertEqual(points, (fin[joueur] - scores[joueur]) - (fin[1 - joueur] - scores[1 - joueur]),
+				"partie {}, coup {}".format(i, k))
+			deroules += 1
+		self.assertGreater(deroules, 400)
+
+def _minimax(jeu, joueur, echec):
+	""" valeur exacte de la fin de partie pour le joueur au trait, sans
+	élagage ni table, en jouant les coups sur le model.Jeu """
+	meilleur = None
+	for coup in jeu.getCoups(joueur):
+		jeu.appliqueCoup(joueur, coup)
+		gain = coup.getSomme() if coup != model.PASSE else 0
+		_echec = echec or coup == model.PASSE
+		if joueur == 1 and (_echec or len(jeu._mains[0]) == 0 or len(jeu._mains[1]) == 0):
+			valeur = gain
+		else:
+			valeur = gain - _minimax(jeu, joueur ^ 1, _echec and joueur == 0)
+		jeu.annuleCoup()
+		if meilleur is None or valeur > meilleur: meilleur = valeur
+	return meilleur
+
+class TestFinale(unittest.TestCase):
+	""" finale.Solveur trouve la valeur de la recherche exhaustive """
+
+	def test_valeurs(self):
+		import finale
+		rng = random.Random(0)
+		solveur = finale.Solveur(1 << 10)
+		positions = 0
+		while positions < 200:
+			position = finale._finale(rng)
+			if position is None: continue
+			plateau, main1, main2 = position
+			# de petites mains, pour que la recherche exhaustive reste courte
+			mains = [rng.sample(main.getDominos(), min(len(main), rng.randint(1, 4)))
+				for main in (main1, main2)]
+			jeu = model.Jeu()
+			jeu._plateau.setDominos(plateau.getDominos())
+			for main, dominos in zip(jeu._mains, mains):
+				for domino in dominos: main.addDomino(domino)
+
+			premier = rng.random() < 0.5
+			echec = not premier and rng.random() < 0.3
+			trait = 0 if premier else 1
+			solveur.vide()
+			solution = solveur.resout(jeu._plateau, jeu._mains[trait], jeu._mains[1 - trait],
+				premier, echec)
+			self.assertEqual(solution.valeur, _minimax(jeu, trait, echec), "position {}".format(positions))
+			positions += 1
+
+class TestEnregistrement(unittest.TestCase):
+	""" enregistrement.Lecteur relit les parties écrites par l'Enregistreur,
+	et celles des fichiers de la version 1 """
+
+	def setUp(self):
+		dossier = tempfile.TemporaryDirectory()
+		self.addCleanup(dossier.cleanup)
+		self._chemin = os.path.join(dossier.name, "parties.dom")
+
+	def _verifie(self, pipMax, n):
+		""" écrit n parties simulées au jeu double-pipMax, les relit et
+		renvoie les coups relus """
+		import enregistrement
+		import simulation
+		with enregistrement.Enregistreur(self._chemin) as enregistreur:
+			jeu = simulation.Simulation("facile", "difficile", enregistreur, pipMax = pipMax, graine = 0)
+			resultats = [(jeu.partie(numero), list(jeu._historique)) for numero in range(n)]
+
+		with enregistrement.Lecteur(self._chemin) as lecteur:
+			parties = list(lecteur)
+		self.assertEqual(len(parties), n)
+		donne = simulation.Simulation(pipMax = pipMax, graine = 0)
+		coups = list()
+		for numero, (partie, (resultat, historique)) in enumerate(zip(parties, resultats)):
+			self.assertEqual((partie.strategie1, partie.strategie2), ("facile", "difficile"))
+			self.assertEqual((partie.score1, partie.score2), (resultat.score1, resultat.score2))
+			# la donne est celle du sous-flux de la partie
+			donne.setFlux(numero)
+			donne._distribue(donne._newDistribution())
+			self.assertEqual([partie.main1, partie.main2, partie.pioche],
+				[main.getDominos() for main in (donne._mainJoueur, donne._mainOrdi, donne._pioche)])
+			self.assertEqual(partie.coups,
+				[(joueur, coup, domino) for joueur, coup, id, cote, domino in historique])
+			coups.extend(partie.coups)
+		return coups
+
+	def test_doubleSix(self):
+		self._verifie(6, 20)
+
+	def test_doubleQuinze(self):
+		# le double-15 a le code 255, celui qui marque aussi une passe
+		coups = self._verifie(15, 20)
+		quinze = model.Domino(15, 15)
+		self.assertIn(model.PASSE, [coup for joueur, coup, domino in coups])
+		self.assertIn(quinze, [domino for joueur, coup, domino in coups])
+
+	def test_version1(self):
+		# les dominos du double-six y sont codés par 7 * gauche + droite
+		import enregistrement
+		noms = b"".join(nom.ljust(enregistrement.TAILLE_NOM, b"\0") for nom in (b"facile", b"difficile"))
+		donne = [(6, 6), (1, 2), (6, 5), (0, 0), (3, 4)]
+		coups = [(0, enregistrement.POSE, (6, 6)), (1, enregistrement.POSE, (6, 5)),
+			(0, enregistrement.PIOCHE, (3, 4)), (1, enregistrement.PASSE, None)]
+		with open(self._chemin, "wb") as fichier:
+			fichier.write(struct.pack("<4sBB", enregistrement.SIGNATURE, 1, 2))
+			fichier.write(noms.ljust(enregistrement.NB_NOMS * enregistrement.TAILLE_NOM, b"\0"))
+			fichier.write(struct.pack("<BBBBBBhhH", 0, 1, 2, 2, 1, 0, 12, 11, len(coups)))
+			fichier.write(bytes(7 * left + right for left, right in donne))
+			for joueur, type, domino in coups:
+				fichier.write(bytes((joueur | type << 1, 255 if domino is None else 7 * domino[0] + domino[1])))
+
+		with enregistrement.Lecteur(self._chemin) as lecteur:
+			parties = list(lecteur)
+		dominos = [model.Domino(*domino) for domino in donne]
+		self.assertEqual(parties, [enregistrement.PartieLue("facile", "difficile",
+			dominos[:2], dominos[2:4], dominos[4:],
+			[(0, dominos[0], dominos[0]), (1, dominos[2], dominos[2]),
+				(0, model.PIOCHE, dominos[4]), (1, model.PASSE, None)], 12, 11)])
+
+def _bilan(victoires1, victoires2, nuls):
+	""" renvoie un tournoi.Bilan de ces parties, chaque victoire par 10 points d'écart """
+	import simulation
+	import tournoi
+	bilan = tournoi.Bilan()
+	for score1, score2, n in ((20, 10, victoires1), (10, 20, victoires2), (15, 15, nuls)):
+		for i in range(n): bilan.ajoute(simulation.Resultat(score1, score2, 1, []))
+	return bilan
+
+class TestArret(unittest.TestCase):
+	""" décisions des règles d'arrêt de tournoi """
+
+	def test_sprt(self):
+		import tournoi
+		sprt = tournoi.Sprt()
+		self.assertEqual(sprt.decide(_bilan(600, 400, 0)), 1)
+		self.assertEqual(sprt.decide(_bilan(400, 600, 0)), 2)
+		self.assertEqual(tournoi.Sprt("points").decide(_bilan(400, 600, 0)), 2)
+		# trop peu de parties pour décider, même si l'écart est net
+		self.assertIsNone(sprt.decide(_bilan(70, 20, 0)))
+		self.assertEqual(tournoi.Sprt(minimum = 50).decide(_bilan(70, 20, 0)), 1)
+		# sans variance, le rapport de vraisemblance n'est pas défini
+		self.assertIsNone(sprt.decide(_bilan(0, 0, 500)))
+		self.assertIsNone(sprt.decide(_bilan(500, 0, 0)))
+		self.assertIsNone(sprt.getLlr(_bilan(0, 0, 500)))
+
+	def test_intervalle(self):
+		import tournoi
+		self.assertEqual(tournoi.Intervalle().decide(_bilan(600, 400, 0)), 1)
+		self.assertEqual(tournoi.Intervalle().decide(_bilan(400, 600, 0)), 2)
+		self.assertIsNone(tournoi.Intervalle().decide(_bilan(60, 40, 0)))
+		# des stratégies qui se valent, mesurées assez précisément
+		self.assertIsNone(tournoi.Intervalle().decide(_bilan(500, 500, 0)))
+		self.assertEqual(tournoi.Intervalle(precision = 0.05).decide(_bilan(500, 500, 0)), 0)
+
+	def test_processus(self):
+		# la décision et le bilan ne dépendent pas du nombre de processus
+		import tournoi
+		bilans = [tournoi.tournoi(["facile", "difficile"], 1000, processus, graine = 0,
+			arret = tournoi.Sprt("points")) for processus in (1, 2)]
+		(paire, bilan1), = bilans[0].items()
+		bilan2 = bilans[1][paire]
+		self.assertIsNotNone(bilan1.decision)
+		self.assertEqual(vars(bilan1), vars(bilan2))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,301 @@
+# auteur: Ben Kabongo Buzangu
+# tournoi entre les stratégies de l'ordinateur
+
+""" Jeu de Domino - Tournoi
+chaque paire de stratégies s'affronte sur un nombre donné de parties.
+les parties sont découpées en tranches, jouées par un ensemble de
+processus ; chaque tranche renvoie un bilan, et les bilans sont
+fusionnés au fur et à mesure.
+une paire joue une partie sur deux dans chaque ordre, pour ne pas
+avantager le premier joueur. la partie numéro k d'une paire est jouée
+sur le sous-flux k de sa graine (voir model.flux) : un tournoi se rejoue
+à l'identique, quels que soient le nombre de processus et la taille des
+tranches.
+une règle d'arrêt (Sprt ou Intervalle) peut arrêter une paire dès que
+l'écart entre ses stratégies est significatif : les tranches sont alors
+soumises au fur et à mesure, leurs bilans fusionnés dans l'ordre des
+tranches, et la règle consultée après chaque fusion ; les tranches de la
+paire qui n'ont pas commencé sont annulées. la décision ne dépend que de
+la taille des tranches, pas du nombre de processus """
+
+import argparse
+import collections
+import concurrent.futures
+import itertools
+import math
+import os
+import random
+import statistics
+import time
+
+import simulation
+import strategies
+
+class Bilan:
+	""" bilan des parties entre deux stratégies """
+	def __init__(self):
+		self.parties = 0
+		self.victoires1 = 0
+		self.victoires2 = 0
+		self.nuls = 0
+		self.points1 = 0
+		self.points2 = 0
+		# somme des carrés des écarts de points, pour la variance
+		self.carres = 0
+		# décision d'une règle d'arrêt : 1 ou 2 pour la meilleure stratégie,
+		# 0 si elles se valent, None sans décision
+		self.decision = None
+
+	def __str__(self):
+		return "{} - {} ({} nuls) | points {} - {}".format(
+			self.victoires1, self.victoires2, self.nuls, self.points1, self.points2)
+
+	def ajoute(self, resultat):
+		""" ajoute le résultat d'une partie au bilan """
+		self.parties += 1
+		self.points1 += resultat.score1
+		self.points2 += resultat.score2
+		self.carres += (resultat.score1 - resultat.score2) ** 2
+		if resultat.score1 > resultat.score2: self.victoires1 += 1
+		elif resultat.score1 < resultat.score2: self.victoires2 += 1
+		else: self.nuls += 1
+
+	def fusionne(self, bilan, inverse = False):
+		""" ajoute un autre bilan à celui-ci
+		si inverse est vrai, les joueurs de l'autre bilan sont échangés """
+		victoires1, victoires2 = bilan.victoires1, bilan.victoires2
+		points1, points2 = bilan.points1, bilan.points2
+		if inverse:
+			victoires1, victoires2 = victoires2, victoires1
+			points1, points2 = points2, points1
+		self.parties += bilan.parties
+		self.victoires1 += victoires1
+		self.victoires2 += victoires2
+		self.nuls += bilan.nuls
+		self.points1 += points1
+		self.points2 += points2
+		self.carres += bilan.carres
+
+	def getTauxVictoire(self):
+		""" renvoie le taux de victoire du premier joueur, un nul comptant pour moitié """
+		if self.parties == 0: return 0.5
+		return (self.victoires1 + 0.5 * self.nuls) / self.parties
+
+	def getStatistiques(self, critere = "victoires"):
+		""" renvoie (parties, moyenne, variance) du résultat d'une partie
+		pour le premier joueur, selon le critère :
+		victoires : 1 pour une victoire, 0.5 pour un nul, 0 pour une défaite
+		points : écart de points entre les deux joueurs """
+		n = self.parties
+		if n == 0: return 0, 0.0, 0.0
+		if critere == "victoires":
+			somme, carres = self.victoires1 + 0.5 * self.nuls, self.victoires1 + 0.25 * self.nuls
+		elif critere == "points":
+			somme, carres = self.points1 - self.points2, self.carres
+		else:
+			raise Exception("Critère inconnu : {}".format(critere))
+		moyenne = somme / n
+		return n, moyenne, max(carres / n - moyenne ** 2, 0.0)
+
+# ----------------------------------------- règles d'arrêt
+# une règle d'arrêt décide, à partir du bilan d'une paire, si l'on peut
+# s'arrêter : decide renvoie 1 ou 2 pour la meilleure stratégie, 0 si elles
+# se valent, None pour continuer
+
+# valeur du critère quand les deux stratégies se valent
+_CENTRES = {"victoires": 0.5, "points": 0.0}
+
+class Sprt:
+	""" test séquentiel du rapport de vraisemblance (SPRT), en approximation
+	normale : la moyenne du critère vaut-elle centre + ecart (la première
+	stratégie est meilleure) ou centre - ecart (la seconde l'est) ?
+	alpha, beta : risques de se tromper dans un sens ou dans l'autre
+	quand l'écart réel est plus petit que ecart, l'une ou l'autre
+	hypothèse finit par être acceptée, après plus de parties """
+	def __init__(self, critere = "victoires", ecart = None, alpha = 0.05, beta = 0.05, minimum = 100):
+		if ecart is None: ecart = 0.02 if critere == "victoires" else 1.0
+		self._critere = critere
+		self._mu0 = _CENTRES[critere] - ecart
+		self._mu1 = _CENTRES[critere] + ecart
+		self._bas = math.log(beta / (1 - alpha))
+		self._haut = math.log((1 - beta) / alpha)
+		self._minimum = minimum
+
+	def __str__(self):
+		return "SPRT {} [{:g}, {:g}]".format(self._critere, self._mu0, self._mu1)
+
+	def getLlr(self, bilan):
+		""" renvoie le logarithme du rapport de vraisemblance, None s'il n'est pas défini """
+		n, moyenne, variance = bilan.getStatistiques(self._critere)
+		if n == 0 or variance == 0: return None
+		return n * (self._mu1 - self._mu0) * (2 * moyenne - self._mu0 - self._mu1) / (2 * variance)
+
+	def decide(self, bilan):
+		if bilan.parties < self._minimum: return None
+		llr = self.getLlr(bilan)
+		if llr is None: return None
+		if llr >= self._haut: return 1
+		if llr <= self._bas: return 2
+		return None
+
+class Intervalle:
+	""" intervalle de confiance de niveau 1 - alpha sur la moyenne du critère :
+	on s'arrête quand il ne contient plus la valeur où les stratégies se
+	valent, ou quand sa demi-largeur passe sous precision
+	l'intervalle étant recalculé après chaque tranche, le risque réel
+	dépasse un peu alpha : minimum évite de conclure sur les premières parties """
+	def __init__(self, critere = "victoires", alpha = 0.05, precision = None, minimum = 1000):
+		self._critere = critere
+		self._centre = _CENTRES[critere]
+		self._z = statistics.NormalDist().inv_cdf(1 - alpha / 2)
+		self._precision = precision
+		self._minimum = minimum
+
+	def __str__(self):
+		return "intervalle {}".format(self._critere)
+
+	def getIntervalle(self, bilan):
+		""" renvoie les bornes de l'intervalle de confiance """
+		n, moyenne, variance = bilan.getStatistiques(self._critere)
+		if n == 0: return -math.inf, math.inf
+		demi = self._z * math.sqrt(variance / n)
+		return moyenne - demi, moyenne + demi
+
+	def decide(self, bilan):
+		if bilan.parties < self._minimum: return None
+		bas, haut = self.getIntervalle(bilan)
+		if bas > self._centre: return 1
+		if haut < self._centre: return 2
+		if self._precision is not None and (haut - bas) / 2 < self._precision: return 0
+		return None
+
+def _joueTranche(strategie1, strategie2, debut, parties, graine):
+	""" joue dans un processus fils les parties numérotées de debut
+	à debut + parties - 1 d'une paire, les parties impaires dans l'ordre inverse
+	renvoie le bilan du point de vue de strategie1 """
+	jeux = (simulation.Simulation(strategie1, strategie2, graine = graine),
+		simulation.Simulation(strategie2, strategie1, graine = graine))
+	bilan = Bilan()
+	for numero in range(debut, debut + parties):
+		inverse = numero % 2
+		resultat = jeux[inverse].partie(numero)
+		if inverse:
+			resultat = resultat._replace(score1 = resultat.score2, score2 = resultat.score1)
+		bilan.ajoute(resultat)
+	return bilan
+
+def _tranches(parties, taille):
+	""" découpe un nombre de parties en tranches d'au plus taille parties
+	renvoie la liste des (debut, parties) des tranches """
+	return [(debut, min(taille, parties - debut)) for debut in range(0, parties, taille)]
+
+def tournoi(noms = None, parties = 1000, processus = None, taille = None, graine = None,
+	arret = None):
+	""" fait s'affronter chaque paire de stratégies sur parties parties
+	renvoie un dictionnaire {(nom1, nom2): Bilan} du point de vue de nom1
+	processus : nombre de processus, tous les coeurs par défaut
+	taille : nombre de parties par tranche, calculé par défaut pour
+	donner quelques tranches à chaque processus, 100 avec une règle d'arrêt
+	graine : graine de départ, pour rejouer un tournoi à l'identique
+	arret : règle d'arrêt (Sprt, Intervalle) ; parties est alors le nombre
+	maximal de parties, et la décision est notée dans le bilan """
+	if noms is None: noms = strategies.noms()
+	for nom in noms: strategies.get(nom)
+	if processus is None: processus = os.cpu_count() or 1
+	if graine is None: graine = random.randrange(2 ** 32)
+
+	paires = list(itertools.combinations(noms, 2))
+	if taille is None:
+		if arret is not None: taille = 100
+		else: taille = max(1, (parties * len(paires)) // (processus * 4))
+
+	bilans = {paire: Bilan() for paire in paires}
+	# tranches à soumettre, en alternant les paires : (paire, numéro, debut, parties)
+	file = collections.deque(tranche for tranches in itertools.zip_longest(
+		*([(paire, i, debut, n) for i, (debut, n) in enumerate(_tranches(parties, taille))]
+		for paire in paires)) for tranche in tranches if tranche is not None)
+	# par paire : bilans des tranches finies en attente de fusion, numéro de la suivante
+	attente = {paire: dict() for paire in paires}
+	suivante = {paire: 0 for paire in paires}
+	finies = set()
+	with concurrent.futures.ProcessPoolExecutor(processus) as executor:
+		taches = dict()
+		while True:
+			# quelques tranches d'avance par processus, pour ne pas jouer
+			# trop de parties inutiles après une décision
+			while file and len(taches) < 2 * processus:
+				paire, i, debut, n = file.popleft()
+				if paire in finies: continue
+				tache = executor.submit(_joueTranche, paire[0], paire[1], debut, n,
+					"{}-{}-{}".format(graine, *paire))
+				taches[tache] = (paire, i)
+			if not taches: break
+
+			faites, _ = concurrent.futures.wait(taches, return_when = concurrent.futures.FIRST_COMPLETED)
+			for tache in faites:
+				paire, i = taches.pop(tache)
+				if paire in finies: continue
+				attente[paire][i] = tache.result()
+				bilan = bilans[paire]
+				while suivante[paire] in attente[paire]:
+					bilan.fusionne(attente[paire].pop(suivante[paire]))
+					suivante[paire] += 1
+					if arret is None: continue
+					bilan.decision = arret.decide(bilan)
+					if bilan.decision is not None:
+						# on annule les tranches de la paire qui n'ont pas commencé
+						finies.add(paire)
+						for autre, (p, j) in list(taches.items()):
+							if p == paire and autre.cancel(): del taches[autre]
+						break
+	return bilans
+
+def main():
+	parser = argparse.ArgumentParser(description = "Tournoi entre stratégies de dominos")
+	parser.add_argument("strategies", nargs = "*",
+		help = "stratégies à faire s'affronter, toutes par défaut")
+	parser.add_argument("-n", "--parties", type = int, default = 10000,
+		help = "nombre de parties par paire de stratégies")
+	parser.add_argument("-j", "--processus", type = int, default = None,
+		help = "nombre de processus, tous les coeurs par défaut")
+	parser.add_argument("-t", "--taille", type = int, default = None,
+		help = "nombre de parties par tranche")
+	parser.add_argument("-s", "--graine", type = int, default = None)
+	parser.add_argument("-a", "--arret", choices = ("sprt", "intervalle"), default = None,
+		help = "arrête une paire dès que l'écart est significatif")
+	parser.add_argument("-c", "--critere", choices = sorted(_CENTRES), default = "victoires")
+	parser.add_argument("--ecart", type = float, default = None,
+		help = "écart testé par le SPRT : 0.02 en taux de victoire, 1 point par défaut")
+	parser.add_argument("--alpha", type = float, default = 0.05)
+	parser.add_argument("--beta", type = float, default = 0.05)
+	parser.add_argument("--precision", type = float, default = None,
+		help = "demi-largeur de l'intervalle sous laquelle les stratégies se valent")
+	args = parser.parse_args()
+
+	arret = None
+	if args.arret == "sprt":
+		arret = Sprt(args.critere, args.ecart, args.alpha, args.beta)
+	elif args.arret == "intervalle":
+		arret = Intervalle(args.critere, args.alpha, args.precision)
+
+	debut = time.perf_counter()
+	bilans = tournoi(args.strategies or None, args.parties, args.processus,
+		args.taille, args.graine, arret)
+	duree = time.perf_counter() - debut
+
+	total = 0
+	for (nom1, nom2), bilan in bilans.items():
+		total += bilan.parties
+		n, moyenne, variance = bilan.getStatistiques("points")
+		ligne = "{} contre {} : {} | taux {:.3f} | écart moyen {:.2f}".format(
+			nom1, nom2, bilan, bilan.getTauxVictoire(), moyenne)
+		if arret is not None:
+			decision = {None: "sans décision", 0: "équivalentes", 1: nom1 + " meilleure",
+				2: nom2 + " meilleure"}[bilan.decision]
+			ligne += " | {} : {} après {} parties".format(arret, decision, bilan.parties)
+		print(ligne)
+	print("{} parties en {:.2f} s : {:.0f} parties/s".format(
+		total, duree, total / duree if duree > 0 else 0))
+
+if __name__ == "__main__":
+	main()
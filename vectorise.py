@@ -0,0 +1,195 @@
+# auteur: Ben Kabongo Buzangu
+# simulation de milliers de parties à la fois avec numpy
+
+""" Jeu de Domino - Simulation vectorisée
+n parties sont jouées en même temps, tour par tour : les mains sont
+des tableaux de booléens de forme (n, 28), rangés comme les bits de
+bitboard (par somme croissante), les extrêmités du plateau et les
+scores des tableaux de forme (n,).
+les règles sont celles de simulation.Simulation et de bitboard.partie.
+la pioche de chaque partie est la suite de sa donne : piocher revient
+à prendre le domino suivant d'un jeu mélangé, ce qui équivaut à tirer
+au hasard parmi les dominos restants.
+nécessite numpy """
+
+import argparse
+import collections
+import time
+
+import numpy
+
+import bitboard
+import model
+
+NB_DOMINOS = bitboard.NB_DOMINOS
+VIDE = bitboard.VIDE
+
+_LOW = numpy.array([low for low, high in bitboard.DOMINOS], dtype = numpy.int8)
+_HIGH = numpy.array([high for low, high in bitboard.DOMINOS], dtype = numpy.int8)
+_SOMMES = numpy.array(bitboard.SOMMES, dtype = numpy.int32)
+# _PIPS[p, n] est vrai ssi le domino n a p pour extrêmité, _PIPS[VIDE] vaut partout vrai
+_PIPS = numpy.array([[(bitboard.PIPS[p] >> n) & 1 for n in range(NB_DOMINOS)]
+	for p in range(VIDE + 1)], dtype = bool)
+
+# résultats de n parties, sous forme de tableaux de forme (n,)
+Resultats = collections.namedtuple("Resultats", ("score1", "score2", "tours"))
+
+# ----------------------------------------- stratégies
+# une stratégie reçoit les dominos jouables de chaque partie, de forme (n, 28),
+# et renvoie pour chacune le domino à jouer, -1 si la main doit piocher
+
+def aleatoire(jouables, rng):
+	""" un domino jouable au hasard """
+	poids = rng.random(jouables.shape)
+	poids[~jouables] = -1
+	choix = poids.argmax(axis = 1)
+	choix[~jouables.any(axis = 1)] = -1
+	return choix
+
+def grand(jouables, rng):
+	""" le plus grand domino jouable, jamais le double zéro (bit 0)
+	comme bitboard.grand et model.ordiGrand : à somme égale, celui de plus
+	grand numéro """
+	jouables = jouables[:, :0:-1]
+	choix = NB_DOMINOS - 1 - jouables.argmax(axis = 1)
+	choix[~jouables.any(axis = 1)] = -1
+	return choix
+
+STRATEGIES = {
+	"facile": aleatoire,
+	"difficile": grand,
+}
+
+# ----------------------------------------- parties
+
+def distribue(n, rng):
+	""" renvoie n jeux mélangés, de forme (n, 28) """
+	return rng.random((n, NB_DOMINOS)).argsort(axis = 1)
+
+def simule(ordres, strategie1 = aleatoire, strategie2 = grand, rng = None, taille = 8):
+	""" joue une partie par jeu mélangé de ordres, de forme (n, 28) :
+	les taille premiers dominos vont au premier joueur, les taille suivants
+	au second et le reste forme la pioche, dans l'ordre
+	renvoie les Resultats des n parties """
+	if rng is None: rng = numpy.random.default_rng()
+	n = len(ordres)
+	lignes = numpy.arange(n)[:, None]
+
+	mains = numpy.zeros((2, n, NB_DOMINOS), dtype = bool)
+	mains[0, lignes, ordres[:, :taille]] = True
+	mains[1, lignes, ordres[:, taille:2 * taille]] = True
+	# position du prochain domino de la pioche dans ordres
+	sommets = numpy.full(n, 2 * taille)
+	left = numpy.full(n, VIDE, dtype = numpy.int8)
+	right = numpy.full(n, VIDE, dtype = numpy.int8)
+	scores = numpy.zeros((2, n), dtype = numpy.int32)
+	tours = numpy.zeros(n, dtype = numpy.int32)
+
+	# parties en cours
+	encours = numpy.arange(n)
+	while len(encours) > 0:
+		tours[encours] += 1
+		isPioche = numpy.ones(len(encours), dtype = bool)
+
+		for joueur, strategie in enumerate((strategie1, strategie2)):
+			jouables = mains[joueur, encours] & (_PIPS[left[encours]] | _PIPS[right[encours]])
+			choix = strategie(jouables, rng)
+			joue = choix >= 0
+
+			# les parties où un domino est posé
+			parties, dominos = encours[joue], choix[joue]
+			mains[joueur, parties, dominos] = False
+			l, r = left[parties], right[parties]
+			low, high = _LOW[dominos], _HIGH[dominos]
+			# même ordre que model.Plateau.jouer pour le domino (low, high)
+			vide = l == VIDE
+			gauche1 = ~vide & (low == l)
+			droite1 = ~vide & ~gauche1 & (low == r)
+			gauche2 = ~vide & ~gauche1 & ~droite1 & (high == l)
+			droite2 = ~vide & ~gauche1 & ~droite1 & ~gauche2
+			left[parties] = numpy.select((vide, gauche1, gauche2), (low, high, low), l)
+			right[parties] = numpy.select((vide, droite1, droite2), (high, high, low), r)
+			scores[joueur, parties] += _SOMMES[dominos]
+
+			# les parties où la main pioche
+			pioche = numpy.flatnonzero(~joue)
+			parties = encours[pioche]
+			vides = sommets[parties] >= NB_DOMINOS
+			isPioche[pioche[vides]] = False
+			parties = parties[~vides]
+			mains[joueur, parties, ordres[parties, sommets[parties]]] = True
+			sommets[parties] += 1
+
+		finies = ~isPioche | ~mains[0, encours].any(axis = 1) | ~mains[1, encours].any(axis = 1)
+		encours = encours[~finies]
+
+	return Resultats(scores[0], scores[1], tours)
+
+def partieModele(ordre, strategie1 = model.ordiGrand, strategie2 = model.ordiGrand, taille = 8):
+	""" rejoue la partie d'un jeu mélangé avec model.Jeu, selon les règles
+	de simulation.Simulation : la pioche y est rangée dans l'ordre du jeu
+	mélangé, et chaque main pioche son premier domino
+	une stratégie reçoit le plateau et la main, comme model.ordiGrand
+	sert de référence pour vérifier simule avec des stratégies déterministes
+	renvoie (score1, score2, tours) """
+	dominos = [model.Domino(*bitboard.DOMINOS[n]) for n in ordre]
+	# model.distribue donne les dominos un sur deux
+	donne = [None] * (2 * taille)
+	donne[0::2] = dominos[:taille]
+	donne[1::2] = dominos[taille:2 * taille]
+	jeu = model.Jeu(taille)
+	jeu._distribue(donne + dominos[2 * taille:])
+	tours = 0
+	while True:
+		tours += 1
+		isPioche = True
+		for joueur, strategie in enumerate((strategie1, strategie2)):
+			isPioche = jeu.joue(joueur, strategie(jeu._plateau, jeu._mains[joueur]), 0) and isPioche
+		if jeu.isFinie(isPioche): break
+	score1, score2 = jeu.getScores()
+	return score1, score2, tours
+
+def main():
+	parser = argparse.ArgumentParser(description = "Simulation vectorisée de parties de dominos")
+	parser.add_argument("parties", type = int, nargs = "?", default = 1000000,
+		help = "nombre de parties à simuler")
+	parser.add_argument("-b", "--lot", type = int, default = 100000,
+		help = "nombre de parties jouées en même temps")
+	parser.add_argument("--strategie1", choices = sorted(STRATEGIES), default = "facile")
+	parser.add_argument("--strategie2", choices = sorted(STRATEGIES), default = "difficile")
+	parser.add_argument("-s", "--graine", type = int, default = None)
+	parser.add_argument("--verifie", type = int, default = 0, metavar = "N",
+		help = "compare N parties difficile contre difficile à model.Jeu")
+	args = parser.parse_args()
+
+	rng = numpy.random.default_rng(args.graine)
+
+	if args.verifie > 0:
+		ordres = distribue(args.verifie, rng)
+		resultats = simule(ordres, grand, grand, rng)
+		for i in range(args.verifie):
+			attendu = partieModele(ordres[i])
+			obtenu = (resultats.score1[i], resultats.score2[i], resultats.tours[i])
+			if attendu != obtenu:
+				raise Exception("Partie {} : {} au lieu de {}".format(i, obtenu, attendu))
+		print("{} parties identiques à model.Jeu".format(args.verifie))
+
+	strategie1 = STRATEGIES[args.strategie1]
+	strategie2 = STRATEGIES[args.strategie2]
+	victoires1 = victoires2 = nuls = 0
+	debut = time.perf_counter()
+	for depart in range(0, args.parties, args.lot):
+		resultats = simule(distribue(min(args.lot, args.parties - depart), rng),
+			strategie1, strategie2, rng)
+		victoires1 += int((resultats.score1 > resultats.score2).sum())
+		victoires2 += int((resultats.score1 < resultats.score2).sum())
+		nuls += int((resultats.score1 == resultats.score2).sum())
+	duree = time.perf_counter() - debut
+
+	print("{} parties en {:.2f} s : {:.0f} parties/s".format(
+		args.parties, duree, args.parties / duree if duree > 0 else 0))
+	print("{} {} - {} {} ({} nuls)".format(
+		args.strategie1, victoires1, victoires2, args.strategie2, nuls))
+
+if __name__ == "__main__":
+	main()